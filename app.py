@@ -1,16 +1,25 @@
+import functools
+import multiprocessing
+import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
-import pandas as pd
-from utils.email_sender import OutlookEmailSender
-from utils.pathing import resource_path
+from typing import TYPE_CHECKING
+from utils.log_pipeline import LogPipeline, TkBridge
+from utils.metrics import RateMeter, registry, run_log_path
+from utils.pathing import app_data_path, resource_path
 import threading
 
+# pandas, openpyxl and the mail backends are imported where they are first used
+# (page construction, load, send) so the window appears without waiting on them.
+if TYPE_CHECKING:
+    import pandas as pd
+
 class App(tk.Tk):
     """
     Simple multi-page Tkinter app:
       Home -> choose "Disputes" or "Pay Reports"
-      Each choice shows a dedicated page you can build out later.
+      Each choice shows a dedicated page.
     """
     def __init__(self):
         super().__init__()
@@ -37,18 +46,20 @@ class App(tk.Tk):
         container.rowconfigure(0, weight=1)
         container.columnconfigure(0, weight=1)
 
-        # Register and create pages
+        # Register pages; each is built the first time it is shown
+        self.container = container
+        self.page_classes = {Page.__name__: Page for Page in (HomePage, DisputesPage, PayReportsPage)}
         self.pages = {}
-        for Page in (HomePage, DisputesPage, PayReportsPage):
-            page = Page(parent=container, controller=self)
-            self.pages[Page.__name__] = page
-            page.grid(row=0, column=0, sticky="nsew")
 
         self.show_page("HomePage")
 
     def show_page(self, name: str):
-        """Raise a page by its class name stored in self.pages."""
-        frame = self.pages[name]
+        """Raise a page by its class name, creating it on first use."""
+        frame = self.pages.get(name)
+        if frame is None:
+            frame = self.page_classes[name](parent=self.container, controller=self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.pages[name] = frame
         frame.tkraise()
 
 
@@ -87,35 +98,340 @@ class HomePage(ttk.Frame):
         pay_reports_btn.grid(row=0, column=1, padx=8, ipadx=12, ipady=6)
 
 
-class DisputesPage(ttk.Frame):
-    EXPECTED_SHEET = "Emails"
-    # Columns C:N inclusive (12 columns), in order:
-    EXPECTED_COLUMNS = [
-        "Submitter",
-        "Project ID",
-        "Appt Date",
-        "Requested Outcome",
-        "Context",
-        "Closer",
-        "Outcome",
-        "Outcome Note",
-        "Closer Manager",
-        "Setter Mgr First",
-        "Closer Mgr First",
-        "Email-To",
-    ]
+class BatchSendMixin:
+    """
+    Background send plumbing shared by the batch pages: a worker thread, the
+    send itself on the asyncio runtime (journaled and paced, Outlook behind an
+    executor adapter), Pause/Cancel, the live rate/ETA readout and the metrics
+    export.
+
+    Expects the page to define `log_pipeline`, `bridge`, `rate_label`,
+    `selected_file`, `file_entry`, `pause_button`, `cancel_button`, `workers_var`,
+    `on_behalf_var`, `mailboxes_var`, `writeback_var`, `meter`, `control`,
+    `_sending` and `_checking`, and a `METRICS_NAME` for its Prometheus snapshot.
+
+    A non-empty "Send from" list spreads the batch over those mailboxes
+    (utils/sender_pool.py), each paced on its own.
+    """
+
+    def _start_background(self, target, *args):
+        from utils.async_runtime import RunControl
+
+        # A fresh control per run: Cancel during rendering also stops the send
+        self.control = RunControl()
+        self._set_busy(True)
+        self.meter = None
+        self.after(500, self._tick_rate)
+
+        def run():
+            try:
+                target(*args)
+            finally:
+                # Widgets are only touched from the Tk thread
+                self.bridge.post(self._set_busy, False)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+    def on_pause(self):
+        """Pause or resume the running send; messages already in hand finish first."""
+        if self.control is None or self.control.cancelled:
+            return
+        if self.control.paused:
+            self.control.resume()
+            self.pause_button.config(text="Pause")
+            self.log("▶ Resumed.")
+        else:
+            self.control.pause()
+            self.pause_button.config(text="Resume")
+            self.log("⏸ Paused after the messages in flight.")
+
+    def on_cancel(self):
+        """Stop the run: in-flight messages finish, the rest are recorded as cancelled."""
+        if self.control is None or self.control.cancelled:
+            return
+        self.control.cancel()
+        self.pause_button.config(text="Pause", state="disabled")
+        self.cancel_button.config(state="disabled")
+        self.log("■ Cancelling: waiting for the messages in flight…")
+
+    def on_release_in_doubt(self):
+        """Let messages a crashed run left `sending` go again, once the user has checked Sent Items."""
+        from utils.send_journal import SENDING, SendJournal
+
+        if self._sending:
+            messagebox.showinfo("Run in progress", "Wait for the current run to finish first.")
+            return
+        with SendJournal() as journal:
+            in_doubt = journal.counts().get(SENDING, 0)
+            if not in_doubt:
+                messagebox.showinfo("Nothing in doubt", "No messages were left in doubt by an earlier run.")
+                return
+            if not messagebox.askyesno(
+                "Release in-doubt messages",
+                f"{in_doubt:,} message(s) were being sent when an earlier run stopped, so they are skipped.\n\n"
+                "Check Sent Items first: any that did go out would be sent twice.\n\n"
+                "Send them again on the next run?",
+            ):
+                return
+            released = journal.release_in_doubt()
+        self.log(f"↺ Released {released:,} in-doubt message(s); the next send includes them.")
+
+    def _dispatch(self, jobs, total: int, skipped: int, outcomes=None) -> list:
+        """
+        Run SendJobs through the async engine (journaled and paced, controlled
+        by `self.control`) and log results; returns the failed keys. Per-row
+        `outcomes` (an OutcomeLog) are written back at the end.
+        """
+        from utils.async_runtime import AsyncSendEngine, ExecutorSender
+        from utils.email_sender import OutlookEmailSender
+        from utils.send_journal import SendJournal
+        from utils.sender_pool import PooledSender, pool_from_spec
+        from utils.throttle import PacedSender, Pacer
+
+        # A bad mailbox list raises here, before anything is journaled or sent
+        pool = pool_from_spec(self.mailboxes_var.get())
+        send_on_behalf = self.on_behalf_var.get().strip() or None
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = 1
+        sent = 0
+        cancelled = 0
+        failed = []
+        self.meter = RateMeter(total)
+
+        # Previews never reach here (see on_preview), so every run is journaled and paced
+        journal = SendJournal()
+        pacer = pool or Pacer()
+
+        def make_sender():
+            sender = OutlookEmailSender(send_on_behalf_of=send_on_behalf)
+            return PooledSender(sender, pool) if pool is not None else PacedSender(sender, pacer)
+
+        try:
+            # One sender (and COM apartment) per executor thread; all share the pacer
+            engine = AsyncSendEngine(
+                ExecutorSender(make_sender, threads=workers), concurrency=workers,
+                journal=journal, outcomes=outcomes, control=self.control,
+            )
+            for result in engine.run(jobs):
+                self.meter.tick()
+                if result.skipped:
+                    skipped += 1
+                    self._ui_log(f"↷ Skipped row {result.key} → {result.to}: {result.skipped}")
+                elif result.ok:
+                    sent += 1
+                    self._ui_log(f"✓ Queued row {result.key} → {result.to}")
+                elif self.control.cancelled and result.error == "Cancelled":
+                    failed.append(result.key)
+                    cancelled += 1
+                else:
+                    failed.append(result.key)
+                    self._ui_log(f"✗ Failed row {result.key} → {result.to}: {result.error}")
+        finally:
+            journal.close()
+
+        self._ui_log(f"Pacing: {pacer.describe()}")
+        if self.control.cancelled:
+            not_sent = total - self.meter.done + cancelled
+            self._ui_log(f"\nCancelled. Sent: {sent} | Skipped: {skipped} | Not sent: {not_sent:,}\n")
+        else:
+            self._ui_log(f"\nDone. Sent: {sent} | Skipped: {skipped}\n")
+        if outcomes is not None and len(outcomes):
+            self._write_back(outcomes)
+        return failed
+
+    def _new_outcome_log(self, row_keys, labels, missing):
+        """OutcomeLog for the source workbook, with pre-flight and no-recipient rows already noted."""
+        from utils.writeback import NO_RECIPIENT, OutcomeLog, sidecar_path
+
+        if len(self._source_paths()) > 1:
+            self._ui_log("⚠ Write results works on a single workbook; row results were not written.")
+            return None
+        log = OutcomeLog(row_keys, labels=labels, sidecar=sidecar_path(self.selected_file.get().strip()))
+        if self.preflight is not None:
+            log.note_preflight(self.preflight)
+        log.note_keys(missing, NO_RECIPIENT)
+        return log
+
+    def _write_back(self, outcomes):
+        """Results sheet in the source workbook; if Excel has it open, the sidecar CSV only."""
+        from utils.writeback import RESULTS_SHEET
+
+        try:
+            # The workbook cache notices the file changed, so the next load re-reads it
+            outcomes.write(workbook=self.selected_file.get().strip())
+            self._ui_log(f"📝 Row results written to the '{RESULTS_SHEET}' sheet and {outcomes.sidecar.name}.")
+        except PermissionError:
+            self._ui_log(f"📝 The workbook is open in Excel, so row results went to {outcomes.sidecar} only.")
+        except Exception as e:
+            self._ui_log(f"⚠ Could not write row results to the workbook ({e}); see {outcomes.sidecar}.")
+
+    def _source_paths(self) -> list[str]:
+        """The selected workbooks (Browse can pick several; they are listed with '; ')."""
+        return [p.strip() for p in self.selected_file.get().split(";") if p.strip()]
+
+    def _require_paths(self) -> list[Path] | None:
+        paths = [Path(p) for p in self._source_paths()]
+        if not paths:
+            messagebox.showerror("Missing file", "Please choose a source file first.")
+            return None
+        for p in paths:
+            if not p.exists():
+                messagebox.showerror("Not found", f"File does not exist:\n{p}")
+                return None
+        return paths
+
+    def _preflight_in_background(self, check, show):
+        """
+        Run `check()` (a pre-flight) on a worker thread, since its address book
+        step opens Outlook and resolves every distinct address, then hand the
+        report to `show` on the Tk thread. A newer load supersedes a running check.
+        """
+        token = self._checking = object()
+        self.preflight = None
+        self.log("Pre-flight: checking rows and recipients…")
+
+        def done(report):
+            if self._checking is token:
+                self._checking = None
+                show(report)
+
+        def failed(e):
+            if self._checking is token:
+                self._checking = None
+                self.log(f"❌ Pre-flight failed: {e}")
+
+        def run():
+            try:
+                report = check()
+            except Exception as e:
+                self.bridge.post(failed, e)
+                return
+            self.bridge.post(done, report)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _preflight_pending(self) -> bool:
+        """True (and tells the user) while a pre-flight check is still running."""
+        if self._checking is None:
+            return False
+        messagebox.showinfo("Pre-flight running", "Wait for the pre-flight checks to finish (see the Log tab).")
+        return True
+
+    @staticmethod
+    def _list_field(var) -> tuple[str, ...]:
+        """A ';'/','-separated entry (e.g. allowed domains) as a tuple; empty = no restriction."""
+        return tuple(v.strip() for v in var.get().replace(",", ";").split(";") if v.strip())
+
+    def _address_book(self, domains):
+        """Pre-flight resolver against Outlook's address book; skipped (and logged) if Outlook is unavailable."""
+        from utils.transports import unresolved_recipients
+
+        def resolve(addresses):
+            try:
+                return unresolved_recipients(addresses, internal_domains=domains)
+            except Exception as e:
+                self._ui_log(f"⚠ Address book check skipped (Outlook unavailable): {e}")
+                return []
+
+        return resolve
+
+    def _open_preview(self, messages, title: str):
+        from utils.message_preview import MessagePreview
+
+        MessagePreview(self, messages, title=title, on_open_in_outlook=self._open_in_outlook)
+
+    def _open_in_outlook(self, msg):
+        """Display one message in Outlook (not sent), off the UI thread."""
+        if msg is None:
+            return
+
+        def worker():
+            from utils.email_sender import OutlookEmailSender
+            try:
+                send_on_behalf = self.on_behalf_var.get().strip() or None
+                with OutlookEmailSender(send_on_behalf_of=send_on_behalf, preview=True) as sender:
+                    sender.send_html(html_body=msg.html, to=msg.to, subject=msg.subject)
+            except Exception as e:
+                self._ui_log(f"❌ Outlook preview failed: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _ui_log(self, text: str):
+        # Thread-safe: buffered and drained into the widget by the pipeline's tick
+        self.log_pipeline.write(text)
+
+    def _set_busy(self, busy: bool):
+        # Tk thread only (workers go through self.bridge)
+        self._sending = busy
+        state = "disabled" if busy else "normal"
+        for w in (self.file_entry,):
+            try:
+                w.config(state=state)
+            except Exception:
+                pass
+        self.pause_button.config(text="Pause", state="normal" if busy else "disabled")
+        self.cancel_button.config(state="normal" if busy else "disabled")
+
+    def _tick_rate(self):
+        # Tk thread: refresh the throughput/ETA readout while a send runs
+        if self.meter is not None:
+            paused = " · paused" if self.control is not None and self.control.paused else ""
+            self.rate_label.config(text=self.meter.describe() + paused)
+        if self._sending:
+            self.after(500, self._tick_rate)
+
+    def _export_metrics(self):
+        """Flush the JSON-lines log and refresh the Prometheus snapshot."""
+        try:
+            registry().flush()
+            registry().write_prometheus(app_data_path("metrics", f"{self.METRICS_NAME}.prom"))
+        except OSError as e:
+            self._ui_log(f"⚠ Could not write metrics: {e}")
+
+
+class DisputesPage(BatchSendMixin, ttk.Frame):
+    METRICS_NAME = "disputes"
 
     def __init__(self, parent, controller: App):
         super().__init__(parent)
         self.controller = controller
 
+        from utils import disputes
+        from utils.workbook_cache import WorkbookCache
+        self.EXPECTED_SHEET = disputes.EXPECTED_SHEET
+        # Columns C:N inclusive (12 columns), in order:
+        self.EXPECTED_COLUMNS = disputes.EXPECTED_COLUMNS
+        # Per-row emails, or one digest per distinct value of a column
+        self.SEND_MODES = ("One email per row",) + tuple(f"Digest per {c}" for c in disputes.DIGEST_GROUPS)
+
         # ----- Setup -----
-        self.preview_var = tk.BooleanVar(value=False)
+        self.preview_var = tk.BooleanVar(value=False)  # page through rendered emails in-app; nothing is sent
+        self.redirect_var = tk.StringVar(value="")  # test redirect: send every email here instead
         self.on_behalf_var = tk.StringVar(value="disputes@blueravensolar.com")
+        self.workers_var = tk.IntVar(value=4)  # parallel sender sessions
+        self.mailboxes_var = tk.StringVar(value="")  # optional: spread sends over these mailboxes
+        self.mode_var = tk.StringVar(value=self.SEND_MODES[0])
+        self.incremental_var = tk.BooleanVar(value=False)  # only rows new/changed since the last run
+        self.writeback_var = tk.BooleanVar(value=False)  # per-row results into the workbook after a send
+        self.domains_var = tk.StringVar(value="")  # optional: hold back recipients outside these domains
+        self.outcomes_var = tk.StringVar(value="")  # optional: warn about Outcome values outside this list
 
         # ----- State -----
         self.selected_file = tk.StringVar(value="")
         self.df = None
+        self.preflight = None    # PreflightReport for self.df
+        self._checking = None    # token of the pre-flight running in the background
+        self.changes = None      # IncrementalLoad when self.df holds only new/changed rows
+        self.workbook_cache = WorkbookCache()  # parsed C:N frames, keyed by file identity
+        self.meter = None        # RateMeter for the current send
+        self.control = None      # RunControl (pause/resume/cancel) for the current run
+        self._sending = False
+
+        # Spans/counters for this session (load, render, send, COM calls) as JSON lines
+        registry().open_log(run_log_path("disputes"))
 
         # ----- Layout -----
         self.columnconfigure(0, weight=1)
@@ -146,6 +462,19 @@ class DisputesPage(ttk.Frame):
         self.file_entry = ttk.Entry(row_file, textvariable=self.selected_file)
         self.file_entry.grid(row=0, column=1, sticky="ew")
         ttk.Button(row_file, text="Browse…", command=self.on_browse).grid(row=0, column=2, padx=(6, 0))
+        ttk.Label(row_file, text="Test redirect:").grid(row=0, column=3, padx=(12, 6))
+        ttk.Entry(row_file, textvariable=self.redirect_var, width=28).grid(row=0, column=4)
+        ttk.Checkbutton(row_file, text="Preview only", variable=self.preview_var).grid(row=0, column=5, padx=(12, 0))
+        ttk.Checkbutton(row_file, text="Only new/changed rows", variable=self.incremental_var).grid(
+            row=0, column=6, padx=(12, 0))
+        ttk.Checkbutton(row_file, text="Write results", variable=self.writeback_var).grid(
+            row=0, column=7, padx=(12, 0))
+        # Optional pre-flight restrictions (';'-separated; empty = no check)
+        ttk.Label(row_file, text="Allowed domains:").grid(row=1, column=3, padx=(12, 6), pady=(4, 0))
+        ttk.Entry(row_file, textvariable=self.domains_var, width=28).grid(row=1, column=4, pady=(4, 0))
+        ttk.Label(row_file, text="Allowed outcomes:").grid(row=1, column=5, padx=(12, 6), pady=(4, 0))
+        ttk.Entry(row_file, textvariable=self.outcomes_var, width=40).grid(
+            row=1, column=6, columnspan=2, sticky="w", pady=(4, 0))
 
         # Row 4: Actions (tighter)
         row_actions = ttk.Frame(self)
@@ -153,6 +482,25 @@ class DisputesPage(ttk.Frame):
         ttk.Button(row_actions, text="Validate file", command=self.on_validate).grid(row=0, column=0, padx=(0, 6))
         ttk.Button(row_actions, text="Load data", command=self.on_load_data).grid(row=0, column=1)
         ttk.Button(row_actions, text="Send All Emails", command=self.on_send_emails).grid(row=0, column=2)
+        # Two-phase sending: render to an outbox folder now, send it later
+        ttk.Button(row_actions, text="Render to Outbox", command=self.on_spool).grid(row=0, column=3, padx=(6, 0))
+        ttk.Button(row_actions, text="Send Outbox…", command=self.on_dispatch_outbox).grid(row=0, column=4)
+        ttk.Label(row_actions, text="Workers:").grid(row=0, column=5, padx=(12, 4))
+        ttk.Spinbox(row_actions, from_=1, to=16, width=4, textvariable=self.workers_var).grid(row=0, column=6)
+        ttk.Combobox(
+            row_actions, textvariable=self.mode_var, values=self.SEND_MODES, state="readonly", width=26
+        ).grid(row=0, column=7, padx=(12, 0))
+        # e.g. "ops1@…; ops2@…*2; behalf:disputes@…" (see utils/sender_pool.parse_mailboxes)
+        ttk.Label(row_actions, text="Send from:").grid(row=0, column=8, padx=(12, 4))
+        ttk.Entry(row_actions, textvariable=self.mailboxes_var, width=30).grid(row=0, column=9)
+        self.pause_button = ttk.Button(row_actions, text="Pause", command=self.on_pause, state="disabled")
+        self.pause_button.grid(row=0, column=10, padx=(12, 0))
+        self.cancel_button = ttk.Button(row_actions, text="Cancel", command=self.on_cancel, state="disabled")
+        self.cancel_button.grid(row=0, column=11)
+        ttk.Button(row_actions, text="Release in-doubt…", command=self.on_release_in_doubt).grid(
+            row=0, column=12, padx=(6, 0))
+        self.rate_label = ttk.Label(row_actions, text="")  # live throughput / ETA
+        self.rate_label.grid(row=0, column=13, padx=(12, 0))
 
         # Row 5: Output / status box
         self._build_output_tabs()
@@ -164,33 +512,33 @@ class DisputesPage(ttk.Frame):
 
         # ---------- handlers ----------
     def on_browse(self):
-        path = filedialog.askopenfilename(
-            title="Select disputes source file",
+        # Several workbooks (e.g. one per office) load into one frame
+        paths = filedialog.askopenfilenames(
+            title="Select disputes source file(s)",
             filetypes=[
                 ("Excel files", "*.xlsx *.xlsm"),
                 ("All files", "*.*"),
             ],
         )
-        if path:
-            self.selected_file.set(path)
-            self.log(f"Selected file: {path}")
+        if paths:
+            self.selected_file.set("; ".join(paths))
+            self.log(f"Selected file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}")
 
     def on_validate(self):
-        path_str = self.selected_file.get().strip()
-        if not path_str:
-            messagebox.showerror("Missing file", "Please choose a source file first.")
-            return
-
-        p = Path(path_str)
-        if not p.exists():
-            messagebox.showerror("Not found", f"File does not exist:\n{p}")
+        paths = self._require_paths()
+        if not paths:
             return
 
         # Try reading workbook metadata to confirm it’s an Excel file we can open.
+        p = paths[0]
         try:
-            # Lightweight check: list sheet names (no full read of all sheets)
-            xls = pd.ExcelFile(p)
-            self.log(f"✅ File is readable. Sheets: {', '.join(xls.sheet_names)}")
+            # Lightweight check: one read-only open, sheet names + header row only
+            from utils import disputes
+            for p in paths:
+                sheet_names, problem = disputes.validate_disputes(p, self.workbook_cache)
+                self.log(f"✅ {p.name} is readable. Sheets: {', '.join(sheet_names)}")
+                if problem is not None:
+                    self.log(f"⚠ {problem}")
         except PermissionError:
             self.log(f"❌ Permission error. Close the file if it’s open in Excel:\n{p}")
             messagebox.showerror("File locked", "Close the file in Excel and try again.")
@@ -200,55 +548,62 @@ class DisputesPage(ttk.Frame):
 
     def on_load_data(self):
         """Load C:N from the 'Emails' sheet, validate headers, and store DataFrame."""
-        path = self._require_path()
-        if not path:
+        paths = self._require_paths()
+        if not paths:
+            return
+        path = paths[0]
+        if len(paths) > 1 and self.incremental_var.get():
+            messagebox.showerror("One workbook only", "“Only new/changed rows” works on a single workbook.")
             return
 
+        from utils import disputes
+        from utils.workbook_loader import SOURCE_ROW, HeaderMismatchError, MissingSheetError, PartsError
         try:
-            # First confirm the sheet exists
-            xls = pd.ExcelFile(path)
-            if self.EXPECTED_SHEET not in xls.sheet_names:
-                messagebox.showerror(
-                    "Missing sheet",
-                    f"Sheet '{self.EXPECTED_SHEET}' was not found.\nSheets available: {', '.join(xls.sheet_names)}",
-                )
-                self.log(f"❌ Missing sheet '{self.EXPECTED_SHEET}'.")
-                return
-
-            # Read only columns C:N (12 columns)
-            df = pd.read_excel(
-                path,
-                sheet_name=self.EXPECTED_SHEET,
-                usecols="C:N",
-                engine="openpyxl",
-            )
-
-            # Normalize header whitespace
-            df.columns = [str(c).strip() for c in df.columns]
-
-            # Validate exact schema in order
-            got = list(df.columns)
-            exp = list(self.EXPECTED_COLUMNS)
-            if got != exp:
-                # Build a clear diff message
-                problems = []
-                for i, (g, e) in enumerate(zip(got, exp), start=1):
-                    if g != e:
-                        problems.append(f"  Col {i}: expected '{e}', got '{g}'")
-                # Handle length mismatch
-                if len(got) != len(exp):
-                    problems.append(f"  Column count mismatch: expected {len(exp)}, got {len(got)}")
-                msg = "Header mismatch:\n" + "\n".join(problems)
-                messagebox.showerror("Unexpected columns", msg)
-                self.log(f"❌ {msg}")
-                return
+            # Single read-only pass over C:N (12 columns); the sheet and header row
+            # are checked before any data rows are parsed.
+            self.changes = None
+            if len(paths) > 1:
+                # One process per workbook, stacked with Source File / Source Row columns
+                df = disputes.load_disputes_many(paths, self.workbook_cache)
+                self.log(f"✅ Loaded {len(df):,} rows from '{self.EXPECTED_SHEET}' (C:N) of {len(paths)} workbooks.")
+            elif self.incremental_var.get():
+                # Compare with the last handled snapshot; reads only appended rows when it can
+                from utils.incremental import IncrementalLoad
+                self.changes = IncrementalLoad.open(path, cache=self.workbook_cache)
+                df = self.changes.changes
+                self.log(f"✅ {self.changes.summary()}")
+            else:
+                df = disputes.load_disputes(path, self.workbook_cache)
+                self.log(f"✅ Loaded {len(df):,} rows from '{self.EXPECTED_SHEET}' (C:N).")
 
             # Store and report
             self.df = df
-            self.log(f"✅ Loaded {len(df):,} rows from '{self.EXPECTED_SHEET}' (C:N).")
-            self._render_preview_df(self.df, limit=50)
-            self.tabs.select(self.preview_frame)  # switch to the Preview tab
+            self._render_preview_df(self.df)
+
+            # Whole-sheet checks up front, so bad rows are known before any send
+            # (Excel rows from the index, which is the sheet position even for a subset)
+            domains = self._list_field(self.domains_var)
+            self._preflight_in_background(
+                functools.partial(
+                    disputes.preflight_disputes,
+                    df,
+                    row_numbers=df[SOURCE_ROW] if len(paths) > 1 else df.index + 2,
+                    resolve=self._address_book(domains),
+                    allowed_domains=domains,
+                    allowed_outcomes=self._list_field(self.outcomes_var),
+                ),
+                self._show_preflight,
+            )
 
+        except MissingSheetError as e:
+            messagebox.showerror("Missing sheet", str(e))
+            self.log(f"❌ Missing sheet '{self.EXPECTED_SHEET}'.")
+        except PartsError as e:
+            messagebox.showerror("Some workbooks failed", str(e))
+            self.log(f"❌ {e}")
+        except HeaderMismatchError as e:
+            messagebox.showerror("Unexpected columns", str(e))
+            self.log(f"❌ {e}")
         except PermissionError:
             self.log(f"❌ Permission error. Close the file if it’s open in Excel:\n{path}")
             messagebox.showerror("File locked", "Close the file in Excel and try again.")
@@ -257,118 +612,231 @@ class DisputesPage(ttk.Frame):
             messagebox.showerror("Load failed", str(e))
     
     def on_send_emails(self):
-        """Validate and kick off a background send."""
+        """Validate and kick off a background send (or open the in-app preview)."""
+        if self.preview_var.get():
+            self.on_preview()
+            return
+        if not self._ready_to_render("Send"):
+            return
+
+        self.log("\n[Sending…]\n")
+        self._start_background(self._send_worker)
+
+    def on_spool(self):
+        """Render every message to an outbox folder without sending anything."""
+        if not self._ready_to_render("Render"):
+            return
+
+        self.log("\n[Rendering to outbox…]\n")
+        self._start_background(self._spool_worker)
+
+    def on_dispatch_outbox(self):
+        """Send a previously rendered outbox."""
+        from utils.message_preview import RenderCache
+        from utils.outbox import Outbox, OutboxError
+
+        folder = filedialog.askdirectory(title="Select an outbox folder", initialdir=app_data_path("outbox"))
+        if not folder:
+            return
+        try:
+            count = len(Outbox(folder))
+        except (OutboxError, OSError, ValueError) as e:
+            messagebox.showerror("Not an outbox", str(e))
+            return
+        if self.preview_var.get():
+            box = Outbox(folder)
+            entries = list(box.entries())
+            self._open_preview(
+                RenderCache(len(entries), lambda start, stop: [box.rendered(e) for e in entries[start:stop]]),
+                f"Outbox preview — {folder}",
+            )
+            return
+        self.log(f"\n[Sending outbox: {count:,} messages from {folder}]\n")
+        self._start_background(self._dispatch_worker, folder)
+
+    def on_preview(self):
+        """Page through the emails a send would produce, rendered on demand; nothing is sent."""
+        from utils import disputes
+        from utils.message_preview import RenderCache
+
         if self.df is None or self.df.empty:
             messagebox.showerror("No data", "Load data from the 'Emails' sheet first.")
             return
+        if self._preflight_pending():
+            return
+
+        # Same rows, recipients and grouping as a real send
+        df = self.df
+        if self.preflight is not None and self.preflight.errors:
+            df = df[self.preflight.ok_mask(df)]
+        to_override = self.redirect_var.get().strip() or None
+        mode = self.mode_var.get()
+        group_by = self._group_by()
+        if group_by:
+            # One email per group: few enough to render up front
+            messages = RenderCache.from_list(disputes.render_digests(df, group_by=group_by, to_override=to_override))
+        else:
+            # Per-row emails are rendered a block at a time as they are paged into view
+            messages = RenderCache(
+                len(df), lambda start, stop: disputes.render_disputes(df.iloc[start:stop], to_override=to_override)
+            )
+        self.log(f"Preview: {len(messages):,} emails ({mode}); nothing will be sent.")
+        self._open_preview(messages, f"Email preview — {mode}")
+
+    def _show_preflight(self, report):
+        # Tk thread: the background pre-flight for the loaded rows finished
+        self.preflight = report
+        self.log(("⚠ " if report.errors else "✅ ") + report.summary())
+        self.issues_grid.set_frame(report.issues)
+        self.tabs.tab(self.issues_frame, text=f"Issues ({len(report.issues):,})")
+        self._export_metrics()
+        # switch to the Issues tab if anything will be held back, else the Preview tab
+        self.tabs.select(self.issues_frame if report.errors else self.preview_frame)
+
+    def _ready_to_render(self, verb: str) -> bool:
+        if self.df is None or self.df.empty:
+            messagebox.showerror("No data", "Load data from the 'Emails' sheet first.")
+            return False
+        if self._preflight_pending():
+            return False
 
         # Basic sanity check for required column
         if "Email-To" not in self.df.columns:
             messagebox.showerror("Missing column", "Expected 'Email-To' column not found.")
-            return
-
-        self.log("\n[Sending…]\n")
-        self._set_busy(True)
-
-        thread = threading.Thread(target=self._send_worker, daemon=True)
-        thread.start()
+            return False
+
+        if self.preflight is not None and self.preflight.errors:
+            bad = len(self.preflight.error_rows)
+            if not messagebox.askyesno(
+                "Rows with errors",
+                f"{bad:,} of {len(self.df):,} rows failed pre-flight checks (see the Issues tab).\n\n"
+                f"{verb} the other {len(self.df) - bad:,} rows and skip those?",
+            ):
+                return False
+        return True
+
+    def _render_queue(self):
+        """Render the loaded rows; returns ([(RenderedEmail, dedupe_key)...], [keys skipped for no recipient])."""
+        from utils import disputes
+
+        # Rows that failed pre-flight are never rendered or sent
+        df = self.df
+        if self.preflight is not None and self.preflight.errors:
+            df = df[self.preflight.ok_mask(df)]
+            self._ui_log(f"↷ Skipping {len(self.df) - len(df):,} rows with pre-flight errors")
+
+        # Render everything up front in one column-wise pass
+        # to_override=None sends to each row's Email-To
+        to_override = self.redirect_var.get().strip() or None
+        if to_override:
+            self._ui_log(f"Test redirect: every email goes to {to_override}")
+        mode = self.mode_var.get()
+        group_by = self._group_by()
+        # Keys are a stable per-message identity so a re-run never sends the same email twice
+        rendered, keys = disputes.render_messages(df, group_by=group_by, to_override=to_override)
+        if group_by:
+            self._ui_log(f"Digest mode: {len(df):,} rows → {len(rendered):,} emails by {group_by}")
+
+        queued = []
+        missing = []
+        for msg, key in zip(rendered, keys):
+            if not msg.to:
+                missing.append(msg.key)
+                # In digest mode the rows with a blank Email-To come back as one digest keyed ""
+                what = f"row {msg.key}" if msg.key != "" else "the rows with a blank Email-To"
+                self._ui_log(f"– Skipped {what}: missing Email-To")
+            else:
+                queued.append((msg, key))
+        return queued, missing
 
     def _send_worker(self):
-        """Background thread: iterate rows and send/preview each email."""
+        """Background thread: render rows and hand them to the multi-worker send engine."""
+        from utils.send_engine import SendJob
         try:
-            preview = self.preview_var.get()
             send_on_behalf = self.on_behalf_var.get().strip() or None
-
-            sent = 0
-            skipped = 0
-
-            with OutlookEmailSender(send_on_behalf_of=send_on_behalf, preview=preview) as sender:
-                for idx, row in self.df.iterrows():
-                    # to_addr = str(row.get("Email-To") or "").strip()
-                    to_addr = "jacob.r.west@sunpower.com"
-                    if not to_addr:
-                        skipped += 1
-                        self._ui_log(f"– Skipped row {idx}: missing Email-To")
-                        continue
-
-                    # Build a simple subject + HTML body.
-                    # Adjust formatting to your needs or plug in a Jinja renderer later.
-                    project_id = row.get("Project ID", "")
-                    requested = row.get("Requested Outcome", "")
-                    outcome = row.get("Outcome", "")
-                    outcome_note = row.get("Outcome Note", "")
-                    submitter = row.get("Submitter", "")
-                    appt_date = row.get("Appt Date", "")
-
-                    subject = f"Dispute Result – Project {project_id} – {requested or outcome}"
-                    html_body = f"""
-                    <html>
-                    <body style="font-family:Segoe UI, Arial, sans-serif; font-size:12pt;">
-                        <p>Hi,</p>
-                        <p>The dispute result for <b>Project {project_id}</b> is below.</p>
-                        <table cellpadding="6" cellspacing="0" border="0" style="border-collapse:collapse;">
-                        <tr><td><b>Submitter</b></td><td>{submitter}</td></tr>
-                        <tr><td><b>Appt Date</b></td><td>{appt_date}</td></tr>
-                        <tr><td><b>Requested Outcome</b></td><td>{requested}</td></tr>
-                        <tr><td><b>Final Outcome</b></td><td>{outcome}</td></tr>
-                        <tr><td><b>Note</b></td><td>{outcome_note}</td></tr>
-                        </table>
-                        <p style="margin-top:14px;">Regards,<br>Disputes Team</p>
-                    </body>
-                    </html>
-                    """
-
-                    try:
-                        sender.send_html(
-                            html_body=html_body,
-                            to=to_addr,
-                            subject=subject,
-                            # Optionally add cc/bcc here if you have columns for them
-                            # cc=row.get("CC", ""),
-                            # bcc=row.get("BCC", ""),
-                            # reply_to="disputes@sunpower.com",
-                            preview=preview,  # honors UI toggle
-                            send_on_behalf_of=send_on_behalf  # per-message override (optional)
-                        )
-                        sent += 1
-                        self._ui_log(f"✓ Queued row {idx} → {to_addr}")
-                    except Exception as e:
-                        self._ui_log(f"✗ Failed row {idx} → {to_addr}: {e}")
-
-            self._ui_log(f"\nDone. Sent/Previewed: {sent} | Skipped: {skipped}\n")
+            queued, missing = self._render_queue()
+
+            jobs = (
+                SendJob(seq, msg.key, dict(
+                    html_body=msg.html,
+                    to=msg.to,
+                    subject=msg.subject,
+                    # Optionally add cc/bcc here if you have columns for them
+                    # reply_to="disputes@sunpower.com",
+                    send_on_behalf_of=send_on_behalf,  # per-message override (optional)
+                ), dedupe_key=key)
+                for seq, (msg, key) in enumerate(queued)
+            )
+            failed = self._dispatch(jobs, len(queued), len(missing), outcomes=self._outcome_log(missing))
+            self._commit_changes(failed)
 
         except Exception as e:
             self._ui_log(f"❌ Error: {e}\n")
         finally:
-            self._set_busy(False)
+            self._export_metrics()
 
-    def _ui_log(self, text: str):
-        self.after(0, lambda: (self.output.insert("end", text + "\n"),
-                            self.output.see("end")))
+    def _group_by(self):
+        """Digest grouping column for the selected mode (None = one email per row)."""
+        mode = self.mode_var.get()
+        return mode[len("Digest per "):] if mode.startswith("Digest per ") else None
 
-    def _set_busy(self, busy: bool):
-        # You can disable buttons/entries here while sending
-        state = "disabled" if busy else "normal"
-        for w in (self.file_entry,):
-            try:
-                w.config(state=state)
-            except Exception:
-                pass
+    def _outcome_log(self, missing):
+        """OutcomeLog over the loaded rows when "Write results" is on (else None)."""
+        if not self.writeback_var.get():
+            return None
+        import pandas as pd
+        from utils.email_templates import text_column
+
+        group_by = self._group_by()
+        df = self.df
+        row_keys = text_column(df[group_by]) if group_by else pd.Series(df.index.astype(str), index=df.index)
+        return self._new_outcome_log(row_keys, df["Project ID"], missing)
+
+    def _commit_changes(self, failed=()):
+        """Incremental mode: remember the rows this run handled; failed or invalid rows stay pending."""
+        if self.changes is None:
+            return
+        handled = self.df.index
+        if self.preflight is not None and self.preflight.errors:
+            handled = handled[self.preflight.ok_mask(self.df).to_numpy()]
+        self.changes.commit(handled=handled, failed=failed, group_by=self._group_by())
+        self._ui_log(f"Incremental snapshot updated ({len(handled):,} rows handled, {len(failed):,} failed).")
+
+    def _spool_worker(self):
+        """Background thread: phase 1 of a two-phase send — render everything to an outbox."""
+        from utils.outbox import Outbox
+        try:
+            queued, missing = self._render_queue()
+            box = Outbox.create()
+            count = box.spool(
+                [msg for msg, _ in queued],
+                [key for _, key in queued],
+                send_on_behalf_of=self.on_behalf_var.get().strip() or None,
+                meta={"source": self.selected_file.get().strip(), "mode": self.mode_var.get()},
+            )
+            self._ui_log(f"\n✅ Rendered {count:,} emails to {box.directory} (skipped {len(missing):,}).")
+            self._ui_log("Use “Send Outbox…” to send them.\n")
+            self._commit_changes()
+        except Exception as e:
+            self._ui_log(f"❌ Error: {e}\n")
+        finally:
+            self._export_metrics()
+
+    def _dispatch_worker(self, folder: str):
+        """Background thread: phase 2 — drain an outbox through the send engine."""
+        from utils.outbox import Outbox
+        try:
+            box = Outbox(folder)
+            self._dispatch(box.jobs(), len(box), 0)
+        except Exception as e:
+            self._ui_log(f"❌ Error: {e}\n")
+        finally:
+            self._export_metrics()
 
     # ---------- helpers ----------
-    def _require_path(self) -> Path | None:
-        path_str = self.selected_file.get().strip()
-        if not path_str:
-            messagebox.showerror("Missing file", "Please choose a source file first.")
-            return None
-        p = Path(path_str)
-        if not p.exists():
-            messagebox.showerror("Not found", f"File does not exist:\n{p}")
-            return None
-        return p
     
     def _build_output_tabs(self):
-        """Create a tabbed area with Log and Preview tables."""
+        """Create a tabbed area with Log, Preview and Issues tables."""
         # Notebook
         self.tabs = ttk.Notebook(self)
         self.tabs.grid(row=5, column=0, sticky="nsew")
@@ -380,90 +848,79 @@ class DisputesPage(ttk.Frame):
 
         self.output = tk.Text(self.log_frame, height=10, wrap="word", borderwidth=1, highlightthickness=0)
         self.output.pack(fill="both", expand=True)
+        self.log_pipeline = LogPipeline(self.output, log_file=app_data_path("logs", "disputes.log"))
+        self.log_pipeline.start()
+        self.bridge = TkBridge(self)
+        self.bridge.start()
 
         # Preview tab
         self.preview_frame = ttk.Frame(self.tabs)
         self.tabs.add(self.preview_frame, text="Preview")
 
-        # Treeview + scrollbars
-        self.preview_tree = ttk.Treeview(self.preview_frame, show="headings")
-        yscroll = ttk.Scrollbar(self.preview_frame, orient="vertical", command=self.preview_tree.yview)
-        xscroll = ttk.Scrollbar(self.preview_frame, orient="horizontal", command=self.preview_tree.xview)
-        self.preview_tree.configure(yscrollcommand=yscroll.set, xscrollcommand=xscroll.set)
-
-        self.preview_tree.grid(row=0, column=0, sticky="nsew")
-        yscroll.grid(row=0, column=1, sticky="ns")
-        xscroll.grid(row=1, column=0, sticky="ew")
+        # Virtualized grid: only the visible rows are materialised
+        from utils.preview_grid import DataFrameGrid
+        self.preview_grid = DataFrameGrid(self.preview_frame)
+        self.preview_grid.grid(row=0, column=0, sticky="nsew")
 
         self.preview_frame.rowconfigure(0, weight=1)
         self.preview_frame.columnconfigure(0, weight=1)
 
-    def _render_preview_df(self, df: pd.DataFrame, limit: int = 50):
-        """Render a DataFrame to the Treeview."""
-        # Clear existing
-        for col in self.preview_tree["columns"]:
-            self.preview_tree.heading(col, text="")
-        self.preview_tree.delete(*self.preview_tree.get_children())
-
-        # Choose columns and format datelike columns
-        view_df = df.head(limit).copy()
-
-        # Try to pretty-format dates
-        # for col in view_df.columns:
-        #     if pd.api.types.is_datetime64_any_dtype(view_df[col]):
-        #         view_df[col] = view_df[col].dt.strftime("%m/%d/%Y")
-        #     else:
-        #         # If it's object and looks like datelike, try coercion
-        #         try:
-        #             coerced = pd.to_datetime(view_df[col], errors="coerce")
-        #             if coerced.notna().any():
-        #                 view_df[col] = coerced.dt.strftime("%m/%d/%Y").where(coerced.notna(), view_df[col])
-        #         except Exception:
-        #             pass
-
-        cols = list(view_df.columns)
-        self.preview_tree["columns"] = cols
-
-        # Headings
-        for c in cols:
-            self.preview_tree.heading(c, text=c)
-            self.preview_tree.column(c, width=100, anchor="w")  # initial width
-
-        # Rows
-        for _, row in view_df.iterrows():
-            values = ["" if pd.isna(v) else str(v) for v in row.tolist()]
-            self.preview_tree.insert("", "end", values=values)
-
-        # Auto-size (approx) based on content
-        self.after(0, lambda: self._autosize_columns(cols))
-
-    def _autosize_columns(self, cols):
-        """Rough auto-size: widen columns based on header+sample content."""
-        # Measure a few rows (Treeview doesn’t have text measurement; we approximate by char count)
-        sample_count = min(25, len(self.preview_tree.get_children()))
-        per_col_max = {c: len(str(c)) for c in cols}
-
-        for iid in self.preview_tree.get_children()[:sample_count]:
-            vals = self.preview_tree.item(iid, "values")
-            for c, v in zip(cols, vals):
-                per_col_max[c] = max(per_col_max[c], len(str(v)))
-
-        # Convert char count to pixels (approx 7 px per char; tweak as needed)
-        for c in cols:
-            px = min(600, max(60, per_col_max[c] * 7))
-            self.preview_tree.column(c, width=px)
+        # Issues tab: pre-flight report, one line per problem, by Excel row
+        self.issues_frame = ttk.Frame(self.tabs)
+        self.tabs.add(self.issues_frame, text="Issues")
+        self.issues_grid = DataFrameGrid(self.issues_frame)
+        self.issues_grid.grid(row=0, column=0, sticky="nsew")
+        self.issues_frame.rowconfigure(0, weight=1)
+        self.issues_frame.columnconfigure(0, weight=1)
+
+    def _render_preview_df(self, df: "pd.DataFrame"):
+        """Show the whole DataFrame in the (virtualized) preview grid."""
+        self.preview_grid.set_frame(df)
 
     
     def log(self, text: str):
-        self.output.insert("end", text + "\n")
-        self.output.see("end")
+        self.log_pipeline.write(text)
+
 
+class PayReportsPage(BatchSendMixin, ttk.Frame):
+    METRICS_NAME = "payreports"
 
-class PayReportsPage(ttk.Frame):
     def __init__(self, parent, controller: App):
         super().__init__(parent)
         self.controller = controller
 
+        from utils import pay_reports
+        from utils.workbook_cache import WorkbookCache
+        self.EXPECTED_SHEET = pay_reports.EXPECTED_SHEET
+
+        # ----- Setup -----
+        self.redirect_var = tk.StringVar(value="")  # test redirect: send every email here instead
+        self.on_behalf_var = tk.StringVar(value="")
+        self.workers_var = tk.IntVar(value=4)  # parallel sender sessions
+        self.mailboxes_var = tk.StringVar(value="")  # optional: spread sends over these mailboxes
+        self.attach_var = tk.BooleanVar(value=True)  # line-item CSV per employee
+        self.writeback_var = tk.BooleanVar(value=False)  # per-row results into the workbook after a send
+        self.all_sheets_var = tk.BooleanVar(value=False)  # every sheet with the pay line header (one per office)
+        self.domains_var = tk.StringVar(value="")  # optional: hold back recipients outside these domains
+
+        # ----- State -----
+        self.selected_file = tk.StringVar(value="")
+        self.df = None
+        self.preflight = None    # PreflightReport for self.df
+        self._checking = None    # token of the pre-flight running in the background
+        self.reports = None      # list[PayReport] from the last build
+        self._shown_reports = None
+        self.workbook_cache = WorkbookCache()
+        # Built reports bake in the redirect and attachments; changing either means a rebuild
+        for var in (self.redirect_var, self.attach_var):
+            var.trace_add("write", lambda *_: setattr(self, "reports", None))
+        self.meter = None
+        self.control = None
+        self._sending = False
+
+        registry().open_log(run_log_path("payreports"))
+
+        # ----- Layout -----
         self.columnconfigure(0, weight=1)
 
         header = ttk.Label(self, text="Pay Reports Email Page", font=("Segoe UI", 16, "bold"))
@@ -471,20 +928,271 @@ class PayReportsPage(ttk.Frame):
 
         info = ttk.Label(
             self,
-            text="This is where you’ll build the Pay Reports workflow.\n"
-                 "Add controls here for choosing the pay period file, target, and template.",
+            text="Send each employee their pay report for the period: one email with their line items,\n"
+                 f"plus the same lines as an attached spreadsheet. The workbook needs a '{self.EXPECTED_SHEET}' sheet.",
             justify="center"
         )
         info.grid(row=1, column=0, pady=(0, 20))
 
-        # Example placeholder controls
-        sample_frame = ttk.LabelFrame(self, text="Next Steps")
-        sample_frame.grid(row=2, column=0, padx=12, pady=12, sticky="n")
-        ttk.Label(sample_frame, text="• Pick SharePoint file\n• Build context\n• Render & Send").pack(padx=10, pady=10)
+        # Row 2: File Picker
+        row_file = ttk.Frame(self)
+        row_file.grid(row=2, column=0, sticky="ew", pady=(0, 2))
+        row_file.columnconfigure(1, weight=1)
+
+        ttk.Label(row_file, text="Pay period file:").grid(row=0, column=0, padx=(0, 6))
+        self.file_entry = ttk.Entry(row_file, textvariable=self.selected_file)
+        self.file_entry.grid(row=0, column=1, sticky="ew")
+        ttk.Button(row_file, text="Browse…", command=self.on_browse).grid(row=0, column=2, padx=(6, 0))
+        ttk.Label(row_file, text="Test redirect:").grid(row=0, column=3, padx=(12, 6))
+        ttk.Entry(row_file, textvariable=self.redirect_var, width=28).grid(row=0, column=4)
+        ttk.Label(row_file, text="On behalf of:").grid(row=0, column=5, padx=(12, 6))
+        ttk.Entry(row_file, textvariable=self.on_behalf_var, width=24).grid(row=0, column=6)
+        ttk.Checkbutton(row_file, text="Write results", variable=self.writeback_var).grid(
+            row=0, column=7, padx=(12, 0))
+        ttk.Checkbutton(row_file, text="All sheets", variable=self.all_sheets_var).grid(
+            row=0, column=8, padx=(12, 0))
+        ttk.Label(row_file, text="Allowed domains:").grid(row=1, column=3, padx=(12, 6), pady=(4, 0))
+        ttk.Entry(row_file, textvariable=self.domains_var, width=28).grid(row=1, column=4, pady=(4, 0))
+
+        # Row 3: Actions
+        row_actions = ttk.Frame(self)
+        row_actions.grid(row=3, column=0, sticky="w", pady=(0, 2))
+        ttk.Button(row_actions, text="Load data", command=self.on_load_data).grid(row=0, column=0, padx=(0, 6))
+        ttk.Button(row_actions, text="Build reports", command=self.on_build).grid(row=0, column=1)
+        ttk.Button(row_actions, text="Preview", command=self.on_preview).grid(row=0, column=2)
+        ttk.Button(row_actions, text="Send All Emails", command=self.on_send_emails).grid(row=0, column=3, padx=(6, 0))
+        ttk.Checkbutton(row_actions, text="Attach spreadsheet", variable=self.attach_var).grid(
+            row=0, column=4, padx=(12, 0))
+        ttk.Label(row_actions, text="Workers:").grid(row=0, column=5, padx=(12, 4))
+        ttk.Spinbox(row_actions, from_=1, to=16, width=4, textvariable=self.workers_var).grid(row=0, column=6)
+        ttk.Label(row_actions, text="Send from:").grid(row=0, column=7, padx=(12, 4))
+        ttk.Entry(row_actions, textvariable=self.mailboxes_var, width=30).grid(row=0, column=8)
+        self.pause_button = ttk.Button(row_actions, text="Pause", command=self.on_pause, state="disabled")
+        self.pause_button.grid(row=0, column=9, padx=(12, 0))
+        self.cancel_button = ttk.Button(row_actions, text="Cancel", command=self.on_cancel, state="disabled")
+        self.cancel_button.grid(row=0, column=10)
+        ttk.Button(row_actions, text="Release in-doubt…", command=self.on_release_in_doubt).grid(
+            row=0, column=11, padx=(6, 0))
+        self.rate_label = ttk.Label(row_actions, text="")  # live throughput / ETA
+        self.rate_label.grid(row=0, column=12, padx=(12, 0))
+
+        # Row 4: Output
+        self._build_output_tabs()
 
+        # Row 5: Back Button
         back = ttk.Button(self, text="← Back to Home", command=lambda: controller.show_page("HomePage"))
-        back.grid(row=3, column=0, pady=(20, 0))
+        back.grid(row=5, column=0, pady=(20, 0))
+
+    # ---------- handlers ----------
+    def on_browse(self):
+        paths = filedialog.askopenfilenames(
+            title="Select pay period file(s)",
+            filetypes=[
+                ("Excel files", "*.xlsx *.xlsm"),
+                ("All files", "*.*"),
+            ],
+        )
+        if paths:
+            self.selected_file.set("; ".join(paths))
+            self.log(f"Selected file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}")
+
+    def on_load_data(self):
+        """Read the 'Pay Report' sheet (or several sheets/workbooks) once and run the pre-flight checks."""
+        paths = self._require_paths()
+        if not paths:
+            return
+        path = paths[0]
+
+        from utils import pay_reports
+        from utils.workbook_loader import SOURCE_ROW, WorkbookError
+        multi = len(paths) > 1 or self.all_sheets_var.get()
+        try:
+            if multi:
+                # Parsed in a process pool and stacked with Source File / Sheet / Row columns
+                self.df, skipped = pay_reports.load_pay_reports_many(
+                    paths, self.workbook_cache, all_sheets=self.all_sheets_var.get()
+                )
+                self.log(f"✅ Loaded {len(self.df):,} pay lines from {len(paths)} workbook(s).")
+                if skipped:
+                    self.log(f"Skipped (other headers): {', '.join(part.label for part in skipped)}")
+            else:
+                self.df = pay_reports.load_pay_report(path, self.workbook_cache)
+                self.log(f"✅ Loaded {len(self.df):,} pay lines from '{self.EXPECTED_SHEET}'.")
+            self.reports = None
+
+            domains = self._list_field(self.domains_var)
+            self._preflight_in_background(
+                functools.partial(
+                    pay_reports.preflight_pay_report,
+                    self.df,
+                    row_numbers=self.df[SOURCE_ROW] if multi else None,
+                    resolve=self._address_book(domains),
+                    allowed_domains=domains,
+                ),
+                self._show_preflight,
+            )
+        except WorkbookError as e:
+            messagebox.showerror("Unexpected workbook", str(e))
+            self.log(f"❌ {e}")
+        except PermissionError:
+            self.log(f"❌ Permission error. Close the file if it’s open in Excel:\n{path}")
+            messagebox.showerror("File locked", "Close the file in Excel and try again.")
+        except Exception as e:
+            self.log(f"❌ Load failed: {e}")
+            messagebox.showerror("Load failed", str(e))
+
+    def on_build(self):
+        """Render every employee's email and attachment in the background (no send)."""
+        if not self._ready_to_build():
+            return
+        self.log("\n[Building pay reports…]\n")
+        self._start_background(self._build_worker, False)
+        self.after(500, self._poll_reports)
+
+    def on_preview(self):
+        from utils.message_preview import RenderCache
+
+        if not self.reports:
+            messagebox.showinfo("Nothing built", "Build the reports first.")
+            return
+        self._open_preview(
+            RenderCache.from_list([report.message for report in self.reports]), "Pay report preview"
+        )
+
+    def on_send_emails(self):
+        """Build (if needed) and send every report through the send engine."""
+        if self.reports is None and not self._ready_to_build():
+            return
+        self.log("\n[Sending…]\n")
+        self._start_background(self._build_worker, True)
+        self.after(500, self._poll_reports)
+
+    def _show_preflight(self, report):
+        # Tk thread: the background pre-flight for the loaded lines finished
+        self.preflight = report
+        self.log(("⚠ " if report.errors else "✅ ") + report.summary())
+        self.issues_grid.set_frame(report.issues)
+        self.tabs.tab(self.issues_frame, text=f"Issues ({len(report.issues):,})")
+        self._export_metrics()
+        if report.errors:
+            self.tabs.select(self.issues_frame)
+
+    def _ready_to_build(self) -> bool:
+        if self.df is None or self.df.empty:
+            messagebox.showerror("No data", f"Load data from the '{self.EXPECTED_SHEET}' sheet first.")
+            return False
+        if self._preflight_pending():
+            return False
+        if self.preflight is not None and self.preflight.errors:
+            bad = len(self.preflight.error_rows)
+            return messagebox.askyesno(
+                "Rows with errors",
+                f"{bad:,} of {len(self.df):,} pay lines failed pre-flight checks (see the Issues tab).\n\n"
+                f"Build reports from the other lines and leave those out?",
+            )
+        return True
+
+    def _build_worker(self, send: bool):
+        """Background thread: partition + parallel render, then optionally send."""
+        from utils import pay_reports
+        try:
+            if self.reports is None:
+                df = self.df
+                if self.preflight is not None and self.preflight.errors:
+                    df = df[self.preflight.ok_mask(df)]
+                to_override = self.redirect_var.get().strip() or None
+                if to_override:
+                    self._ui_log(f"Test redirect: every email goes to {to_override}")
+                reports = pay_reports.build_pay_reports(
+                    df, attachments=self.attach_var.get(), to_override=to_override
+                )
+                self.reports = reports
+                self._ui_log(f"✅ Built {len(reports):,} pay reports from {len(df):,} lines.")
+                if reports and reports[0].attachment:
+                    self._ui_log(f"Attachments: {Path(reports[0].attachment).parent}")
+
+            if send:
+                reports = self.reports
+                missing = [r.employee for r in reports if not r.message.to]
+                for employee in missing:
+                    self._ui_log(f"– Skipped employee {employee}: missing Email")
+                send_on_behalf = self.on_behalf_var.get().strip() or None
+                employees = self.df[pay_reports.EMPLOYEE_COLUMN]
+                outcomes = self._new_outcome_log(employees, employees, missing) if self.writeback_var.get() else None
+                self._dispatch(
+                    pay_reports.pay_report_jobs(reports, send_on_behalf_of=send_on_behalf),
+                    len(reports) - len(missing),
+                    len(missing),
+                    outcomes=outcomes,
+                )
+        except Exception as e:
+            self._ui_log(f"❌ Error: {e}\n")
+        finally:
+            self._export_metrics()
+
+    def _poll_reports(self):
+        # Tk thread: show a finished build in the Reports tab
+        if self.reports is not None and self.reports is not self._shown_reports:
+            self._show_reports()
+        if self._sending:
+            self.after(500, self._poll_reports)
+
+    def _show_reports(self):
+        import pandas as pd
+
+        self._shown_reports = self.reports
+        self.reports_grid.set_frame(pd.DataFrame({
+            "Employee": [r.employee for r in self.reports],
+            "To": [r.message.to for r in self.reports],
+            "Lines": [r.lines for r in self.reports],
+            "Subject": [r.message.subject for r in self.reports],
+            "Attachment": [Path(r.attachment).name if r.attachment else "" for r in self.reports],
+        }))
+        self.tabs.tab(self.reports_frame, text=f"Reports ({len(self.reports):,})")
+        self.tabs.select(self.reports_frame)
+
+    # ---------- helpers ----------
+
+    def _build_output_tabs(self):
+        """Log, Reports (one row per employee) and Issues tabs."""
+        from utils.preview_grid import DataFrameGrid
+
+        self.tabs = ttk.Notebook(self)
+        self.tabs.grid(row=4, column=0, sticky="nsew")
+        self.rowconfigure(4, weight=1)
+
+        self.log_frame = ttk.Frame(self.tabs)
+        self.tabs.add(self.log_frame, text="Log")
+        self.output = tk.Text(self.log_frame, height=10, wrap="word", borderwidth=1, highlightthickness=0)
+        self.output.pack(fill="both", expand=True)
+        self.log_pipeline = LogPipeline(self.output, log_file=app_data_path("logs", "payreports.log"))
+        self.log_pipeline.start()
+        self.bridge = TkBridge(self)
+        self.bridge.start()
+
+        self.reports_frame = ttk.Frame(self.tabs)
+        self.tabs.add(self.reports_frame, text="Reports")
+        self.reports_grid = DataFrameGrid(self.reports_frame)
+        self.reports_grid.grid(row=0, column=0, sticky="nsew")
+        self.reports_frame.rowconfigure(0, weight=1)
+        self.reports_frame.columnconfigure(0, weight=1)
+
+        self.issues_frame = ttk.Frame(self.tabs)
+        self.tabs.add(self.issues_frame, text="Issues")
+        self.issues_grid = DataFrameGrid(self.issues_frame)
+        self.issues_grid.grid(row=0, column=0, sticky="nsew")
+        self.issues_frame.rowconfigure(0, weight=1)
+        self.issues_frame.columnconfigure(0, weight=1)
+
+    def log(self, text: str):
+        self.log_pipeline.write(text)
 
 
 if __name__ == "__main__":
+    # Pay reports render in a process pool; frozen builds must handle the child start-up
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        # Headless batch run, e.g. `app.py disputes file.xlsx --dry-run` (see utils/cli.py)
+        from utils.cli import main
+        sys.exit(main())
     App().mainloop()
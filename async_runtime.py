@@ -0,0 +1,687 @@
+# utils/async_runtime.py
+from __future__ import annotations
+import asyncio
+import base64
+import functools
+import queue
+import re
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterable, Iterator, Optional, Protocol
+from utils.metrics import inc, span
+from utils.send_engine import SendJob, SendResult, _message_id
+from utils.send_journal import CANCELLED, DELIVERED, FAILED, SENDING, SendJournal
+from utils.transports import DeliveryInDoubt, SmtpTransport, _first_address, split_addresses
+
+if TYPE_CHECKING:
+    from utils.throttle import Pacer
+    from utils.writeback import OutcomeLog
+
+_STOP = object()
+_DONE = object()
+_DOTS = re.compile(rb"(?m)^\.")
+
+
+# --- Loop thread ---
+class LoopThread:
+    """An asyncio event loop on its own daemon thread; coroutines are submitted from any thread."""
+
+    def __init__(self, name: str = "async-runtime"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule `coro` on the loop; returns a concurrent.futures.Future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+_shared: Optional[LoopThread] = None
+_shared_lock = threading.Lock()
+
+
+def runtime() -> LoopThread:
+    """Process-wide loop thread, started on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LoopThread()
+        return _shared
+
+
+# --- Run control ---
+class RunControl:
+    """
+    Pause, resume and cancel for one run; every method may be called from any
+    thread (Tk buttons, a signal handler). The engine binds it to its loop.
+
+    - pause(): workers finish the message in hand and wait before the next one.
+    - cancel(): in-flight messages finish; everything still queued is reported
+      (and journaled) as cancelled. A paused run is woken up to wind down.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paused = False
+        self._cancelled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._gate: Optional[asyncio.Event] = None
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Called on the loop thread when a run starts."""
+        with self._lock:
+            self._loop = loop
+            self._gate = asyncio.Event()
+            if not self._paused or self._cancelled:
+                self._gate.set()
+
+    def pause(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._paused = True
+            self._signal(False)
+
+    def resume(self) -> None:
+        with self._lock:
+            self._paused = False
+            self._signal(True)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            self._signal(True)
+
+    async def wait(self) -> None:
+        """Return once the run is not paused (loop thread only)."""
+        await self._gate.wait()
+
+    def _signal(self, open_gate: bool) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._gate.set if open_gate else self._gate.clear)
+
+
+# --- Senders ---
+class AsyncSender(Protocol):
+    """What AsyncSendEngine drives: `send()` takes send_html keyword arguments and returns a message id."""
+
+    async def open(self) -> None: ...
+    async def close(self) -> None: ...
+    async def send(self, message: dict) -> Optional[str]: ...
+
+
+class ExecutorSender:
+    """
+    A blocking sender (OutlookEmailSender over COM, or a PacedSender/PooledSender
+    around one) behind the AsyncSender interface.
+
+    - `threads` dedicated threads each open their own sender via
+      `sender_factory()` and keep it for the run, so every COM object stays in
+      the apartment that created it; only message ids cross back to the loop.
+    - send() hands the message to the next free thread and awaits a future
+      completed with call_soon_threadsafe; at most `threads` sends are in flight.
+    - A thread whose sender fails to open drops out; the others take its
+      share. open() fails only when none of them could start.
+    """
+
+    def __init__(self, sender_factory: Callable[[], Any], *, threads: int = 4):
+        self.sender_factory = sender_factory
+        self.threads = max(1, int(threads))
+        self._work: "queue.Queue[Any]" = queue.Queue()
+        self._started: list[threading.Thread] = []
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._work = queue.Queue()
+        ready = [loop.create_future() for _ in range(self.threads)]
+        self._started = [
+            threading.Thread(target=self._serve, args=(loop, f), daemon=True, name=f"send-worker-{i}")
+            for i, f in enumerate(ready)
+        ]
+        for t in self._started:
+            t.start()
+        errors = [e for e in await asyncio.gather(*ready) if e is not None]
+        if len(errors) == len(ready):
+            await self.close()
+            raise errors[0]
+
+    async def close(self) -> None:
+        for _ in self._started:
+            self._work.put(_STOP)
+        threads, self._started = self._started, []
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [t.join() for t in threads])
+
+    async def send(self, message: dict) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._work.put((message, future, loop))
+        return await future
+
+    def _serve(self, loop: asyncio.AbstractEventLoop, ready: asyncio.Future) -> None:
+        try:
+            sender = self.sender_factory()
+            sender.__enter__()
+        except Exception as e:
+            loop.call_soon_threadsafe(_settle, ready, e, None)
+            return
+        loop.call_soon_threadsafe(_settle, ready, None, None)
+        try:
+            while True:
+                item = self._work.get()
+                if item is _STOP:
+                    break
+                message, future, owner = item
+                try:
+                    message_id = _message_id(sender.send_html(**message))
+                except Exception as e:
+                    owner.call_soon_threadsafe(_settle, future, None, e)
+                else:
+                    owner.call_soon_threadsafe(_settle, future, message_id, None)
+        finally:
+            sender.__exit__(None, None, None)
+
+
+class AsyncSmtpSender:
+    """
+    Native asyncio SMTP client, so hundreds of sends can be in flight without a
+    thread (or blocking socket) each.
+
+    - Takes its server, login, TLS and keepalive settings from a SmtpTransport
+      and builds messages with its build_message (and AttachmentStore).
+    - Up to `connections` kept-alive sessions; an idle one older than the
+      keepalive is probed with NOOP before reuse.
+    - EHLO, STARTTLS, AUTH PLAIN/LOGIN; MAIL FROM and RCPT TO are pipelined
+      when the server advertises PIPELINING.
+    - Failures raise smtplib's exception types, so the Pacer classifies them
+      exactly like SmtpTransport's.
+    - Each send goes through `pacer` with Pacer.call_async. There is no
+      SenderPool here: every message uses the transport's single login.
+    """
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        transport: SmtpTransport,
+        *,
+        connections: int = 100,
+        pacer: Optional["Pacer"] = None,
+        send_on_behalf_of: Optional[str] = None,
+    ):
+        self.transport = transport
+        self.connections = max(1, int(connections))
+        self.pacer = pacer
+        self.send_on_behalf_of = send_on_behalf_of
+
+        self._idle: list[tuple[_SmtpConnection, float]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._hostname = "localhost"
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.connections)
+        self._hostname = await loop.run_in_executor(None, socket.getfqdn)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(conn.quit() for conn, _ in idle))
+
+    async def send(self, message: dict) -> Optional[str]:
+        kwargs = dict(message)
+        kwargs["send_on_behalf_of"] = kwargs.get("send_on_behalf_of") or self.send_on_behalf_of
+        if self.pacer is None:
+            return await self._send(kwargs)
+        addrs = split_addresses(kwargs.get("to", ""))
+        domain = addrs[0].rpartition("@")[2] if addrs else ""
+        return await self.pacer.call_async(lambda: self._send(kwargs), domain=domain)
+
+    async def _send(self, kwargs: dict) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        # MIME building and encoding is CPU work; keep it off the loop
+        msg, payload = await loop.run_in_executor(None, functools.partial(self._prepare, kwargs))
+        if kwargs.get("preview"):
+            return msg.get("Message-ID")
+
+        rcpts = split_addresses(kwargs.get("to")) + split_addresses(kwargs.get("cc")) + split_addresses(kwargs.get("bcc"))
+        if not rcpts:
+            raise ValueError("No recipients given.")
+        envelope_from = self.transport.from_addr or _first_address(msg.get("Sender") or msg.get("From") or "")
+        with span("send", backend=self.name):
+            await self._deliver(envelope_from, rcpts, payload)
+        inc("messages_sent_total", backend=self.name)
+        return msg.get("Message-ID")
+
+    def _prepare(self, kwargs: dict):
+        msg = self.transport.build_message(
+            html_body=kwargs["html_body"], to=kwargs["to"], subject=kwargs["subject"], cc=kwargs.get("cc", ""),
+            attachments=kwargs.get("attachments"), send_on_behalf_of=kwargs.get("send_on_behalf_of"),
+            reply_to=kwargs.get("reply_to"), from_addr=(kwargs.get("account_smtp") or "").lower() or None,
+        )
+        return msg, msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+
+    async def _deliver(self, from_addr: str, rcpts: list[str], payload: bytes) -> dict:
+        # One retry on a connection the server closed underneath us
+        for attempt in (1, 2):
+            conn = await self._acquire()
+            try:
+                with span("smtp_call", op="transact"):
+                    refused = await conn.transact(from_addr, rcpts, payload)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # Server answered; the connection itself is still good
+                self._release(conn)
+                raise
+            except DeliveryInDoubt:
+                self._discard(conn)
+                raise
+            except OSError:
+                # Lost before DATA, so nothing can have been accepted yet
+                self._discard(conn)
+                if attempt == 2:
+                    raise
+                continue
+            except BaseException:
+                self._discard(conn)
+                raise
+            self._release(conn)
+            return refused
+        return {}
+
+    # --- Pool ---
+    async def _acquire(self) -> "_SmtpConnection":
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.transport.keepalive:
+                    return conn
+                try:
+                    if (await conn.command("NOOP"))[0] == 250:
+                        return conn
+                except OSError:
+                    pass
+                conn.abort()
+            with span("smtp_call", op="connect"):
+                return await _SmtpConnection.connect(self.transport, self._hostname)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: "_SmtpConnection") -> None:
+        self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, conn: "_SmtpConnection") -> None:
+        conn.abort()
+        self._slots.release()
+
+
+class _SmtpConnection:
+    """One SMTP session over asyncio streams (the protocol half of AsyncSmtpSender)."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, timeout: float):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.extensions: dict[str, str] = {}
+
+    @classmethod
+    async def connect(cls, t: SmtpTransport, hostname: str) -> "_SmtpConnection":
+        context = t.ssl_context or ssl.create_default_context()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(t.host, t.port, ssl=context if t.use_ssl else None), t.timeout
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out connecting to {t.host}:{t.port}") from None
+        conn = cls(reader, writer, t.timeout)
+        try:
+            code, resp = await conn.reply()
+            if code != 220:
+                raise smtplib.SMTPConnectError(code, resp)
+            await conn.ehlo(hostname)
+            if t.starttls and "starttls" in conn.extensions:
+                code, resp = await conn.command("STARTTLS")
+                if code != 220:
+                    raise smtplib.SMTPResponseException(code, resp)
+                await writer.start_tls(context, server_hostname=t.host)
+                await conn.ehlo(hostname)
+            if t.username and t.password:
+                await conn.login(t.username, t.password)
+        except BaseException:
+            conn.abort()
+            raise
+        return conn
+
+    # --- Commands ---
+    async def reply(self) -> tuple[int, bytes]:
+        lines = []
+        while True:
+            try:
+                line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Timed out waiting for the SMTP server") from None
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            try:
+                code = int(line[:3])
+            except ValueError:
+                raise smtplib.SMTPServerDisconnected(f"Malformed reply: {line[:80]!r}") from None
+            lines.append(line[4:].strip())
+            if line[3:4] != b"-":
+                return code, b"\n".join(lines)
+
+    async def command(self, line: str) -> tuple[int, bytes]:
+        self.writer.write(line.encode("ascii") + b"\r\n")
+        await self.writer.drain()
+        return await self.reply()
+
+    async def ehlo(self, hostname: str) -> None:
+        code, resp = await self.command(f"EHLO {hostname}")
+        if code != 250:
+            code, resp = await self.command(f"HELO {hostname}")
+            if code != 250:
+                raise smtplib.SMTPHeloError(code, resp)
+            self.extensions = {}
+            return
+        self.extensions = {}
+        for entry in resp.decode("latin-1").split("\n")[1:]:
+            keyword, _, params = entry.partition(" ")
+            self.extensions[keyword.lower()] = params
+
+    async def login(self, username: str, password: str) -> None:
+        mechanisms = self.extensions.get("auth", "").upper().split()
+        if "PLAIN" in mechanisms:
+            token = base64.b64encode(f"\0{username}\0{password}".encode("utf-8")).decode("ascii")
+            code, resp = await self.command(f"AUTH PLAIN {token}")
+        elif "LOGIN" in mechanisms:
+            code, resp = await self.command("AUTH LOGIN")
+            for value in (username, password):
+                if code != 334:
+                    break
+                code, resp = await self.command(base64.b64encode(value.encode("utf-8")).decode("ascii"))
+        else:
+            raise smtplib.SMTPException("No suitable authentication method found.")
+        if code not in (235, 503):
+            raise smtplib.SMTPAuthenticationError(code, resp)
+
+    async def transact(self, from_addr: str, rcpts: list[str], payload: bytes) -> dict:
+        """MAIL/RCPT/DATA for one message, pipelining the envelope when supported."""
+        opts = f" SIZE={len(payload)}" if "size" in self.extensions else ""
+        mail = f"MAIL FROM:{smtplib.quoteaddr(from_addr)}{opts}"
+
+        refused: dict = {}
+        if "pipelining" in self.extensions:
+            lines = [mail] + [f"RCPT TO:{smtplib.quoteaddr(r)}" for r in rcpts]
+            self.writer.write(("\r\n".join(lines) + "\r\n").encode("ascii"))
+            await self.writer.drain()
+            mail_code, mail_resp = await self.reply()
+            for r in rcpts:
+                code, resp = await self.reply()
+                if code not in (250, 251):
+                    refused[r] = (code, resp)
+            if mail_code != 250:
+                await self.reset()
+                raise smtplib.SMTPSenderRefused(mail_code, mail_resp, from_addr)
+        else:
+            code, resp = await self.command(mail)
+            if code != 250:
+                await self.reset()
+                raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+            for r in rcpts:
+                code, resp = await self.command(f"RCPT TO:{smtplib.quoteaddr(r)}")
+                if code not in (250, 251):
+                    refused[r] = (code, resp)
+
+        if len(refused) == len(rcpts):
+            await self.reset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        try:
+            code, resp = await self.command("DATA")
+            if code != 354:
+                await self.reset()
+                raise smtplib.SMTPDataError(code, resp)
+            data = _DOTS.sub(b"..", payload)
+            if not data.endswith(b"\r\n"):
+                data += b"\r\n"
+            self.writer.write(data + b".\r\n")
+            await self.writer.drain()
+            code, resp = await self.reply()
+        except smtplib.SMTPResponseException:
+            raise
+        except OSError as e:
+            raise DeliveryInDoubt(f"Connection lost during DATA; the server may have accepted the message: {e}") from e
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    async def reset(self) -> None:
+        try:
+            await self.command("RSET")
+        except smtplib.SMTPException:
+            pass
+
+    async def quit(self) -> None:
+        try:
+            await self.command("QUIT")
+        except Exception:
+            pass
+        self.abort()
+
+    def abort(self) -> None:
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+# --- Engine ---
+class AsyncSendEngine:
+    """
+    SendEngine's interface on the asyncio runtime: `run()` yields SendResults in
+    submission order and `stop()` cancels, but the sends are tasks on the loop
+    thread instead of one thread each.
+
+    - `concurrency` worker tasks pull from a bounded queue, so a slow server
+      pushes back on the job source instead of piling up rendered messages.
+    - The job iterable is advanced in the default executor a block at a time,
+      so lazy sources (outbox files, generator rendering) run alongside sends.
+    - `control` (a RunControl) pauses, resumes and cancels the run from any thread.
+    - Journal and OutcomeLog handling are SendEngine's: delivered or in-doubt
+      jobs come back skipped, each job is marked `sending` (in the executor)
+      just before its send and the outcome recorded as soon as the send returns.
+    """
+
+    def __init__(
+        self,
+        sender: AsyncSender,
+        *,
+        concurrency: int = 64,
+        queue_size: Optional[int] = None,
+        journal: Optional[SendJournal] = None,
+        outcomes: Optional["OutcomeLog"] = None,
+        control: Optional[RunControl] = None,
+        loop_thread: Optional[LoopThread] = None,
+    ):
+        self.sender = sender
+        self.concurrency = max(1, int(concurrency))
+        self.queue_size = queue_size or self.concurrency * 2
+        self.journal = journal
+        self.outcomes = outcomes
+        self.control = control or RunControl()
+        self.loop_thread = loop_thread or runtime()
+
+    def stop(self) -> None:
+        """Stop feeding new jobs; in-flight messages finish, queued ones are reported as cancelled."""
+        self.control.cancel()
+
+    def pause(self) -> None:
+        self.control.pause()
+
+    def resume(self) -> None:
+        self.control.resume()
+
+    def run(self, jobs: Iterable[SendJob]) -> Iterator[SendResult]:
+        results: "queue.Queue[Any]" = queue.Queue()
+        done = self.loop_thread.submit(self._run(jobs, results.put))
+
+        # Re-order completions back into submission order
+        pending: dict[int, SendResult] = {}
+        next_seq = 0
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                if self.outcomes is not None:
+                    self.outcomes.record(item)
+                pending[item.seq] = item
+                while next_seq in pending:
+                    yield pending.pop(next_seq)
+                    next_seq += 1
+            # Anything left means seq numbers had gaps; flush what we have in order
+            for seq in sorted(pending):
+                yield pending[seq]
+        finally:
+            # Also reached when the caller abandons the generator early
+            self.control.cancel()
+            done.result()
+            if self.journal is not None:
+                self.journal.flush()
+
+    # --- Loop thread ---
+    async def _run(self, jobs: Iterable[SendJob], emit: Callable[[Any], None]) -> None:
+        self.control.bind(asyncio.get_running_loop())
+        work: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=self.queue_size)
+        error = None
+        try:
+            await self.sender.open()
+        except Exception as e:
+            # Fail the jobs instead of leaving them unreported
+            error = f"Could not start sender: {e}"
+        workers = [asyncio.create_task(self._work(work, emit, error)) for _ in range(self.concurrency)]
+        try:
+            await self._feed(jobs, work, emit)
+        except BaseException as e:
+            # The job iterable itself failed; queued jobs are reported cancelled
+            self.control.cancel()
+            emit(e)
+        finally:
+            try:
+                for _ in workers:
+                    await work.put(_STOP)
+                await asyncio.gather(*workers, return_exceptions=True)
+                if error is None:
+                    await self.sender.close()
+            finally:
+                emit(_DONE)
+
+    async def _feed(self, jobs: Iterable[SendJob], work: asyncio.Queue, emit: Callable[[Any], None]) -> None:
+        loop = asyncio.get_running_loop()
+        it = iter(jobs)
+        take = functools.partial(_take, it, self.queue_size)
+        while not self.control.cancelled:
+            batch = await loop.run_in_executor(None, take)
+            if not batch:
+                return
+            if self.journal is not None:
+                batch = await loop.run_in_executor(None, self._skip_handled, batch, emit)
+            for job in batch:
+                await work.put(job)
+
+    def _skip_handled(self, batch: list[SendJob], emit: Callable[[Any], None]) -> list[SendJob]:
+        """Report already-handled jobs as skipped and return the rest (executor thread)."""
+        statuses = self.journal.statuses(j.dedupe_key for j in batch if j.dedupe_key)
+        fresh = []
+        for job in batch:
+            status = statuses.get(job.dedupe_key) if job.dedupe_key else None
+            if status == DELIVERED:
+                emit(SendResult(job.seq, job.key, job.message.get("to", ""), False,
+                                skipped="already sent in an earlier run"))
+            elif status == SENDING:
+                emit(SendResult(job.seq, job.key, job.message.get("to", ""), False,
+                                skipped="in doubt: an earlier run stopped while sending it"))
+            else:
+                fresh.append(job)
+        return fresh
+
+    def _mark_sending(self, job: SendJob) -> None:
+        if self.journal is not None and job.dedupe_key:
+            self.journal.mark_sending([(job.dedupe_key, job.key, job.message.get("to", ""))])
+
+    async def _record(
+        self, job: SendJob, status: str, message_id: Optional[str] = None, error: Optional[str] = None
+    ) -> None:
+        # record() commits a batch every flush_every results or second: never on the loop thread
+        if self.journal is not None and job.dedupe_key:
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                self.journal.record, job.dedupe_key, status, message_id=message_id, error=error,
+            ))
+
+    async def _work(self, work: asyncio.Queue, emit: Callable[[Any], None], error: Optional[str]) -> None:
+        while True:
+            job = await work.get()
+            if job is _STOP:
+                return
+            to = job.message.get("to", "")
+            await self.control.wait()
+            if self.control.cancelled:
+                await self._record(job, CANCELLED)
+                emit(SendResult(job.seq, job.key, to, False, "Cancelled"))
+                continue
+            if error is not None:
+                await self._record(job, FAILED, error=error)
+                emit(SendResult(job.seq, job.key, to, False, error))
+                continue
+            try:
+                if self.journal is not None and job.dedupe_key:
+                    await asyncio.get_running_loop().run_in_executor(None, self._mark_sending, job)
+                message_id = await self.sender.send(job.message)
+            except Exception as e:
+                # In doubt stays `sending`, so a re-run skips it rather than risk a duplicate
+                await self._record(job, SENDING if isinstance(e, DeliveryInDoubt) else FAILED, error=str(e))
+                emit(SendResult(job.seq, job.key, to, False, str(e)))
+                continue
+            await self._record(job, DELIVERED, message_id=message_id)
+            emit(SendResult(job.seq, job.key, to, True, None, message_id))
+
+
+def _take(it: Iterator[SendJob], n: int) -> list[SendJob]:
+    batch = []
+    for job in it:
+        batch.append(job)
+        if len(batch) >= n:
+            break
+    return batch
+
+
+def _settle(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
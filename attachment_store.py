@@ -0,0 +1,169 @@
+# utils/attachment_store.py
+from __future__ import annotations
+import base64
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.message import EmailMessage
+from typing import Optional
+
+
+class EncodedAttachment:
+    """One file, base64-encoded once; shared by every message that attaches it."""
+
+    __slots__ = ("digest", "filename", "maintype", "subtype", "size", "encoded")
+
+    def __init__(self, digest: str, filename: str, maintype: str, subtype: str, size: int, encoded: str):
+        self.digest = digest
+        self.filename = filename
+        self.maintype = maintype
+        self.subtype = subtype
+        self.size = size
+        self.encoded = encoded
+
+    def mime_part(self) -> EmailMessage:
+        """A MIME part whose payload is the shared pre-encoded string (no re-encoding)."""
+        part = EmailMessage()
+        part["Content-Type"] = f"{self.maintype}/{self.subtype}"
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=self.filename)
+        part.set_payload(self.encoded)
+        return part
+
+
+class AttachmentStore:
+    """
+    Content-addressed cache of encoded attachments.
+
+    - Files are keyed by a hash of their bytes, so the same policy PDF attached
+      under different paths is encoded once.
+    - A (path -> size, mtime, digest) table means an unchanged file is neither
+      re-read nor re-hashed; `stat_ttl` seconds additionally skips the stat call.
+    - Files of `mmap_threshold` bytes or more are hashed and encoded straight
+      from a memory map instead of being read into a bytes object first.
+    - Encoded payloads are kept in an LRU bounded by `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 256 * 1024 * 1024,
+        mmap_threshold: int = 8 * 1024 * 1024,
+        stat_ttl: float = 5.0,
+    ):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.stat_ttl = stat_ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, EncodedAttachment]" = OrderedDict()
+        self._bytes = 0
+        self._paths: dict[str, tuple[int, int, Optional[str], float]] = {}  # path -> size, mtime, digest, checked_at
+        self.hits = 0
+        self.misses = 0
+
+    # --- Public API ---
+    def exists(self, path: str) -> bool:
+        """Cached os.path.exists for attachment paths."""
+        return self._stat(path) is not None
+
+    def get(self, path: str) -> Optional[EncodedAttachment]:
+        """Encoded attachment for `path`, or None if the file does not exist."""
+        st = self._stat(path)
+        if st is None:
+            return None
+        size, mtime_ns, digest = st
+
+        if digest is not None:
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is not None:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return self._named(entry, path)
+
+        entry = self._load(path, size)
+        with self._lock:
+            self.misses += 1
+            self._paths[path] = (size, mtime_ns, entry.digest, time.monotonic())
+            existing = self._entries.get(entry.digest)
+            if existing is not None:
+                # Same content under another path: keep the first copy
+                self._entries.move_to_end(entry.digest)
+                return self._named(existing, path)
+            self._entries[entry.digest] = entry
+            self._bytes += len(entry.encoded)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old.encoded)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self._bytes = 0
+
+    # --- Internals ---
+    def _stat(self, path: str) -> Optional[tuple[int, int, Optional[str]]]:
+        if not path:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            known = self._paths.get(path)
+        if known is not None and now - known[3] < self.stat_ttl:
+            return known[:3]
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._paths.pop(path, None)
+            return None
+        digest = None
+        if known is not None and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            digest = known[2]
+        with self._lock:
+            self._paths[path] = (st.st_size, st.st_mtime_ns, digest, now)
+        return st.st_size, st.st_mtime_ns, digest
+
+    def _load(self, path: str, size: int) -> EncodedAttachment:
+        with open(path, "rb") as f:
+            if size >= self.mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+                    encoded = base64.encodebytes(data).decode("ascii")
+            else:
+                data = f.read()
+                digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+                encoded = base64.encodebytes(data).decode("ascii")
+
+        ctype, encoding = mimetypes.guess_type(path)
+        if ctype is None or encoding is not None:
+            ctype = "application/octet-stream"
+        maintype, subtype = ctype.split("/", 1)
+        return EncodedAttachment(digest, os.path.basename(path), maintype, subtype, size, encoded)
+
+    @staticmethod
+    def _named(entry: EncodedAttachment, path: str) -> EncodedAttachment:
+        """Same payload, but keep the file name the caller attached it under."""
+        name = os.path.basename(path)
+        if name == entry.filename:
+            return entry
+        return EncodedAttachment(entry.digest, name, entry.maintype, entry.subtype, entry.size, entry.encoded)
+
+
+_shared: Optional[AttachmentStore] = None
+_shared_lock = threading.Lock()
+
+
+def shared_store() -> AttachmentStore:
+    """Process-wide store used by transports that are not given their own."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AttachmentStore()
+        return _shared
@@ -0,0 +1,398 @@
+# utils/benchmarks.py
+"""
+End-to-end benchmarks for the disputes pipeline.
+
+    python -m utils.benchmarks --rows 1000 10000 100000 --out bench.json
+    python -m utils.benchmarks --rows 10000 --compare bench.json
+
+For each size a synthetic 'Emails' workbook (C:N = disputes.EXPECTED_COLUMNS) is
+generated once and reused. Each run covers these stages:
+
+    load         cold read of the workbook (no cache)
+    load_cached  the same read served from a WorkbookCache
+    validate     sheet names + header check
+    preflight    whole-sheet row checks (utils/preflight.py)
+    render       subject/body/recipient for every row
+    send_fake    SendEngine -> RecordingSender (in-process fake of OutlookEmailSender)
+    send_smtp    SendEngine -> SmtpTransport -> local SmtpSink (PIPELINING advertised)
+
+Send stages run without a Pacer (pacing would only measure the configured rate)
+but with a SendJournal, as in a real run. Results are JSON: seconds, items/s,
+p50/p99 per-message latency for send stages, and the process' peak RSS so far.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+from utils.pathing import app_data_path
+
+DEFAULT_ROWS = (1_000, 10_000, 100_000)
+
+
+# --- Synthetic data ---
+def make_workbook(path: str | Path, rows: int, *, seed: int = 0) -> Path:
+    """Write an 'Emails' sheet with the disputes header in C:N and `rows` data rows."""
+    import openpyxl
+    from utils import disputes
+
+    rng = random.Random(seed)
+    firsts = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+    lasts = ["Smith", "Nguyen", "Garcia", "Patel", "Johnson", "Kim", "Lopez", "Brown", "Davis", "Young"]
+    outcomes = ["Approved", "Denied", "Partial Credit", "Reassigned", "Needs Info"]
+    managers = [f"{rng.choice(firsts)} {rng.choice(lasts)}" for _ in range(40)]
+    # On an allowed domain so pre-flight passes; nothing here reaches a real server
+    domain = disputes.ALLOWED_DOMAINS[0] if disputes.ALLOWED_DOMAINS else "example.com"
+    recipients = [f"rep{i:04d}@{domain}" for i in range(max(1, rows // 20))]
+    start = datetime(2025, 1, 1)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(disputes.EXPECTED_SHEET)
+    pad = [None] * (disputes.FIRST_COLUMN - 1)
+    ws.append(pad + list(disputes.EXPECTED_COLUMNS))
+    for i in range(rows):
+        closer_mgr = rng.choice(managers)
+        ws.append(pad + [
+            f"{rng.choice(firsts)} {rng.choice(lasts)}",                 # Submitter
+            100_000 + i,                                                  # Project ID
+            start + timedelta(days=rng.randrange(365)),                   # Appt Date
+            rng.choice(outcomes),                                         # Requested Outcome
+            "Customer rescheduled twice; " * rng.randrange(1, 4),         # Context
+            f"{rng.choice(firsts)} {rng.choice(lasts)}",                 # Closer
+            rng.choice(outcomes),                                         # Outcome
+            None if rng.random() < 0.3 else "Reviewed by disputes team",  # Outcome Note
+            closer_mgr,                                                   # Closer Manager
+            rng.choice(firsts),                                           # Setter Mgr First
+            closer_mgr.split()[0],                                        # Closer Mgr First
+            rng.choice(recipients),                                       # Email-To
+        ])
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def workbook_for(rows: int, data_dir: Path, *, seed: int = 0) -> Path:
+    """Generated workbook for `rows`, reused across runs."""
+    path = data_dir / f"emails_v2_{rows}_{seed}.xlsx"
+    if not path.exists():
+        make_workbook(path, rows, seed=seed)
+    return path
+
+
+# --- Fakes ---
+class RecordingSender:
+    """
+    In-process stand-in for OutlookEmailSender: same context-manager API and
+    send_html signature, records what would have been sent. `latency` seconds
+    of sleep per message approximates a COM round-trip.
+    """
+
+    def __init__(self, *, latency: float = 0.0, sent: Optional[list] = None):
+        self.latency = latency
+        self.sent = [] if sent is None else sent
+
+    def __enter__(self) -> "RecordingSender":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+    def send_html(self, *, html_body: str, to: str, subject: str, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self.sent.append((to, subject, len(html_body)))
+        return None
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True  # one small reply per command; don't wait on delayed ACKs
+
+    def handle(self) -> None:
+        server: SmtpSink = self.server  # type: ignore[assignment]
+        self._reply(b"220 sink ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb in (b"EHLO",):
+                self.wfile.write(b"250-sink\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n")
+            elif verb == b"HELO":
+                self._reply(b"250 sink")
+            elif verb in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self._reply(b"250 OK")
+            elif verb == b"DATA":
+                self._reply(b"354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data in iter(self.rfile.readline, b""):
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                server.record(size)
+                self._reply(b"250 OK queued")
+            elif verb == b"QUIT":
+                self._reply(b"221 Bye")
+                return
+            else:
+                self._reply(b"502 Command not implemented")
+
+    def _reply(self, text: bytes) -> None:
+        self.wfile.write(text + b"\r\n")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """
+    Minimal local SMTP server that accepts and discards mail, counting messages
+    and bytes. Advertises PIPELINING so the transport's pipelined path is used.
+
+        with SmtpSink() as sink:
+            SmtpTransport("127.0.0.1", sink.port, starttls=False)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SinkHandler)
+        self.port = self.server_address[1]
+        self.messages = 0
+        self.bytes = 0
+        self._count_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, size: int) -> None:
+        with self._count_lock:
+            self.messages += 1
+            self.bytes += size
+
+    def __enter__(self) -> "SmtpSink":
+        self._thread = threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        self.server_close()
+
+
+class _TimedSender:
+    """Records per-message send_html latency of the wrapped sender."""
+
+    def __init__(self, sender, latencies: list[float]):
+        self.sender = sender
+        self.latencies = latencies
+
+    def __enter__(self) -> "_TimedSender":
+        self.sender.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.sender.__exit__(exc_type, exc, tb)
+
+    def send_html(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.sender.send_html(**kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+# --- Measurement ---
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", None) or info.rss  # peak_wset is Windows-only
+        return round(peak / 2**20, 1)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 2**20 if sys.platform == "darwin" else rss / 1024, 1)  # bytes on macOS, KB elsewhere
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _stage(rows: int, name: str, fn: Callable[[], int], latencies: Optional[list[float]] = None) -> dict:
+    started = time.perf_counter()
+    items = fn()
+    seconds = time.perf_counter() - started
+    result = {
+        "rows": rows,
+        "stage": name,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "per_second": round(items / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if latencies is not None:
+        p50, p99 = _percentile(latencies, 50), _percentile(latencies, 99)
+        result["p50_ms"] = None if p50 is None else round(p50 * 1000, 3)
+        result["p99_ms"] = None if p99 is None else round(p99 * 1000, 3)
+    return result
+
+
+def run_size(
+    rows: int,
+    *,
+    data_dir: Path,
+    workers: int = 4,
+    send_rows: Optional[int] = None,
+    fake_latency: float = 0.0,
+    smtp: bool = True,
+) -> list[dict]:
+    """All stages for one workbook size."""
+    from utils import disputes
+    from utils.email_sender import OutlookEmailSender
+    from utils.send_engine import SendEngine, SendJob
+    from utils.send_journal import SendJournal
+    from utils.transports import SmtpTransport
+    from utils.workbook_cache import WorkbookCache
+
+    path = workbook_for(rows, data_dir)
+    results = []
+    state: dict = {}
+
+    def load() -> int:
+        state["df"] = disputes.load_disputes(path)
+        return len(state["df"])
+
+    results.append(_stage(rows, "load", load))
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        cache = WorkbookCache(Path(tmp) / "cache")
+        disputes.load_disputes(path, cache)  # prime
+        results.append(_stage(rows, "load_cached", lambda: len(disputes.load_disputes(path, cache))))
+        # One workbook checked per call, so per_second is validations per second
+        results.append(_stage(rows, "validate", lambda: len(disputes.validate_disputes(path)[:1])))
+        results.append(_stage(rows, "preflight", lambda: disputes.preflight_disputes(state["df"]).rows))
+
+        def render() -> int:
+            state["rendered"], state["keys"] = disputes.render_messages(state["df"])
+            return len(state["rendered"])
+
+        results.append(_stage(rows, "render", render))
+
+        pairs = [(m, k) for m, k in zip(state["rendered"], state["keys"]) if m.to]
+        if send_rows is not None:
+            pairs = pairs[:send_rows]
+
+        def send(name: str, make_sender: Callable[[], object]) -> None:
+            latencies: list[float] = []
+            jobs = (
+                SendJob(seq, msg.key, dict(html_body=msg.html, to=msg.to, subject=msg.subject), dedupe_key=key)
+                for seq, (msg, key) in enumerate(pairs)
+            )
+
+            def go() -> int:
+                with SendJournal(Path(tmp) / f"{name}.sqlite3") as journal:
+                    engine = SendEngine(
+                        lambda: _TimedSender(make_sender(), latencies), workers=workers, journal=journal
+                    )
+                    return sum(1 for r in engine.run(jobs) if r.ok)
+
+            results.append(_stage(rows, name, go, latencies))
+
+        sent: list = []
+        send("send_fake", lambda: RecordingSender(latency=fake_latency, sent=sent))
+
+        if smtp:
+            with SmtpSink() as sink:
+                transport = SmtpTransport(
+                    "127.0.0.1", sink.port, starttls=False, from_addr="bench@example.com", pool_size=workers
+                )
+                send("send_smtp", lambda: OutlookEmailSender(transport=transport))
+    return results
+
+
+def compare(current: list[dict], baseline: list[dict], *, tolerance: float = 0.10) -> list[str]:
+    """Lines describing stages whose throughput dropped by more than `tolerance`."""
+    base = {(r["rows"], r["stage"]): r for r in baseline}
+    regressions = []
+    for r in current:
+        old = base.get((r["rows"], r["stage"]))
+        if not old or not old.get("per_second") or not r.get("per_second"):
+            continue
+        ratio = r["per_second"] / old["per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{r['stage']} @ {r['rows']:,} rows: {old['per_second']:,.0f}/s → {r['per_second']:,.0f}/s "
+                f"({(ratio - 1) * 100:+.0f}%)"
+            )
+    return regressions
+
+
+# --- Command line ---
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmark load/validate/render/send.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--send-rows", type=int, default=10_000,
+                        help="Cap on messages per send stage (default: %(default)s; 0 = all).")
+    parser.add_argument("--fake-latency", type=float, default=0.0,
+                        help="Seconds per message in the fake sender (simulated COM).")
+    parser.add_argument("--no-smtp", action="store_true", help="Skip the SMTP sink stage.")
+    parser.add_argument("--data-dir", default=None, help="Where generated workbooks are kept.")
+    parser.add_argument("--out", help="Write results JSON here (default: stdout).")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results JSON from an earlier run.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed throughput drop before --compare fails (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data_dir or app_data_path("benchmarks"))
+    results = []
+    for rows in args.rows:
+        for r in run_size(
+            rows,
+            data_dir=data_dir,
+            workers=args.workers,
+            send_rows=args.send_rows or None,
+            fake_latency=args.fake_latency,
+            smtp=not args.no_smtp,
+        ):
+            results.append(r)
+            print(f"{r['stage']:<12} {rows:>8,} rows  {r['seconds']:>9.3f}s  "
+                  f"{r['per_second'] or 0:>12,.0f}/s", file=sys.stderr, flush=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": args.workers,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
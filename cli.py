@@ -0,0 +1,702 @@
+# utils/cli.py
+"""
+Headless batch runs (load -> validate -> render -> send -> report) for cron or
+Task Scheduler:
+
+    python app.py disputes "Disputes.xlsx" --dry-run
+    python app.py disputes "Disputes.xlsx" --digest-by to --report run.json
+    python app.py disputes "Disputes.xlsx" --spool outbox/june    # render only
+    python app.py dispatch outbox/june                             # send it later
+    python app.py disputes "Disputes.xlsx" --incremental           # only new/changed rows
+    python app.py watch "Disputes drop" --interval 300             # each new version, incrementally
+    python app.py payreports "Pay 2025-06.xlsx" --processes 8
+    python app.py disputes "Regions/*.xlsx" --dry-run              # several workbooks as one batch
+    python app.py payreports "Pay 2025-06.xlsx" --all-sheets       # one sheet per office
+    python app.py journal --release-in-doubt                       # after a crash, once Sent Items is checked
+
+Only the standard library is imported at module level; pandas, openpyxl and the
+mail backends are imported by the step that needs them, so `--help` and argument
+errors return immediately.
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Optional, Sequence
+
+# Exit codes
+EXIT_OK = 0
+EXIT_SEND_FAILURES = 1   # run completed, some messages failed
+EXIT_INVALID = 2         # bad arguments or unusable workbook; nothing was sent
+
+DIGEST_CHOICES = {"to": "Email-To"}
+SMTP_PASSWORD_ENV = "EMAIL_AUTOMATION_SMTP_PASSWORD"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="EmailAutomation",
+        description="Send Email Automation batches without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("disputes", help="Send dispute results from a workbook.")
+    p.add_argument("path", nargs="+",
+                   help="Workbook with an 'Emails' sheet (columns C:N); several files or wildcards load as one batch.")
+    _add_disputes_options(p)
+    _add_send_options(p)
+    p.set_defaults(run=run_disputes)
+
+    w = commands.add_parser("watch", help="Watch a folder and send the new/changed rows of each new workbook.")
+    w.add_argument("folder", help="Folder the weekly disputes workbooks are saved to.")
+    w.add_argument("--pattern", default="*.xlsx", help="Workbook file pattern (default: %(default)s).")
+    w.add_argument("--interval", type=float, default=60.0, help="Seconds between polls (default: %(default)s).")
+    w.add_argument("--include-existing", action="store_true",
+                   help="Also process the workbooks already in the folder when the watch starts.")
+    _add_disputes_options(w)
+    _add_send_options(w)
+    w.set_defaults(run=run_watch, incremental=True)
+
+    d = commands.add_parser("dispatch", help="Send an outbox rendered earlier with --spool.")
+    d.add_argument("outbox", help="Outbox directory.")
+    _add_send_options(d)
+    d.set_defaults(run=run_dispatch)
+
+    r = commands.add_parser("payreports", help="Send each employee their pay report from a pay period workbook.")
+    r.add_argument("path", nargs="+",
+                   help="Workbook with a 'Pay Report' sheet (columns A:J, one row per line item); "
+                        "several files or wildcards load as one batch.")
+    r.add_argument("--all-sheets", action="store_true",
+                   help="Load every sheet with the pay line header (e.g. one per office) instead of 'Pay Report'.")
+    r.add_argument("--skip-invalid", action="store_true",
+                   help="Leave out the lines that fail pre-flight checks instead of stopping on errors.")
+    r.add_argument("--dry-run", action="store_true",
+                   help="Load, validate and build only; nothing is sent or journaled.")
+    r.add_argument("--to-override", metavar="ADDRESS",
+                   help="Send every report to ADDRESS instead of the employee's Email.")
+    r.add_argument("--on-behalf-of", metavar="MAILBOX", default="",
+                   help="Mailbox to send on behalf of (default: none).")
+    r.add_argument("--no-cache", action="store_true", help="Always re-read the workbook.")
+    r.add_argument("--no-address-check", action="store_true",
+                   help="Outlook backend: skip resolving recipients against the address book in pre-flight.")
+    r.add_argument("--allowed-domains", metavar="LIST", type=_split_list, default=(),
+                   help="Pre-flight: hold back lines whose Email is outside these domains "
+                        "('corp.com; corp.net'; default: any domain).")
+    r.add_argument("--write-results", choices=("sheet", "csv"),
+                   help="After sending, record each row's outcome: 'sheet' adds a 'Send Results' sheet to the "
+                        "workbook (and a <name>.results.csv next to it), 'csv' only writes the .results.csv.")
+    r.add_argument("--no-attachments", action="store_true", help="Do not attach the line-item CSV.")
+    r.add_argument("--attachments-dir", metavar="DIR",
+                   help="Where to write the per-employee CSVs (default: app data payreports/<timestamp>).")
+    r.add_argument("--processes", type=int, metavar="N",
+                   help="Processes used to load several sheets and to build reports (default: one per CPU).")
+    _add_send_options(r)
+    r.set_defaults(run=run_payreports)
+
+    j = commands.add_parser("journal", help="Show the send journal's counts, or release messages left in doubt.")
+    j.add_argument("--release-in-doubt", action="store_true",
+                   help="Let messages a crashed run left 'sending' go again on the next run "
+                        "(check Sent Items first: any that did go out would be sent twice).")
+    j.set_defaults(run=run_journal)
+    return parser
+
+
+def _add_disputes_options(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--digest-by", choices=sorted(DIGEST_CHOICES),
+                   help="One digest email per recipient ('to') instead of one email per row.")
+    p.add_argument("--skip-invalid", action="store_true",
+                   help="Send the rows that pass pre-flight checks instead of stopping on errors.")
+    p.add_argument("--dry-run", action="store_true",
+                   help="Load, validate and render only; nothing is sent or journaled.")
+    p.add_argument("--to-override", metavar="ADDRESS",
+                   help="Send every message to ADDRESS instead of the row's Email-To.")
+    p.add_argument("--on-behalf-of", metavar="MAILBOX", default="disputes@blueravensolar.com",
+                   help="Mailbox to send on behalf of (default: %(default)s; '' to disable).")
+    p.add_argument("--no-cache", action="store_true", help="Always re-read the workbook.")
+    p.add_argument("--processes", type=int, metavar="N",
+                   help="Processes used to load several workbooks (default: one per CPU).")
+    p.add_argument("--no-address-check", action="store_true",
+                   help="Outlook backend: skip resolving recipients against the address book in pre-flight.")
+    p.add_argument("--allowed-domains", metavar="LIST", type=_split_list, default=(),
+                   help="Pre-flight: hold back rows whose Email-To is outside these domains "
+                        "('corp.com; corp.net'; default: any domain).")
+    p.add_argument("--allowed-outcomes", metavar="LIST", type=_split_list, default=(),
+                   help="Pre-flight: warn about Outcome values outside this list (default: no check).")
+    p.add_argument("--write-results", choices=("sheet", "csv"),
+                   help="After sending, record each row's outcome: 'sheet' adds a 'Send Results' sheet to the "
+                        "workbook (and a <name>.results.csv next to it), 'csv' only writes the .results.csv.")
+    p.add_argument("--spool", metavar="DIR",
+                   help="Render every message to an outbox in DIR instead of sending (see 'dispatch').")
+    inc = p.add_argument_group("Incremental runs")
+    inc.add_argument("--incremental", action="store_true",
+                     help="Only send rows that are new or changed since the last incremental run.")
+    inc.add_argument("--full-scan", action="store_true",
+                     help="With --incremental, compare the whole sheet (catches edits to older rows) "
+                          "instead of reading only the rows added below the last run.")
+    inc.add_argument("--snapshot-key", metavar="KEY",
+                     help="Name the incremental snapshot (default: the workbook path).")
+
+
+def _split_list(value: str) -> tuple[str, ...]:
+    return tuple(v.strip() for v in value.replace(",", ";").split(";") if v.strip())
+
+
+def _add_send_options(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--workers", type=int, default=4, help="Parallel sender sessions (default: %(default)s).")
+    p.add_argument("--report", metavar="FILE", help="Write the run report as JSON to FILE ('-' for stdout).")
+    p.add_argument("--metrics", metavar="DIR",
+                   help="Write span/counter events (JSON lines) and a Prometheus snapshot to DIR.")
+    p.add_argument("-q", "--quiet", action="store_true", help="Only print the summary.")
+    p.add_argument("--mailboxes", metavar="LIST",
+                   help="Spread the batch over several mailboxes, each with its own rate budget: "
+                        "'ops1@corp.com; ops2@corp.com*2/8; behalf:disputes@corp.com' "
+                        "(accounts use SendUsingAccount, behalf: ones SentOnBehalfOfName; *WEIGHT, /RATE per second). "
+                        "Outlook backend only: an SMTP login's quota is not split by From address.")
+
+    smtp = p.add_argument_group("SMTP backend (default backend is Outlook)")
+    smtp.add_argument("--smtp-host", help="Send over SMTP through this server instead of Outlook.")
+    smtp.add_argument("--smtp-port", type=int, default=587)
+    smtp.add_argument("--smtp-user")
+    smtp.add_argument("--smtp-from", help="Envelope/header sender (defaults to --smtp-user).")
+    smtp.add_argument("--smtp-ssl", action="store_true", help="Implicit TLS (usually port 465).")
+    smtp.add_argument("--smtp-password-env", default=SMTP_PASSWORD_ENV, metavar="VAR",
+                      help="Environment variable holding the SMTP password (default: %(default)s).")
+    smtp.add_argument("--concurrency", type=int, metavar="N",
+                      help="Send with the asyncio SMTP client, up to N messages (and connections) in flight, "
+                           "instead of --workers threads.")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+# --- Disputes ---
+def run_disputes(args: argparse.Namespace) -> int:
+    return _with_metrics(args, "disputes", _run_disputes)
+
+
+def run_dispatch(args: argparse.Namespace) -> int:
+    return _with_metrics(args, "dispatch", _run_dispatch)
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    """Poll `folder`; run an incremental disputes batch for each new workbook version until interrupted."""
+    from utils.incremental import FolderWatcher
+
+    out = _Console(quiet=args.quiet)
+    if not os.path.isdir(args.folder):
+        out.error(f"Folder does not exist: {args.folder}")
+        return EXIT_INVALID
+    # One snapshot for the folder, so each version is compared with the one before
+    args.snapshot_key = args.snapshot_key or os.path.abspath(args.folder)
+    watcher = FolderWatcher(args.folder, pattern=args.pattern, interval=args.interval,
+                            include_existing=args.include_existing)
+    out.info(f"Watching {args.folder} for {args.pattern} (every {args.interval:g}s; Ctrl+C to stop)")
+    code = EXIT_OK
+    try:
+        for path in watcher.watch():
+            out.summary(f"New workbook version: {path}")
+            args.path = str(path)
+            code = max(code, run_disputes(args))
+    except KeyboardInterrupt:
+        pass
+    return code
+
+
+def run_payreports(args: argparse.Namespace) -> int:
+    return _with_metrics(args, "payreports", _run_payreports)
+
+
+def run_journal(args: argparse.Namespace) -> int:
+    from utils.send_journal import SENDING, SendJournal
+
+    out = _Console()
+    with SendJournal() as journal:
+        if args.release_in_doubt:
+            out.summary(f"Released {journal.release_in_doubt():,} in-doubt message(s); the next run sends them.")
+        counts = journal.counts()
+    out.summary(f"{journal.path}: " + (", ".join(f"{status} {n:,}" for status, n in sorted(counts.items())) or "empty"))
+    if counts.get(SENDING) and not args.release_in_doubt:
+        out.summary("Messages left 'sending' are skipped as in doubt; "
+                    "check Sent Items, then run 'journal --release-in-doubt'.")
+    return EXIT_OK
+
+
+def _with_metrics(args: argparse.Namespace, kind: str, fn) -> int:
+    if not args.metrics:
+        return fn(args)
+    from utils.metrics import registry
+
+    metrics = registry()
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    metrics.open_log(os.path.join(args.metrics, f"{kind}-{stamp}.jsonl"))
+    try:
+        return fn(args)
+    finally:
+        metrics.close_log()
+        metrics.write_prometheus(os.path.join(args.metrics, f"{kind}.prom"))
+
+
+def _source_paths(args: argparse.Namespace) -> list[str]:
+    """The workbooks to load; wildcards are expanded here, since Windows shells do not."""
+    paths = []
+    for path in args.path if isinstance(args.path, list) else [args.path]:
+        matches = sorted(glob.glob(path)) if any(c in path for c in "*?[") else []
+        paths.extend(matches or [path])
+    return list(dict.fromkeys(paths))  # a file named twice (or by two patterns) loads once
+
+
+def _source_report(paths: list[str]) -> dict:
+    if len(paths) == 1:
+        return {"file": os.path.abspath(paths[0])}
+    return {"files": [os.path.abspath(p) for p in paths]}
+
+
+def _check_sources(out: "_Console", args: argparse.Namespace, paths: list[str], *, several: bool) -> bool:
+    """Every workbook exists; options that work on one workbook are not combined with several sheets."""
+    for path in paths:
+        if not os.path.exists(path):
+            out.error(f"File does not exist: {path}")
+            return False
+    if several:
+        # Both map results to rows of a single sheet
+        for option, value in (("--incremental", getattr(args, "incremental", False)),
+                              ("--write-results", args.write_results)):
+            if value:
+                out.error(f"{option} works on a single workbook sheet; load the files one at a time.")
+                return False
+    if len(paths) == 1:
+        args.path = paths[0]  # the single-workbook paths (incremental, outcome sidecar, write-back) use it
+    return True
+
+
+def _run_disputes(args: argparse.Namespace) -> int:
+    out = _Console(quiet=args.quiet)
+    paths = _source_paths(args)
+    report: dict = {
+        "command": "disputes",
+        **_source_report(paths),
+        "mode": f"digest-by-{args.digest_by}" if args.digest_by else "per-row",
+        "dry_run": args.dry_run,
+        "timings": {},
+    }
+
+    # Load + validate
+    started = time.perf_counter()
+    import pandas as pd
+    from utils import disputes
+    from utils.email_templates import text_column
+    from utils.workbook_cache import WorkbookCache
+    from utils.workbook_loader import SOURCE_ROW, WorkbookError
+
+    if not _check_sources(out, args, paths, several=len(paths) > 1):
+        return EXIT_INVALID
+    changes = None
+    try:
+        cache = None if args.no_cache else WorkbookCache()
+        if len(paths) > 1:
+            df = disputes.load_disputes_many(paths, cache, processes=args.processes)
+        elif args.incremental:
+            from utils.incremental import IncrementalLoad
+
+            changes = IncrementalLoad.open(args.path, key=args.snapshot_key, cache=cache, full=args.full_scan)
+            df = changes.changes
+        else:
+            df = disputes.load_disputes(args.path, cache)
+    except (WorkbookError, OSError) as e:
+        out.error(str(e))
+        return EXIT_INVALID
+    report["timings"]["load"] = _elapsed(started)
+    report["rows"] = len(df)
+    if changes is not None:
+        report["incremental"] = {
+            "mode": changes.mode, "new": changes.new, "changed": changes.changed, "unchanged": changes.unchanged,
+        }
+        out.info(f"{changes.summary()} ({report['timings']['load']}s)")
+    else:
+        of = f" of {len(paths)} workbooks" if len(paths) > 1 else ""
+        out.info(f"Loaded {len(df):,} rows from '{disputes.EXPECTED_SHEET}'{of} in {report['timings']['load']}s")
+
+    # Excel row numbers from the index, which is the sheet position even for a subset
+    # (or each row's own sheet, for several workbooks)
+    resolve = _address_book(out, args, args.allowed_domains)
+    loaded = df
+    df, preflight = _preflight(
+        out, args, report, df,
+        lambda d: disputes.preflight_disputes(
+            d,
+            row_numbers=d[SOURCE_ROW] if len(paths) > 1 else d.index + 2,
+            resolve=resolve,
+            allowed_domains=args.allowed_domains,
+            allowed_outcomes=args.allowed_outcomes,
+        ),
+    )
+    if df is None:
+        return EXIT_INVALID
+
+    # Render
+    started = time.perf_counter()
+    group_by = DIGEST_CHOICES[args.digest_by] if args.digest_by else None
+    rendered, keys = disputes.render_messages(df, group_by=group_by, to_override=args.to_override)
+    queued = [(msg, key) for msg, key in zip(rendered, keys) if msg.to]
+    report["timings"]["render"] = _elapsed(started)
+    report["messages"] = len(rendered)
+    report["missing_recipient"] = [str(msg.key) for msg in rendered if not msg.to]
+    out.info(f"Rendered {len(rendered):,} emails in {report['timings']['render']}s "
+             f"({len(report['missing_recipient']):,} without a recipient)")
+
+    if args.dry_run:
+        report.update(would_send=len(queued), sent=0, skipped=len(report["missing_recipient"]), failed=0, failures=[])
+        return _finish(out, args, report)
+
+    send_on_behalf = args.on_behalf_of or None
+    if args.spool:
+        from utils.outbox import Outbox, OutboxError
+
+        started = time.perf_counter()
+        try:
+            box = Outbox.create(args.spool)
+        except (OutboxError, OSError) as e:
+            out.error(str(e))
+            return EXIT_INVALID
+        count = box.spool(
+            [msg for msg, _ in queued], [key for _, key in queued],
+            send_on_behalf_of=send_on_behalf, meta={"source": report.get("file", report.get("files")), "mode": report["mode"]},
+        )
+        report["timings"]["spool"] = _elapsed(started)
+        report.update(outbox=str(box.directory), spooled=count)
+        out.summary(f"Rendered {count:,} emails to {box.directory}")
+        if changes is not None:
+            changes.commit(handled=df.index)
+        _write_report(args, report)
+        return EXIT_OK
+
+    from utils.send_engine import SendJob
+
+    jobs = (
+        SendJob(seq, msg.key, dict(
+            html_body=msg.html, to=msg.to, subject=msg.subject, send_on_behalf_of=send_on_behalf,
+        ), dedupe_key=key)
+        for seq, (msg, key) in enumerate(queued)
+    )
+    # Per-row outcomes: a digest's result applies to every row of its group
+    row_keys = text_column(loaded[group_by]) if group_by else pd.Series(loaded.index.astype(str), index=loaded.index)
+    outcomes = _outcome_log(args, row_keys, loaded["Project ID"], preflight, report["missing_recipient"])
+    code = _send(args, out, report, jobs, skipped=len(report["missing_recipient"]), outcomes=outcomes)
+    if changes is not None and "sent" in report:
+        # Rows whose send failed (or that had no recipient) stay pending for the next run
+        failed = [f["key"] for f in report["failures"]] + report["missing_recipient"]
+        changes.commit(handled=df.index, failed=failed, group_by=group_by)
+    return code
+
+
+def _address_book(out: "_Console", args: argparse.Namespace, domains):
+    """Pre-flight resolver for the Outlook backend (None for SMTP or --no-address-check)."""
+    if args.smtp_host or args.no_address_check:
+        return None
+    from utils.transports import unresolved_recipients
+
+    def resolve(addresses):
+        try:
+            return unresolved_recipients(addresses, internal_domains=domains)
+        except Exception as e:
+            out.info(f"Address book check skipped (Outlook unavailable): {e}")
+            return []
+
+    return resolve
+
+
+def _preflight(out: "_Console", args: argparse.Namespace, report: dict, df, check):
+    """Run the pre-flight `check`; returns (rows to send, or None to stop (report written), the PreflightReport)."""
+    started = time.perf_counter()
+    preflight = check(df)
+    report["timings"]["preflight"] = _elapsed(started)
+    report["preflight"] = {
+        "errors": preflight.errors,
+        "warnings": preflight.warnings,
+        "error_rows": len(preflight.error_rows),
+        "issues": preflight.issues.head(500).to_dict("records"),
+    }
+    out.info(preflight.summary())
+    if preflight.errors:
+        if not (args.skip_invalid or args.dry_run):
+            out.error("pre-flight errors; fix the sheet or pass --skip-invalid")
+            _finish_invalid(args, report)
+            return None, preflight
+        df = df[preflight.ok_mask(df)]
+    return df, preflight
+
+
+def _outcome_log(args: argparse.Namespace, row_keys, labels, preflight, missing_recipient):
+    """OutcomeLog for --write-results (None without it), with pre-flight and no-recipient rows noted."""
+    if not args.write_results:
+        return None
+    from utils.writeback import NO_RECIPIENT, OutcomeLog, sidecar_path
+
+    log = OutcomeLog(row_keys, labels=labels, sidecar=sidecar_path(args.path))
+    log.note_preflight(preflight)
+    log.note_keys(missing_recipient, NO_RECIPIENT)
+    return log
+
+
+def _write_back(out: "_Console", args: argparse.Namespace, report: dict, outcomes) -> None:
+    started = time.perf_counter()
+    try:
+        report["write_back"] = outcomes.write(workbook=args.path if args.write_results == "sheet" else None)
+    except PermissionError:
+        report["write_back"] = [str(outcomes.sidecar)]
+        out.info(f"Results sheet not written: {args.path} is open in another program "
+                 f"(results are in {outcomes.sidecar})")
+    except (OSError, KeyError, ValueError) as e:
+        report["write_back"] = [str(outcomes.sidecar)]
+        out.info(f"Results sheet not written: {e} (results are in {outcomes.sidecar})")
+    report["timings"]["write_back"] = _elapsed(started)
+    out.info(f"Wrote row outcomes ({report['timings']['write_back']}s): {'; '.join(report['write_back'])}")
+
+
+def _run_dispatch(args: argparse.Namespace) -> int:
+    from utils.outbox import Outbox, OutboxError
+
+    out = _Console(quiet=args.quiet)
+    box = Outbox(args.outbox)
+    try:
+        manifest = box.manifest
+    except (OutboxError, OSError, ValueError) as e:
+        out.error(str(e))
+        return EXIT_INVALID
+    report: dict = {
+        "command": "dispatch",
+        "outbox": str(box.directory),
+        "manifest": manifest,
+        "dry_run": False,
+        "timings": {},
+        "messages": len(box),
+    }
+    out.info(f"Sending {len(box):,} emails from {box.directory}")
+    return _send(args, out, report, box.jobs(), skipped=0)
+
+
+# --- Pay reports ---
+def _run_payreports(args: argparse.Namespace) -> int:
+    out = _Console(quiet=args.quiet)
+    paths = _source_paths(args)
+    report: dict = {
+        "command": "payreports",
+        **_source_report(paths),
+        "mode": "per-employee",
+        "dry_run": args.dry_run,
+        "timings": {},
+    }
+
+    started = time.perf_counter()
+    from utils import pay_reports
+    from utils.workbook_cache import WorkbookCache
+    from utils.workbook_loader import SOURCE_FILE, SOURCE_ROW, SOURCE_SHEET, WorkbookError
+
+    multi = len(paths) > 1 or args.all_sheets
+    if not _check_sources(out, args, paths, several=multi):
+        return EXIT_INVALID
+    try:
+        cache = None if args.no_cache else WorkbookCache()
+        if multi:
+            df, skipped_sheets = pay_reports.load_pay_reports_many(
+                paths, cache, all_sheets=args.all_sheets, processes=args.processes
+            )
+            report["sheets_skipped"] = [part.label for part in skipped_sheets]
+        else:
+            df = pay_reports.load_pay_report(paths[0], cache)
+    except (WorkbookError, OSError) as e:
+        out.error(str(e))
+        return EXIT_INVALID
+    report["timings"]["load"] = _elapsed(started)
+    report["rows"] = len(df)
+    if multi:
+        sheets = df.groupby([SOURCE_FILE, SOURCE_SHEET], observed=True).ngroups
+        out.info(f"Loaded {len(df):,} pay lines from {sheets} sheet(s) of {len(paths)} workbook(s) "
+                 f"in {report['timings']['load']}s ({len(report['sheets_skipped'])} sheet(s) with other headers skipped)")
+    else:
+        out.info(f"Loaded {len(df):,} pay lines from '{pay_reports.EXPECTED_SHEET}' in {report['timings']['load']}s")
+
+    resolve = _address_book(out, args, args.allowed_domains)
+    loaded = df
+    df, preflight = _preflight(
+        out, args, report, df,
+        lambda d: pay_reports.preflight_pay_report(
+            d, row_numbers=d[SOURCE_ROW] if multi else None, resolve=resolve,
+            allowed_domains=args.allowed_domains,
+        ),
+    )
+    if df is None:
+        return EXIT_INVALID
+
+    # Partition + parallel build (bodies and attachments)
+    started = time.perf_counter()
+    reports = pay_reports.build_pay_reports(
+        df,
+        out_dir=args.attachments_dir,
+        attachments=not (args.no_attachments or args.dry_run),
+        to_override=args.to_override,
+        processes=args.processes,
+    )
+    report["timings"]["render"] = _elapsed(started)
+    report["messages"] = len(reports)
+    report["missing_recipient"] = [r.employee for r in reports if not r.message.to]
+    out.info(f"Built {len(reports):,} pay reports in {report['timings']['render']}s "
+             f"({len(report['missing_recipient']):,} without a recipient)")
+
+    if args.dry_run:
+        would_send = len(reports) - len(report["missing_recipient"])
+        report.update(would_send=would_send, sent=0, skipped=len(report["missing_recipient"]), failed=0, failures=[])
+        return _finish(out, args, report)
+
+    jobs = pay_reports.pay_report_jobs(reports, send_on_behalf_of=args.on_behalf_of or None)
+    employees = loaded[pay_reports.EMPLOYEE_COLUMN]
+    outcomes = _outcome_log(args, employees, employees, preflight, report["missing_recipient"])
+    return _send(args, out, report, jobs, skipped=len(report["missing_recipient"]), outcomes=outcomes)
+
+
+def _send(args: argparse.Namespace, out: "_Console", report: dict, jobs, *, skipped: int, outcomes=None) -> int:
+    """
+    Run jobs through the journaled, paced engine; fills in the report's send
+    fields, and writes back the per-row `outcomes` (an OutcomeLog) when given.
+    """
+    started = time.perf_counter()
+    try:
+        make_sender, pacer = _sender_factory(args)
+    except ValueError as e:
+        out.error(str(e))
+        return EXIT_INVALID
+
+    from utils.send_engine import SendEngine
+    from utils.send_journal import SendJournal
+
+    sent, failures = 0, []
+    with SendJournal() as journal:
+        if args.concurrency and args.smtp_host:
+            from utils.async_runtime import AsyncSendEngine
+
+            # make_sender() is an AsyncSmtpSender here (see _sender_factory). On Ctrl+C
+            # in-flight messages finish and the rest are journaled as cancelled.
+            engine = AsyncSendEngine(make_sender(), concurrency=args.concurrency, journal=journal, outcomes=outcomes)
+        else:
+            engine = SendEngine(make_sender, workers=max(1, args.workers), journal=journal, outcomes=outcomes)
+        for result in engine.run(jobs):
+            if result.skipped:
+                skipped += 1
+                out.info(f"↷ Skipped row {result.key} → {result.to}: {result.skipped}")
+            elif result.ok:
+                sent += 1
+                out.info(f"✓ Sent row {result.key} → {result.to}")
+            else:
+                failures.append({"key": str(result.key), "to": result.to, "error": result.error})
+                out.info(f"✗ Failed row {result.key} → {result.to}: {result.error}")
+
+    report["timings"]["send"] = _elapsed(started)
+    report.update(sent=sent, skipped=skipped, failed=len(failures), failures=failures, pacing=pacer.describe())
+    if outcomes is not None and len(outcomes):
+        # Nothing to record (e.g. a watch run with no new rows) leaves the workbook untouched
+        _write_back(out, args, report, outcomes)
+    return _finish(out, args, report)
+
+
+def _sender_factory(args: argparse.Namespace):
+    """
+    (make_sender, pacer) for the chosen backend; every worker shares the pacer,
+    or with --mailboxes the SenderPool (one pacer per mailbox; Outlook only).
+    With --concurrency on the SMTP backend, make_sender() returns the AsyncSmtpSender.
+    """
+    from utils.email_sender import OutlookEmailSender
+    from utils.sender_pool import PooledSender, pool_from_spec
+    from utils.throttle import PacedSender, Pacer
+    from utils.transports import SmtpTransport
+
+    pool = pool_from_spec(args.mailboxes)
+    transport = None
+    if pool is not None and args.smtp_host:
+        # One SMTP login: other From addresses neither add quota nor work without Send As
+        raise ValueError("--mailboxes needs the Outlook backend; it cannot be combined with --smtp-host.")
+    if args.smtp_host:
+        if args.smtp_user and not os.environ.get(args.smtp_password_env):
+            raise ValueError(f"Set {args.smtp_password_env} to the SMTP password for {args.smtp_user}.")
+        # One pooled transport shared by all workers
+        transport = SmtpTransport(
+            args.smtp_host, args.smtp_port,
+            username=args.smtp_user,
+            password=os.environ.get(args.smtp_password_env),
+            from_addr=args.smtp_from,
+            use_ssl=args.smtp_ssl,
+            pool_size=max(1, args.workers),
+        )
+    pacer = pool or Pacer()
+    send_on_behalf = getattr(args, "on_behalf_of", None) or None
+
+    if transport is not None and args.concurrency:
+        from utils.async_runtime import AsyncSmtpSender
+
+        def make_async_sender():
+            return AsyncSmtpSender(
+                transport, connections=args.concurrency, pacer=pacer, send_on_behalf_of=send_on_behalf,
+            )
+
+        return make_async_sender, pacer
+
+    def make_sender():
+        sender = OutlookEmailSender(send_on_behalf_of=send_on_behalf, transport=transport)
+        return PooledSender(sender, pool) if pool is not None else PacedSender(sender, pacer)
+
+    return make_sender, pacer
+
+
+# --- Reporting ---
+def _finish_invalid(args: argparse.Namespace, report: dict) -> None:
+    """Still write the report when a run stops before sending, so the issues are visible."""
+    report.update(sent=0, skipped=0, failed=0, failures=[])
+    _write_report(args, report)
+
+
+def _finish(out: "_Console", args: argparse.Namespace, report: dict) -> int:
+    if report["dry_run"]:
+        head = f"Would send: {report['would_send']:,}"
+    else:
+        head = f"Sent: {report['sent']:,}"
+    out.summary(f"{head} | Skipped: {report['skipped']:,} | Failed: {report['failed']:,}")
+    _write_report(args, report)
+    return EXIT_SEND_FAILURES if report["failed"] else EXIT_OK
+
+
+def _write_report(args: argparse.Namespace, report: dict) -> None:
+    if args.report == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False, default=str)
+        sys.stdout.write("\n")
+    elif args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+
+
+class _Console:
+    """Everything goes to stderr so `--report -` leaves stdout as clean JSON."""
+
+    def __init__(self, *, quiet: bool = False):
+        self.quiet = quiet
+
+    def info(self, text: str) -> None:
+        if not self.quiet:
+            print(text, file=sys.stderr, flush=True)
+
+    def summary(self, text: str) -> None:
+        print(text, file=sys.stderr, flush=True)
+
+    def error(self, text: str) -> None:
+        print(f"error: {text}", file=sys.stderr, flush=True)
+
+
+def _elapsed(started: float) -> float:
+    return round(time.perf_counter() - started, 3)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# utils/disputes.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, Optional
+import pandas as pd
+from utils.email_templates import RenderedEmail, compile_template, load_template, render_batch, text_column
+from utils.metrics import inc, span
+from utils.preflight import PreflightReport, Resolver, run_preflight
+from utils.send_journal import message_key
+from utils.workbook_cache import WorkbookCache
+from utils.workbook_loader import (
+    CATEGORY, DATETIME, TEXT, StreamingWorkbook, WorkbookError, load_parts, validate_workbook, workbook_parts,
+)
+
+EXPECTED_SHEET = "Emails"
+# Columns C:N inclusive (12 columns), in order:
+EXPECTED_COLUMNS = [
+    "Submitter",
+    "Project ID",
+    "Appt Date",
+    "Requested Outcome",
+    "Context",
+    "Closer",
+    "Outcome",
+    "Outcome Note",
+    "Closer Manager",
+    "Setter Mgr First",
+    "Closer Mgr First",
+    "Email-To",
+]
+FIRST_COLUMN = 3  # column C
+# Loaded dtypes (utils/workbook_loader.apply_schema): people, outcomes and addresses repeat
+# down the sheet and are stored once each as categoricals
+SCHEMA = {
+    "Submitter": CATEGORY,
+    "Project ID": TEXT,
+    "Appt Date": DATETIME,
+    "Requested Outcome": CATEGORY,
+    "Context": TEXT,
+    "Closer": CATEGORY,
+    "Outcome": CATEGORY,
+    "Outcome Note": TEXT,
+    "Closer Manager": CATEGORY,
+    "Setter Mgr First": CATEGORY,
+    "Closer Mgr First": CATEGORY,
+    "Email-To": CATEGORY,
+}
+RECIPIENT_COLUMN = "Email-To"
+SUBJECT_TEMPLATE = "Dispute Result – Project {{ Project ID }} – {{ Requested Outcome || Outcome }}"
+BODY_TEMPLATE = "dispute_result.html"  # under templates/
+DIGEST_SUBJECT_TEMPLATE = "Dispute Results – {{ Count }} project(s)"
+DIGEST_TEMPLATE = "dispute_digest.html"
+DIGEST_ROW_TEMPLATE = "dispute_digest_row.html"
+# Columns a digest can be grouped by (one email per distinct value). Only the
+# recipient column: a digest per Closer Manager would go to every closer in the
+# group (each seeing the others' results) and never to the manager, for whom the
+# sheet has no address.
+DIGEST_GROUPS = (RECIPIENT_COLUMN,)
+# Pre-flight rules (utils/preflight.py)
+REQUIRED_COLUMNS = ("Project ID", "Outcome", RECIPIENT_COLUMN)
+# Optional restrictions, off unless configured (e.g. --allowed-domains): recipients
+# outside these domains are an error, Outcome values outside these a warning
+ALLOWED_DOMAINS: tuple[str, ...] = ()
+ALLOWED_OUTCOMES: tuple[str, ...] = ()
+# Bump when the loaded frame changes shape/dtypes so cached copies are ignored
+CACHE_NAMESPACE = "disputes-v2"
+
+
+def load_disputes(path: str | Path, cache: Optional[WorkbookCache] = None) -> pd.DataFrame:
+    """Stream C:N from the 'Emails' sheet in a single read-only pass (or serve it from cache)."""
+    if cache is not None:
+        with span("workbook_cache_lookup"):
+            hit = cache.get(path, CACHE_NAMESPACE)
+        if hit is not None:
+            inc("workbook_cache_hits_total")
+            return hit[0]
+
+    with span("workbook_load") as fields:
+        with StreamingWorkbook(
+            path, EXPECTED_SHEET, EXPECTED_COLUMNS, first_col=FIRST_COLUMN, schema=SCHEMA
+        ) as wb:
+            wb.check_header()
+            df = wb.read_frame()
+            sheet_names = wb.sheet_names
+        fields["rows"] = len(df)
+    inc("workbook_rows_total", len(df))
+
+    if cache is not None:
+        cache.put(path, CACHE_NAMESPACE, df, {"sheets": sheet_names})
+    return df
+
+
+def load_disputes_many(
+    paths: Iterable[str | Path], cache: Optional[WorkbookCache] = None, *, processes: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    The 'Emails' sheet of every workbook in `paths` (e.g. one per region),
+    parsed in a process pool and stacked into one frame with Source File /
+    Source Sheet / Source Row columns (see workbook_loader.load_parts).
+    """
+    paths = list(paths)
+    with span("workbook_load_many") as fields:
+        df, _ = load_parts(
+            workbook_parts(paths, EXPECTED_SHEET), EXPECTED_COLUMNS,
+            first_col=FIRST_COLUMN, schema=SCHEMA, processes=processes, cache=cache, namespace=CACHE_NAMESPACE,
+        )
+        fields.update(rows=len(df), files=len(paths))
+    inc("workbook_rows_total", len(df))
+    return df
+
+
+def validate_disputes(
+    path: str | Path, cache: Optional[WorkbookCache] = None
+) -> tuple[list[str], Optional[WorkbookError]]:
+    """Sheet names plus the header problem (or None), without reading data rows."""
+    if cache is not None:
+        meta = cache.lookup(path, CACHE_NAMESPACE)
+        if meta is not None:
+            # Only validated frames are ever cached
+            return list(meta.get("sheets", [EXPECTED_SHEET])), None
+
+    with span("workbook_validate"):
+        return validate_workbook(path, EXPECTED_SHEET, EXPECTED_COLUMNS, first_col=FIRST_COLUMN)
+
+
+def render_disputes(df: pd.DataFrame, *, to_override: Optional[str] = None) -> list[RenderedEmail]:
+    """Render every row to a (key, to, subject, html) record in one column-wise pass."""
+    return render_batch(
+        df,
+        subject=compile_template(SUBJECT_TEMPLATE, escape=False),
+        html_body=load_template(BODY_TEMPLATE),
+        to=RECIPIENT_COLUMN,
+        to_override=to_override,
+    )
+
+
+def message_keys(df: pd.DataFrame, rendered: list[RenderedEmail]) -> list[str]:
+    """Send-journal identity per rendered row: Project ID + recipient + body."""
+    project_ids = text_column(df["Project ID"]).tolist()
+    return [message_key(pid, msg.to, msg.html) for pid, msg in zip(project_ids, rendered)]
+
+
+def render_digests(
+    df: pd.DataFrame,
+    *,
+    group_by: str = RECIPIENT_COLUMN,
+    to_override: Optional[str] = None,
+) -> list[RenderedEmail]:
+    """
+    One email per distinct `group_by` value (a DIGEST_GROUPS column, so the
+    value is the recipient), with a table of all its disputes.
+
+    Row fragments are rendered column-wise, then joined per group with a single
+    groupby. Rows with a blank group value make one digest keyed "" with no
+    recipient, so they are reported as skipped like per-row emails without one.
+    """
+    if group_by not in DIGEST_GROUPS:
+        raise ValueError(f"Digests can be grouped by {', '.join(DIGEST_GROUPS)}, not {group_by!r}")
+    rows = load_template(DIGEST_ROW_TEMPLATE).render_frame(df)
+    parts = pd.DataFrame({
+        "Group": text_column(df[group_by]).to_numpy(),
+        "Row": rows,
+    })
+
+    grouped = parts.groupby("Group", sort=False)
+    digests = grouped.agg(Rows=("Row", "".join), Count=("Row", "size")).reset_index()
+    digests["To"] = digests["Group"]
+
+    return render_batch(
+        digests,
+        subject=compile_template(DIGEST_SUBJECT_TEMPLATE, escape=False),
+        html_body=load_template(DIGEST_TEMPLATE),
+        to="To",
+        to_override=to_override,
+        keys=digests["Group"].tolist(),
+    )
+
+
+def digest_message_keys(rendered: list[RenderedEmail]) -> list[str]:
+    """Send-journal identity per digest: group + recipient + body."""
+    return [message_key(msg.key, msg.to, msg.html) for msg in rendered]
+
+
+def render_messages(
+    df: pd.DataFrame, *, group_by: Optional[str] = None, to_override: Optional[str] = None
+) -> tuple[list[RenderedEmail], list[str]]:
+    """Rendered emails and their send-journal keys: one per row, or one digest per `group_by` value."""
+    if group_by:
+        rendered = render_digests(df, group_by=group_by, to_override=to_override)
+        return rendered, digest_message_keys(rendered)
+    rendered = render_disputes(df, to_override=to_override)
+    return rendered, message_keys(df, rendered)
+
+
+def preflight_disputes(
+    df: pd.DataFrame,
+    *,
+    row_numbers=None,
+    resolve: Optional[Resolver] = None,
+    allowed_domains: Iterable[str] = ALLOWED_DOMAINS,
+    allowed_outcomes: Iterable[str] = ALLOWED_OUTCOMES,
+) -> PreflightReport:
+    """
+    Whole-sheet validation before any send (see utils/preflight.py). For a
+    subset of the sheet (e.g. incremental changes) pass each row's Excel row;
+    `resolve` adds the address book check (utils.transports.unresolved_recipients).
+    Domain and Outcome restrictions apply only when given (empty = no check).
+    """
+    allowed_outcomes = tuple(allowed_outcomes)
+    with span("preflight") as fields:
+        report = run_preflight(
+            df,
+            row_numbers=row_numbers,
+            resolve=resolve,
+            required=REQUIRED_COLUMNS,
+            recipients=RECIPIENT_COLUMN,
+            allowed_domains=allowed_domains,
+            dates=("Appt Date",),
+            unique=("Project ID",),
+            allowed_values={"Outcome": allowed_outcomes} if allowed_outcomes else None,
+        )
+        fields.update(errors=report.errors, warnings=report.warnings)
+    return report
@@ -0,0 +1,179 @@
+# utils/email_templates.py
+from __future__ import annotations
+import html
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Mapping, NamedTuple, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils.metrics import inc, span
+from utils.pathing import resource_path
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# {{ Column Name }}, {{ First Choice || Fallback }}, {{ Prebuilt HTML | safe }}
+_PLACEHOLDER = re.compile(r"\{\{\s*(.+?)\s*\}\}")
+_SAFE = re.compile(r"(?<!\|)\|\s*safe$")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class RenderedEmail(NamedTuple):
+    key: Any        # source row index
+    to: str
+    subject: str
+    html: str
+
+
+class Template:
+    """
+    A template compiled once into a positional str.format pattern.
+
+    Placeholders are `{{ Column }}`; `{{ A || B }}` uses B where A is blank.
+    Values are HTML-escaped unless escape=False (e.g. for subjects) or the
+    placeholder ends in `| safe` (already-rendered HTML fragments).
+
+    `render_frame` works column-wise: each field is converted/escaped once per
+    column (unique values only), then rows are stitched with a single
+    `map(pattern.format, ...)`, so there is no per-row Python dict or Series.
+    """
+
+    def __init__(self, source: str, *, escape: bool = True):
+        self.source = source
+        self.escape = escape
+
+        pieces = []
+        self.fields: list[tuple[str, ...]] = []
+        self._safe: list[bool] = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(source):
+            expr = m.group(1)
+            safe = bool(_SAFE.search(expr))
+            if safe:
+                expr = _SAFE.sub("", expr)
+            pieces.append(_escape_braces(source[pos:m.start()]))
+            pieces.append("{%d}" % len(self.fields))
+            self.fields.append(tuple(part.strip() for part in expr.split("||")))
+            self._safe.append(safe)
+            pos = m.end()
+        pieces.append(_escape_braces(source[pos:]))
+        self._pattern = "".join(pieces)
+
+    @property
+    def columns(self) -> set[str]:
+        return {name for chain in self.fields for name in chain}
+
+    def render(self, record: Mapping[str, Any]) -> str:
+        """Render a single record (dict, Series or namedtuple._asdict())."""
+        values = []
+        for chain, safe in zip(self.fields, self._safe):
+            text = ""
+            for name in chain:
+                if name not in record:
+                    raise TemplateError(f"Template field '{name}' is not available.")
+                text = format_value(record[name])
+                if text:
+                    break
+            values.append(html.escape(text) if self.escape and not safe else text)
+        return self._pattern.format(*values)
+
+    def render_frame(self, df: pd.DataFrame) -> list[str]:
+        """Render every row of `df`; returns one string per row, in order."""
+        missing = self.columns - set(df.columns)
+        if missing:
+            raise TemplateError(f"Template fields not in data: {', '.join(sorted(missing))}")
+        if not self.fields:
+            return [self._pattern.format()] * len(df)
+
+        cols = [self._field_column(df, chain, safe) for chain, safe in zip(self.fields, self._safe)]
+        return list(map(self._pattern.format, *cols))
+
+    def _field_column(self, df: pd.DataFrame, chain: tuple[str, ...], safe: bool = False) -> list[str]:
+        col = text_column(df[chain[0]])
+        for name in chain[1:]:
+            col = col.where(col != "", text_column(df[name]))
+        if self.escape and not safe:
+            # Escape each distinct value once
+            codes, uniques = pd.factorize(col)
+            escaped = np.array([html.escape(u) for u in uniques], dtype=object)
+            return escaped[codes].tolist() if len(codes) else []
+        return col.tolist()
+
+
+def format_value(value: Any) -> str:
+    """Display text for one cell value (blank for NA; dates as DATE_FORMAT)."""
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, pd.Timestamp):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def text_column(series: pd.Series) -> pd.Series:
+    """Vectorized format_value for a whole column (object dtype result).
+
+    Only the distinct values are formatted; rows are then filled by code lookup.
+    """
+    codes, uniques = pd.factorize(series)
+    # NA rows get code -1, which indexes the trailing ""
+    texts = np.array([format_value(v) for v in uniques] + [""], dtype=object)
+    return pd.Series(texts[codes], index=series.index, dtype=object)
+
+
+@lru_cache(maxsize=64)
+def compile_template(source: str, escape: bool = True) -> Template:
+    """Compiled-template cache keyed by source text."""
+    return Template(source, escape=escape)
+
+
+def load_template(name: str, *, escape: bool = True) -> Template:
+    """Load and compile templates/<name> (works in dev and in the PyInstaller build)."""
+    path = Path(resource_path("templates", name))
+    return _load_template(str(path), os.stat(path).st_mtime_ns, escape)
+
+
+@lru_cache(maxsize=32)
+def _load_template(path: str, mtime_ns: int, escape: bool) -> Template:
+    # mtime_ns is part of the cache key so an edited template is recompiled
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_template(f.read(), escape)
+
+
+def render_batch(
+    df: pd.DataFrame,
+    *,
+    subject: Template,
+    html_body: Template,
+    to: Optional[str] = None,               # column holding the recipient(s)
+    to_override: Optional[str] = None,      # send everything to one address (testing)
+    keys: Optional[Sequence[Any]] = None,   # defaults to df.index
+) -> list[RenderedEmail]:
+    """Render a whole frame into (key, to, subject, html) records."""
+    with span("render") as fields:
+        fields["rows"] = len(df)
+        subjects = subject.render_frame(df)
+        bodies = html_body.render_frame(df)
+    inc("messages_rendered_total", len(df))
+    if to_override is not None:
+        recipients = [to_override] * len(df)
+    elif to is not None:
+        recipients = text_column(df[to]).tolist()
+    else:
+        recipients = [""] * len(df)
+    keys = list(df.index) if keys is None else list(keys)
+    return list(map(RenderedEmail, keys, recipients, subjects, bodies))
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
@@ -0,0 +1,267 @@
+# utils/incremental.py
+from __future__ import annotations
+import fnmatch
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import numpy as np
+import pandas as pd
+from utils import disputes
+from utils.email_templates import text_column
+from utils.metrics import inc, span
+from utils.pathing import app_data_path
+from utils.workbook_cache import WorkbookCache
+from utils.workbook_loader import StreamingWorkbook
+
+# Bump when fingerprints are computed differently, so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+def row_fingerprints(df: pd.DataFrame, columns: Iterable[str] = disputes.EXPECTED_COLUMNS) -> np.ndarray:
+    """
+    64-bit hash per row of the C:N values, as displayed (text_column), so a row
+    read from the cache, the full sheet or a tail read fingerprints the same.
+    """
+    texts = pd.DataFrame({c: text_column(df[c]).to_numpy() for c in columns})
+    return pd.util.hash_pandas_object(texts, index=False).to_numpy(dtype=np.uint64)
+
+
+class Snapshot:
+    """
+    What the last run saw: Project ID and fingerprint for every data row, in
+    sheet order, and whether that row has been handled (sent, or spooled).
+
+    Saved as a small .npz per workbook key (no pickling).
+    """
+
+    def __init__(self, project_ids: np.ndarray, fingerprints: np.ndarray, done: np.ndarray):
+        self.project_ids = project_ids
+        self.fingerprints = fingerprints
+        self.done = done
+
+    @property
+    def rows(self) -> int:
+        return len(self.fingerprints)
+
+    @property
+    def pending(self) -> int:
+        return int((~self.done).sum())
+
+    @classmethod
+    def empty(cls) -> "Snapshot":
+        return cls(np.array([], dtype=str), np.array([], dtype=np.uint64), np.array([], dtype=bool))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Snapshot"]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != SNAPSHOT_VERSION:
+                    return None
+                return cls(data["project_ids"], data["fingerprints"], data["done"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            version=SNAPSHOT_VERSION,
+            project_ids=self.project_ids.astype(str),
+            fingerprints=self.fingerprints,
+            done=self.done,
+        )
+        os.replace(tmp, path)
+
+
+def snapshot_path(key: str | Path) -> Path:
+    """app-data incremental/<hash of key>.npz; the key is usually the workbook path."""
+    name = hashlib.blake2b(str(Path(key).resolve()).lower().encode("utf-8"), digest_size=12).hexdigest()
+    return Path(app_data_path("incremental", f"{name}.npz"))
+
+
+class IncrementalLoad:
+    """
+    New and changed dispute rows of a workbook, relative to the last processed
+    snapshot:
+
+        run = IncrementalLoad.open(path, cache=cache)
+        df = run.changes                   # only the rows to send
+        ...send...
+        run.commit(failed=failed_keys)     # remember what was handled
+
+    A row is unchanged when its (Project ID + C:N) fingerprint was handled
+    before. When everything in the snapshot was handled and the last row it
+    knew is still the same, the sheet is assumed to have only grown and just
+    the rows below it are read (a tail read); otherwise, or with full=True, the
+    whole sheet is loaded and compared (which also catches in-place edits).
+    """
+
+    def __init__(self, key: str | Path, previous: Snapshot, frame: pd.DataFrame, fingerprints: np.ndarray,
+                 mode: str):
+        self.key = key
+        self.previous = previous
+        self.frame = frame                  # rows read this time (whole sheet, or the tail)
+        self.fingerprints = fingerprints    # one per row of `frame`
+        self.mode = mode                    # "full" or "tail"
+
+        handled = previous.fingerprints[previous.done]
+        self._pending = ~np.isin(fingerprints, handled)
+        ids = text_column(frame["Project ID"]).to_numpy(dtype=str)
+        self._ids = ids
+        self.new = int((self._pending & ~np.isin(ids, previous.project_ids)).sum())
+        self.changed = int(self._pending.sum()) - self.new
+
+    @classmethod
+    def open(
+        cls,
+        path: str | Path,
+        *,
+        key: Optional[str | Path] = None,
+        cache: Optional[WorkbookCache] = None,
+        full: bool = False,
+    ) -> "IncrementalLoad":
+        key = key or path
+        previous = Snapshot.load(snapshot_path(key)) or Snapshot.empty()
+
+        if not full and previous.rows and not previous.pending:
+            with span("incremental_tail_load") as fields:
+                # Re-read the last known row too: if it still matches, the sheet only grew
+                with StreamingWorkbook(
+                    path, disputes.EXPECTED_SHEET, disputes.EXPECTED_COLUMNS,
+                    first_col=disputes.FIRST_COLUMN, schema=disputes.SCHEMA,
+                ) as wb:
+                    wb.check_header()
+                    tail = wb.read_frame(start_row=previous.rows + 1)
+                fields["rows"] = len(tail)
+            fingerprints = row_fingerprints(tail) if len(tail) else np.array([], dtype=np.uint64)
+            if len(tail) and fingerprints[0] == previous.fingerprints[-1]:
+                inc("workbook_rows_total", len(tail))
+                return cls(key, previous, tail.iloc[1:], fingerprints[1:], "tail")
+
+        df = disputes.load_disputes(path, cache)
+        return cls(key, previous, df, row_fingerprints(df), "full")
+
+    @property
+    def changes(self) -> pd.DataFrame:
+        """New or changed rows; the index is the sheet position (Excel row - 2)."""
+        return self.frame[self._pending]
+
+    @property
+    def unchanged(self) -> int:
+        known = self.previous.rows if self.mode == "tail" else 0
+        return known + len(self.frame) - self.new - self.changed
+
+    def summary(self) -> str:
+        return (
+            f"Incremental ({self.mode} read): {self.new:,} new, {self.changed:,} changed, "
+            f"{self.unchanged:,} unchanged row(s)."
+        )
+
+    def commit(
+        self,
+        *,
+        handled: Optional[pd.Index] = None,
+        failed: Iterable = (),
+        group_by: Optional[str] = None,
+    ) -> Snapshot:
+        """
+        Save the snapshot for the next run.
+
+        `handled` is the row labels that were sent (default: every change);
+        `failed` removes the rows whose send failed, by row label or, for
+        digests, by `group_by` value. Rows not handled stay pending and are
+        offered again next time.
+        """
+        changes = self.changes
+        handled = changes.index if handled is None else changes.index.intersection(handled)
+        failed = {str(k) for k in failed}
+        if failed:
+            if group_by:
+                keys = text_column(changes.loc[handled, group_by])
+            else:
+                keys = pd.Series(handled.astype(str), index=handled)
+            handled = handled[~keys.isin(failed).to_numpy()]
+
+        done = ~self._pending
+        done[self.frame.index.get_indexer(handled)] = True
+        if self.mode == "tail":
+            snapshot = Snapshot(
+                np.concatenate([self.previous.project_ids.astype(str), self._ids]),
+                np.concatenate([self.previous.fingerprints, self.fingerprints]),
+                np.concatenate([self.previous.done, done]),
+            )
+        else:
+            snapshot = Snapshot(self._ids, self.fingerprints, done)
+        snapshot.save(snapshot_path(self.key))
+        return snapshot
+
+
+class FolderWatcher:
+    """
+    Polls a folder for new or updated workbooks (e.g. each week's export saved
+    next to the last one). A file is reported once its size and mtime have been
+    stable for `settle` seconds, so a copy in progress is not picked up; Excel
+    lock files (~$...) are ignored.
+
+        for path in FolderWatcher(folder).watch(stop):
+            run_incremental(path, key=folder)
+    """
+
+    def __init__(self, folder: str | Path, *, pattern: str = "*.xlsx", interval: float = 30.0,
+                 settle: float = 5.0, include_existing: bool = False):
+        self.folder = Path(folder)
+        self.pattern = pattern
+        self.interval = interval
+        self.settle = settle
+        self._seen: dict[str, tuple[int, int]] = {}       # reported (size, mtime_ns)
+        self._pending: dict[str, tuple[tuple[int, int], float]] = {}
+        if not include_existing:
+            # Files already there are the baseline; only later versions are reported
+            for entry in self._entries():
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                self._seen[entry.path] = (st.st_size, st.st_mtime_ns)
+
+    def _entries(self) -> list[os.DirEntry]:
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            return []
+        pattern = self.pattern.lower()
+        return [e for e in entries if not e.name.startswith("~$") and fnmatch.fnmatch(e.name.lower(), pattern)]
+
+    def poll(self) -> list[Path]:
+        """Files that appeared or changed since the last poll and have settled, oldest first."""
+        now = time.monotonic()
+        ready = []
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if self._seen.get(entry.path) == sig:
+                continue
+            first = self._pending.get(entry.path)
+            if first is None or first[0] != sig:
+                self._pending[entry.path] = (sig, now)
+                continue
+            if now - first[1] >= self.settle:
+                del self._pending[entry.path]
+                self._seen[entry.path] = sig
+                ready.append((st.st_mtime_ns, Path(entry.path)))
+        return [path for _, path in sorted(ready)]
+
+    def watch(self, stop=None) -> Iterator[Path]:
+        """Yield settled files until `stop` (a threading.Event) is set."""
+        while stop is None or not stop.is_set():
+            yield from self.poll()
+            if stop is not None:
+                stop.wait(self.interval)
+            else:
+                time.sleep(self.interval)
@@ -0,0 +1,169 @@
+# utils/log_pipeline.py
+from __future__ import annotations
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Optional
+import tkinter as tk
+from utils.pathing import app_data_path
+
+
+class LogPipeline:
+    """
+    Coalesced, bounded logging into a tk.Text.
+
+    - `write()` is thread-safe and cheap: it appends to a ring buffer and returns.
+    - A periodic tick on the Tk thread drains the buffer and inserts everything in
+      one `insert` call, then trims the widget to the last `max_lines` lines.
+    - If producers outrun the UI, the oldest unshown lines are dropped from the
+      widget (a "… N lines not shown" marker is inserted); the file keeps them all.
+    - Every line also goes to a rotating log file, written by a background
+      listener thread so disk I/O never runs on the producer or the Tk thread.
+    """
+
+    def __init__(
+        self,
+        widget: tk.Text,
+        *,
+        max_lines: int = 5000,
+        buffer_lines: int = 20000,
+        interval_ms: int = 100,
+        log_file: Optional[str | Path] = None,
+        max_file_bytes: int = 5 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+
+        self._lock = threading.Lock()
+        self._buffer: deque[str] = deque(maxlen=buffer_lines)
+        self._dropped = 0
+        self._job = None
+
+        self.log_file = Path(log_file) if log_file else Path(app_data_path("logs", "email_automation.log"))
+        self._logger, self._listener = self._build_file_logger(self.log_file, max_file_bytes, backups)
+
+    # --- Public API ---
+    def write(self, text: str) -> None:
+        """Queue text (may contain newlines) for the widget and the log file."""
+        lines = str(text).split("\n")
+        with self._lock:
+            overflow = len(self._buffer) + len(lines) - self._buffer.maxlen
+            if overflow > 0:
+                self._dropped += overflow
+            self._buffer.extend(lines)
+        if self._logger is not None:
+            for line in lines:
+                if line:
+                    self._logger.info(line)
+
+    def start(self) -> None:
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except tk.TclError:
+                pass
+            self._job = None
+        self.flush()
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def flush(self) -> None:
+        """Drain pending lines into the widget now (Tk thread only)."""
+        with self._lock:
+            if not self._buffer and not self._dropped:
+                return
+            lines = list(self._buffer)
+            self._buffer.clear()
+            dropped, self._dropped = self._dropped, 0
+
+        if dropped:
+            lines.insert(0, f"… {dropped:,} lines not shown (see {self.log_file})")
+        w = self.widget
+        w.insert("end", "\n".join(lines) + "\n")
+        # Keep only the last max_lines lines ("end-1c" skips Tk's trailing newline)
+        excess = int(w.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            w.delete("1.0", f"{excess + 1}.0")
+        w.see("end")
+
+    # --- Internals ---
+    def _tick(self) -> None:
+        try:
+            self.flush()
+        except tk.TclError:
+            # Widget destroyed (app closing)
+            self._job = None
+            return
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    @staticmethod
+    def _build_file_logger(path: Path, max_bytes: int, backups: int):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+            )
+        except OSError:
+            return None, None
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+        q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(q, handler)
+        listener.start()
+
+        logger = logging.getLogger(f"email_automation.ui.{path.stem}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers[:] = [logging.handlers.QueueHandler(q)]
+        return logger, listener
+
+
+class TkBridge:
+    """
+    Hands calls from worker threads and the asyncio runtime to the Tk thread.
+
+    - `post(fn, *args)` is thread-safe and never touches Tk; a periodic `after`
+      tick on the Tk thread runs everything posted since the last tick, in order.
+    - So widgets are only configured from the Tk thread, never from a worker.
+    """
+
+    def __init__(self, widget: tk.Misc, *, interval_ms: int = 100):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._calls: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._job = None
+
+    def post(self, fn, *args) -> None:
+        self._calls.put((fn, args))
+
+    def start(self) -> None:
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self) -> None:
+        while True:
+            try:
+                fn, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception:
+                # One bad call must not stop the bridge: later posts (e.g. clearing
+                # the busy state) still have to run
+                logging.getLogger("email_automation.ui").exception("Posted UI call %r failed", fn)
+        try:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+        except tk.TclError:
+            # Widget destroyed (app closing)
+            self._job = None
@@ -0,0 +1,263 @@
+# utils/message_preview.py
+from __future__ import annotations
+import html
+import random
+import re
+import tempfile
+import threading
+import webbrowser
+from collections import OrderedDict
+from html.parser import HTMLParser
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Optional, Sequence
+from utils.email_templates import RenderedEmail
+
+# fetch(start, stop) -> the rendered messages for positions start..stop-1
+FetchBlock = Callable[[int, int], Sequence[RenderedEmail]]
+
+
+class RenderCache:
+    """
+    Lazily rendered, memoized view over `count` messages.
+
+    Messages are rendered in blocks of `block` positions the first time any of
+    them is looked at; the last `max_blocks` blocks are kept (LRU). Paging
+    through a 100k-row sheet therefore renders only the pages actually viewed.
+    """
+
+    def __init__(self, count: int, fetch: FetchBlock, *, block: int = 25, max_blocks: int = 40):
+        self.count = count
+        self.fetch = fetch
+        self.block = block
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._blocks: "OrderedDict[int, Sequence[RenderedEmail]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, pos: int) -> RenderedEmail:
+        if not 0 <= pos < self.count:
+            raise IndexError(pos)
+        b = pos // self.block
+        with self._lock:
+            items = self._blocks.get(b)
+            if items is not None:
+                self._blocks.move_to_end(b)
+                return items[pos - b * self.block]
+        start = b * self.block
+        items = self.fetch(start, min(self.count, start + self.block))
+        with self._lock:
+            self._blocks[b] = items
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return items[pos - start]
+
+    @classmethod
+    def from_list(cls, messages: Sequence[RenderedEmail]) -> "RenderCache":
+        """Wrap already-rendered messages (e.g. digests)."""
+        return cls(len(messages), lambda start, stop: messages[start:stop], max_blocks=len(messages) + 1)
+
+
+class _TextRenderer(HTMLParser):
+    """Readable plain-text rendition of an email body (fallback when no HTML widget is installed)."""
+
+    BLOCKS = {"p", "div", "br", "tr", "table", "h1", "h2", "h3", "li", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("style", "script", "head"):
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+        elif tag == "td":
+            self.parts.append("\t")
+
+    def handle_endtag(self, tag):
+        if tag in ("style", "script", "head"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in ("p", "table", "h1", "h2", "h3"):
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    @classmethod
+    def convert(cls, source: str) -> str:
+        parser = cls()
+        parser.feed(source)
+        lines = [
+            re.sub(r" *\t *", "\t", re.sub(r" +", " ", line)).strip()
+            for line in "".join(parser.parts).splitlines()
+        ]
+        text = "\n".join(lines)
+        while "\n\n\n" in text:
+            text = text.replace("\n\n\n", "\n\n")
+        return text.strip()
+
+
+class MessagePreview(tk.Toplevel):
+    """
+    Pages through rendered messages inside the app: recipient, subject and body
+    (rendered, or HTML source). Nothing is sent and Outlook is not involved.
+
+    - "Sample N" restricts paging to N random messages, for a quick spot check.
+    - The body uses tkinterweb's HtmlFrame when installed, else a text rendition;
+      "Open in browser" shows the exact HTML.
+    - `on_open_in_outlook`, when given, is called with the current message
+      (e.g. to Display that one message in Outlook).
+    """
+
+    def __init__(
+        self,
+        parent,
+        messages: RenderCache,
+        *,
+        title: str = "Email preview",
+        on_open_in_outlook: Optional[Callable[[RenderedEmail], None]] = None,
+    ):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("900x680")
+        self.messages = messages
+        self.on_open_in_outlook = on_open_in_outlook
+        self._order: Optional[list[int]] = None   # sampled positions, or None for all
+        self._i = 0
+
+        # Toolbar: paging + sample
+        bar = ttk.Frame(self, padding=(8, 8, 8, 4))
+        bar.pack(fill="x")
+        ttk.Button(bar, text="◀ Prev", command=lambda: self.step(-1)).pack(side="left")
+        ttk.Button(bar, text="Next ▶", command=lambda: self.step(1)).pack(side="left", padx=(4, 0))
+        self.pos_var = tk.StringVar()
+        pos_entry = ttk.Entry(bar, textvariable=self.pos_var, width=8, justify="right")
+        pos_entry.pack(side="left", padx=(10, 4))
+        pos_entry.bind("<Return>", lambda e: self._jump())
+        self.count_label = ttk.Label(bar, text="")
+        self.count_label.pack(side="left")
+
+        ttk.Button(bar, text="All", command=self.show_all).pack(side="right")
+        ttk.Button(bar, text="Sample", command=self.sample).pack(side="right", padx=(0, 4))
+        self.sample_var = tk.IntVar(value=10)
+        ttk.Spinbox(bar, from_=1, to=1000, width=5, textvariable=self.sample_var).pack(side="right", padx=(0, 4))
+        ttk.Label(bar, text="Sample N:").pack(side="right", padx=(0, 4))
+
+        # Headers
+        head = ttk.Frame(self, padding=(8, 0, 8, 4))
+        head.pack(fill="x")
+        head.columnconfigure(1, weight=1)
+        self.to_var = tk.StringVar()
+        self.subject_var = tk.StringVar()
+        self.key_var = tk.StringVar()
+        for row, (label, var) in enumerate((("To:", self.to_var), ("Subject:", self.subject_var), ("Row:", self.key_var))):
+            ttk.Label(head, text=label, font=("Segoe UI", 9, "bold")).grid(row=row, column=0, sticky="w", padx=(0, 8))
+            ttk.Entry(head, textvariable=var, state="readonly").grid(row=row, column=1, sticky="ew", pady=1)
+
+        # Body: rendered / source
+        self.tabs = ttk.Notebook(self)
+        self.tabs.pack(fill="both", expand=True, padx=8)
+        self.body_frame = ttk.Frame(self.tabs)
+        self.tabs.add(self.body_frame, text="Message")
+        self._html_view = self._make_html_view(self.body_frame)
+        source_frame = ttk.Frame(self.tabs)
+        self.tabs.add(source_frame, text="HTML source")
+        self.source_text = tk.Text(source_frame, wrap="none", font=("Consolas", 9))
+        self.source_text.pack(fill="both", expand=True)
+
+        # Footer
+        foot = ttk.Frame(self, padding=8)
+        foot.pack(fill="x")
+        ttk.Button(foot, text="Open in browser", command=self.open_in_browser).pack(side="left")
+        if on_open_in_outlook is not None:
+            ttk.Button(foot, text="Open in Outlook",
+                       command=lambda: self.on_open_in_outlook(self.current())).pack(side="left", padx=(6, 0))
+        ttk.Button(foot, text="Close", command=self.destroy).pack(side="right")
+
+        for key, delta in (("<Left>", -1), ("<Right>", 1), ("<Prior>", -10), ("<Next>", 10)):
+            self.bind(key, lambda e, d=delta: self.step(d))
+        self.show(0)
+
+    # --- Navigation ---
+    def _positions(self) -> int:
+        return len(self._order) if self._order is not None else len(self.messages)
+
+    def current(self) -> Optional[RenderedEmail]:
+        if not self._positions():
+            return None
+        pos = self._order[self._i] if self._order is not None else self._i
+        return self.messages[pos]
+
+    def show(self, i: int) -> None:
+        total = self._positions()
+        self._i = max(0, min(i, total - 1)) if total else 0
+        msg = self.current()
+        self.pos_var.set(str(self._i + 1) if total else "0")
+        scope = f"of {total:,}" if self._order is None else f"of {total:,} sampled ({len(self.messages):,} total)"
+        self.count_label.config(text=scope)
+        self.to_var.set(msg.to if msg else "")
+        self.subject_var.set(msg.subject if msg else "")
+        self.key_var.set(str(msg.key) if msg else "")
+        body = msg.html if msg else ""
+        self._set_html(body)
+        self.source_text.delete("1.0", "end")
+        self.source_text.insert("1.0", body)
+
+    def step(self, delta: int) -> str:
+        self.show(self._i + delta)
+        return "break"
+
+    def sample(self) -> None:
+        try:
+            n = max(1, int(self.sample_var.get()))
+        except (tk.TclError, ValueError):
+            n = 10
+        total = len(self.messages)
+        self._order = sorted(random.sample(range(total), min(n, total)))
+        self.show(0)
+
+    def show_all(self) -> None:
+        self._order = None
+        self.show(0)
+
+    def _jump(self) -> None:
+        try:
+            self.show(int(self.pos_var.get()) - 1)
+        except ValueError:
+            self.show(self._i)
+
+    # --- Body ---
+    def _make_html_view(self, parent):
+        try:
+            from tkinterweb import HtmlFrame  # optional: real HTML rendering
+        except ImportError:
+            text = tk.Text(parent, wrap="word", borderwidth=0, padx=8, pady=8)
+            text.pack(fill="both", expand=True)
+            return text
+        frame = HtmlFrame(parent, messages_enabled=False)
+        frame.pack(fill="both", expand=True)
+        return frame
+
+    def _set_html(self, body: str) -> None:
+        view = self._html_view
+        if isinstance(view, tk.Text):
+            view.config(state="normal")
+            view.delete("1.0", "end")
+            view.insert("1.0", _TextRenderer.convert(body))
+            view.config(state="disabled")
+        else:
+            view.load_html(body)
+
+    def open_in_browser(self) -> None:
+        msg = self.current()
+        if msg is None:
+            return
+        with tempfile.NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8") as f:
+            f.write(f"<!-- To: {html.escape(msg.to)} | Subject: {html.escape(msg.subject)} -->\n")
+            f.write(msg.html)
+        webbrowser.open(f.name)
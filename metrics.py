@@ -0,0 +1,263 @@
+# utils/metrics.py
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+PREFIX = "email_automation_"
+# Seconds; wide enough for a 1 ms render and a 60 s openpyxl load
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+
+def _key(labels: dict) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    In-process counters, histograms and timing spans.
+
+    - `inc("messages_sent_total", backend="outlook")` bumps a counter.
+    - `observe("render_seconds", 0.12)` adds a histogram sample.
+    - `with span("com_call", op="send"):` times the block into `com_call_seconds`
+      and counts exceptions in `com_call_errors_total`.
+
+    Everything is aggregated in memory. While a JSON-lines log is open
+    (`open_log`), every span is also appended as one event, so a slow run can be
+    examined afterwards. `prometheus()` renders the current totals in Prometheus
+    text format, and `write_prometheus()` saves them to a file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[_LabelKey, float]] = {}
+        self._histograms: dict[str, dict[_LabelKey, _Histogram]] = {}
+        self._log = None
+        self.log_path: Optional[Path] = None
+
+    # --- Recording ---
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[dict]:
+        """Time a block; the yielded dict can take extra labels for the JSON-lines event only."""
+        extra: dict = {}
+        started = time.perf_counter()
+        error = None
+        try:
+            yield extra
+        except BaseException as e:
+            error = type(e).__name__
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe(f"{name}_seconds", seconds, **labels)
+            if self._log is not None:
+                self.event("span", name=name, seconds=round(seconds, 6), labels=labels, error=error, **extra)
+
+    def event(self, kind: str, **fields) -> None:
+        """Append one record to the JSON-lines log (no-op when no log is open)."""
+        line = json.dumps({"ts": time.time(), "type": kind, **fields}, default=str)
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line + "\n")
+
+    # --- Export ---
+    def open_log(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, "a", encoding="utf-8", buffering=64 * 1024)
+            self.log_path = path
+
+    def close_log(self) -> None:
+        if self._log is not None:
+            self.event("snapshot", **self.snapshot())
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = None
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+
+    def counter(self, name: str, **labels) -> float:
+        """Current value of a counter; with no labels, the sum over all label sets."""
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels:
+                return series.get(_key(labels), 0)
+            return sum(series.values())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {"labels": dict(k), "count": h.count, "sum": round(h.sum, 6),
+                     "mean": round(h.sum / h.count, 6) if h.count else None}
+                    for k, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus(self) -> str:
+        out: list[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = PREFIX + name
+                out.append(f"# TYPE {full} counter")
+                for key, value in series.items():
+                    out.append(f"{full}{_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                out.append(f"# TYPE {full} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(BUCKETS, h.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        out.append(f"{full}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    out.append(f"{full}_sum{_labels(key)} {h.sum:.6f}")
+                    out.append(f"{full}_count{_labels(key)} {h.count}")
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> Path:
+        """Write the snapshot atomically (textfile-collector friendly)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _labels(key: _LabelKey) -> str:
+    if not key:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in key
+    )
+    return "{" + inner + "}"
+
+
+class RateMeter:
+    """
+    Throughput and ETA for a run of `total` items, over a sliding `window`.
+    `tick()` may be called from any thread; read `describe()` from the UI.
+    """
+
+    def __init__(self, total: int, *, window: float = 30.0):
+        self.total = total
+        self.window = window
+        self.done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stamps: deque[float] = deque()
+
+    def tick(self, n: int = 1) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.done += n
+            self._stamps.extend([now] * n)
+            self._trim(now)
+
+    def rate(self) -> float:
+        """Items per second over the window (or since start, if shorter)."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            span = min(self.window, now - self.started)
+            return len(self._stamps) / span if span > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        rate = self.rate()
+        remaining = self.total - self.done
+        if remaining <= 0:
+            return 0.0
+        return remaining / rate if rate > 0 else None
+
+    def describe(self) -> str:
+        eta = self.eta()
+        eta_text = "–" if eta is None else time.strftime("%H:%M:%S", time.gmtime(eta))
+        return f"{self.done:,}/{self.total:,} · {self.rate():.1f} msg/s · ETA {eta_text}"
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._stamps and self._stamps[0] < cutoff:
+            self._stamps.popleft()
+
+
+_registry = Metrics()
+
+
+def registry() -> Metrics:
+    """Process-wide metrics used by the load/render/send hooks."""
+    return _registry
+
+
+def span(name: str, **labels):
+    return _registry.span(name, **labels)
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    _registry.inc(name, value, **labels)
+
+
+def run_log_path(kind: str) -> Path:
+    """app-data metrics/<kind>-YYYYmmdd-HHMMSS.jsonl"""
+    from utils.pathing import app_data_path
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return Path(app_data_path("metrics", f"{kind}-{stamp}.jsonl"))
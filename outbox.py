@@ -0,0 +1,158 @@
+# utils/outbox.py
+from __future__ import annotations
+import email
+import email.policy
+import json
+import os
+from datetime import datetime
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence
+from utils.email_templates import RenderedEmail
+from utils.metrics import inc, span
+from utils.pathing import app_data_path
+from utils.send_engine import SendJob
+from utils.transports import build_message
+
+
+class OutboxError(RuntimeError):
+    pass
+
+
+class OutboxEntry(NamedTuple):
+    seq: int
+    key: str                 # row key / digest group, for logs
+    dedupe_key: str          # send-journal identity (same as a direct send)
+    to: str
+    subject: str
+    file: str                # relative to the outbox directory
+    send_on_behalf_of: Optional[str] = None
+    attachments: tuple = ()
+
+
+class Outbox:
+    """
+    On-disk spool of fully rendered messages, so rendering and sending are two
+    separate phases:
+
+        # phase 1 - render (e.g. overnight); nothing is sent
+        box = Outbox.create(name="disputes-2025-06")
+        box.spool(rendered, keys, send_on_behalf_of="disputes@...")
+
+        # phase 2 - inspect the .eml files if needed, then dispatch through any backend
+        engine.run(Outbox(path).jobs())
+
+    Layout:
+        messages/000001.eml   one MIME file per message (opens in Outlook)
+        index.jsonl           one OutboxEntry per line, in send order
+        manifest.json         written last; a spool without it is incomplete
+
+    The outbox itself is read-only after spooling. Delivery state lives in the
+    SendJournal, keyed by the same dedupe keys as a direct send, so a dispatch
+    can be stopped and resumed, and a message already sent directly is not sent again.
+    """
+
+    INDEX = "index.jsonl"
+    MANIFEST = "manifest.json"
+    MESSAGES = "messages"
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    @classmethod
+    def create(cls, directory: Optional[str | Path] = None, *, name: Optional[str] = None) -> "Outbox":
+        """New empty outbox (default: app data outbox/<name or timestamp>)."""
+        if directory is None:
+            name = name or datetime.now().strftime("%Y%m%d-%H%M%S")
+            directory = app_data_path("outbox", name)
+        box = cls(directory)
+        if (box.directory / cls.INDEX).exists():
+            raise OutboxError(f"Outbox already holds a spool: {box.directory}")
+        (box.directory / cls.MESSAGES).mkdir(parents=True, exist_ok=True)
+        return box
+
+    # --- Phase 1: render to spool ---
+    def spool(
+        self,
+        rendered: Sequence[RenderedEmail],
+        keys: Sequence[str],
+        *,
+        send_on_behalf_of: Optional[str] = None,
+        from_addr: str = "",
+        attachments: Optional[Iterable[str]] = None,
+        meta: Optional[dict] = None,
+    ) -> int:
+        """Write one .eml per message with a recipient; returns how many were spooled."""
+        attachments = tuple(attachments or ())
+        index_tmp = self.directory / (self.INDEX + ".tmp")
+        count = 0
+        with span("outbox_spool") as fields, open(index_tmp, "w", encoding="utf-8") as index:
+            for msg, key in zip(rendered, keys):
+                if not msg.to:
+                    continue
+                count += 1
+                rel = f"{self.MESSAGES}/{count:06d}.eml"
+                mime = build_message(
+                    from_addr=from_addr, html_body=msg.html, to=msg.to, subject=msg.subject,
+                    attachments=attachments, send_on_behalf_of=send_on_behalf_of,
+                )
+                with open(self.directory / rel, "wb") as f:
+                    f.write(mime.as_bytes(policy=email.policy.SMTP))
+                entry = OutboxEntry(
+                    count, str(msg.key), key, msg.to, msg.subject, rel, send_on_behalf_of, attachments
+                )
+                index.write(json.dumps(entry._asdict(), ensure_ascii=False) + "\n")
+            fields["messages"] = count
+
+        os.replace(index_tmp, self.directory / self.INDEX)
+        manifest = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "messages": count,
+            **(meta or {}),
+        }
+        (self.directory / self.MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        inc("outbox_spooled_total", count)
+        return count
+
+    # --- Phase 2: dispatch ---
+    @property
+    def manifest(self) -> dict:
+        path = self.directory / self.MANIFEST
+        if not path.exists():
+            raise OutboxError(f"Not a complete outbox (no {self.MANIFEST}): {self.directory}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def __len__(self) -> int:
+        return int(self.manifest.get("messages", 0))
+
+    def entries(self) -> Iterator[OutboxEntry]:
+        self.manifest  # refuse half-written spools
+        with open(self.directory / self.INDEX, encoding="utf-8") as index:
+            for line in index:
+                if line.strip():
+                    data = json.loads(line)
+                    data["attachments"] = tuple(data.get("attachments") or ())
+                    yield OutboxEntry(**data)
+
+    def read(self, entry: OutboxEntry) -> EmailMessage:
+        with open(self.directory / entry.file, "rb") as f:
+            return email.message_from_binary_file(f, policy=email.policy.default)
+
+    def rendered(self, entry: OutboxEntry) -> RenderedEmail:
+        """The spooled message as a RenderedEmail (e.g. for the in-app preview)."""
+        body = self.read(entry).get_body(("html",))
+        if body is None:
+            raise OutboxError(f"{entry.file} has no HTML body")
+        return RenderedEmail(entry.key, entry.to, entry.subject, body.get_content())
+
+    def jobs(self, *, preview: bool = False) -> Iterator[SendJob]:
+        """SendJobs for SendEngine, read lazily from the spool (no template rendering)."""
+        for entry in self.entries():
+            yield SendJob(entry.seq, entry.key, dict(
+                html_body=self.rendered(entry).html,
+                to=entry.to,
+                subject=entry.subject,
+                attachments=list(entry.attachments) or None,
+                send_on_behalf_of=entry.send_on_behalf_of,
+                preview=preview,
+            ), dedupe_key=entry.dedupe_key)
@@ -1,4 +1,5 @@
 # utils/pathing.py
+import os
 import sys
 from pathlib import Path
 
@@ -9,3 +10,11 @@ def resource_path(*parts: str) -> str:
     """
     base = getattr(sys, "_MEIPASS", Path(__file__).resolve().parents[1])  # adjust if utils/ is nested differently
     return str(Path(base, *parts))
+
+def app_data_path(*parts: str) -> str:
+    """
+    Per-user writable folder for caches, logs and journals (never inside the PyInstaller bundle).
+    Use: app_data_path("logs") or app_data_path("cache", "workbooks")
+    """
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return str(Path(base, "EmailAutomation", *parts))
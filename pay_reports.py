@@ -0,0 +1,318 @@
+# utils/pay_reports.py
+from __future__ import annotations
+import csv
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from utils.email_templates import RenderedEmail, compile_template, load_template, render_batch, text_column
+from utils.metrics import inc, span
+from utils.pathing import app_data_path
+from utils.preflight import PreflightReport, Resolver, run_preflight
+from utils.send_engine import SendJob
+from utils.send_journal import message_key
+from utils.workbook_cache import WorkbookCache
+from utils.workbook_loader import (
+    CATEGORY, DATETIME, TEXT, SheetPart, StreamingWorkbook, WorkbookError, load_parts, validate_workbook,
+    workbook_parts,
+)
+
+EXPECTED_SHEET = "Pay Report"
+# Columns A:J inclusive (10 columns), one row per pay line item:
+EXPECTED_COLUMNS = [
+    "Employee ID",
+    "Employee Name",
+    "Email",
+    "Pay Period",
+    "Pay Date",
+    "Project ID",
+    "Customer",
+    "Line Type",
+    "Description",
+    "Amount",
+]
+FIRST_COLUMN = 1  # column A
+# Loaded dtypes (see utils/workbook_loader.apply_schema); Amount stays numeric as read
+SCHEMA = {
+    "Employee ID": CATEGORY,
+    "Employee Name": CATEGORY,
+    "Email": CATEGORY,
+    "Pay Period": CATEGORY,
+    "Pay Date": DATETIME,
+    "Project ID": TEXT,
+    "Customer": TEXT,
+    "Line Type": CATEGORY,
+    "Description": TEXT,
+}
+EMPLOYEE_COLUMN = "Employee ID"
+RECIPIENT_COLUMN = "Email"
+AMOUNT_COLUMN = "Amount"
+SUBJECT_TEMPLATE = "Pay Report – {{ Pay Period }} – {{ Employee Name || Employee ID }}"
+BODY_TEMPLATE = "pay_report.html"       # under templates/
+ROW_TEMPLATE = "pay_report_row.html"
+# Line-item columns written to each employee's attachment
+ATTACHMENT_COLUMNS = ["Pay Period", "Pay Date", "Project ID", "Customer", "Line Type", "Description", "Amount"]
+# Pre-flight rules (utils/preflight.py)
+REQUIRED_COLUMNS = (EMPLOYEE_COLUMN, RECIPIENT_COLUMN, "Pay Period", AMOUNT_COLUMN)
+# Optional restriction, off unless configured (e.g. --allowed-domains): recipients
+# outside these domains are an error. Empty = any domain.
+ALLOWED_DOMAINS: tuple[str, ...] = ()
+# Bump when the loaded frame changes shape/dtypes so cached copies are ignored
+CACHE_NAMESPACE = "payreports-v2"
+# Employees per process-pool task: large enough to amortize pickling the slice
+MIN_BATCH = 50
+
+
+class PayReport(NamedTuple):
+    employee: str
+    message: RenderedEmail
+    attachment: Optional[str]   # absolute path of the line-item CSV, if written
+    lines: int
+    dedupe_key: str
+
+
+def load_pay_report(path: str | Path, cache: Optional[WorkbookCache] = None) -> pd.DataFrame:
+    """Stream A:J from the 'Pay Report' sheet in a single read-only pass (or serve it from cache)."""
+    if cache is not None:
+        with span("workbook_cache_lookup"):
+            hit = cache.get(path, CACHE_NAMESPACE)
+        if hit is not None:
+            inc("workbook_cache_hits_total")
+            return hit[0]
+
+    with span("workbook_load") as fields:
+        with StreamingWorkbook(
+            path, EXPECTED_SHEET, EXPECTED_COLUMNS, first_col=FIRST_COLUMN, schema=SCHEMA
+        ) as wb:
+            wb.check_header()
+            df = wb.read_frame()
+            sheet_names = wb.sheet_names
+        fields["rows"] = len(df)
+    inc("workbook_rows_total", len(df))
+
+    if cache is not None:
+        cache.put(path, CACHE_NAMESPACE, df, {"sheets": sheet_names})
+    return df
+
+
+def load_pay_reports_many(
+    paths: Iterable[str | Path],
+    cache: Optional[WorkbookCache] = None,
+    *,
+    all_sheets: bool = False,
+    processes: Optional[int] = None,
+) -> tuple[pd.DataFrame, list[SheetPart]]:
+    """
+    The 'Pay Report' sheet of every workbook in `paths`, or with all_sheets
+    every sheet with the A:J pay line header (e.g. one per office), parsed in
+    a process pool and stacked into one frame with Source File / Source Sheet /
+    Source Row columns. Returns the frame and the sheets skipped for having
+    another header (summaries, notes).
+    """
+    paths = list(paths)
+    with span("workbook_load_many") as fields:
+        df, skipped = load_parts(
+            workbook_parts(paths, None if all_sheets else EXPECTED_SHEET), EXPECTED_COLUMNS,
+            first_col=FIRST_COLUMN, schema=SCHEMA, processes=processes, cache=cache, namespace=CACHE_NAMESPACE,
+        )
+        fields.update(rows=len(df), files=len(paths), skipped=len(skipped))
+    inc("workbook_rows_total", len(df))
+    return df, skipped
+
+
+def validate_pay_report(
+    path: str | Path, cache: Optional[WorkbookCache] = None
+) -> tuple[list[str], Optional[WorkbookError]]:
+    """Sheet names plus the header problem (or None), without reading data rows."""
+    if cache is not None:
+        meta = cache.lookup(path, CACHE_NAMESPACE)
+        if meta is not None:
+            return list(meta.get("sheets", [EXPECTED_SHEET])), None
+
+    with span("workbook_validate"):
+        return validate_workbook(path, EXPECTED_SHEET, EXPECTED_COLUMNS, first_col=FIRST_COLUMN)
+
+
+def preflight_pay_report(
+    df: pd.DataFrame,
+    *,
+    row_numbers=None,
+    resolve: Optional[Resolver] = None,
+    allowed_domains: Iterable[str] = ALLOWED_DOMAINS,
+) -> PreflightReport:
+    """
+    Whole-sheet validation before any send (see utils/preflight.py); pass each
+    row's Excel row when df is not one sheet. `resolve` adds the address book check;
+    the domain restriction applies only when given (empty = no check).
+    """
+    with span("preflight") as fields:
+        report = run_preflight(
+            df,
+            row_numbers=row_numbers,
+            required=REQUIRED_COLUMNS,
+            recipients=RECIPIENT_COLUMN,
+            allowed_domains=allowed_domains,
+            dates=("Pay Date",),
+            resolve=resolve,
+        )
+        fields.update(errors=report.errors, warnings=report.warnings)
+    return report
+
+
+def money_column(series: pd.Series) -> pd.Series:
+    """Amounts as display text ($1,234.50 / -$12.00); non-numbers are left as typed."""
+    numbers = pd.to_numeric(series, errors="coerce")
+    codes, uniques = pd.factorize(numbers)
+    texts = np.array(
+        [f"-${-v:,.2f}" if v < 0 else f"${v:,.2f}" for v in uniques] + [""], dtype=object
+    )
+    money = pd.Series(texts[codes], index=series.index, dtype=object)
+    return money.where(numbers.notna(), text_column(series))
+
+
+def partition_employees(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    One groupby over the whole sheet: a per-employee summary (name, address,
+    period, line count, total) and the row positions of each employee's lines.
+    Rows without an Employee ID belong to nobody and are left out.
+    """
+    employee = text_column(df[EMPLOYEE_COLUMN])
+    amounts = pd.to_numeric(df[AMOUNT_COLUMN], errors="coerce").fillna(0.0)
+    keep = (employee != "").to_numpy()
+    work = df.assign(_employee=employee.to_numpy(), _amount=amounts.to_numpy())[keep]
+
+    grouped = work.groupby("_employee", sort=False)
+    summary = grouped.agg(**{
+        "Employee Name": ("Employee Name", "first"),
+        RECIPIENT_COLUMN: (RECIPIENT_COLUMN, "first"),
+        "Pay Period": ("Pay Period", "first"),
+        "Pay Date": ("Pay Date", "first"),
+        "Lines": ("_employee", "size"),
+        "Total": ("_amount", "sum"),
+    })
+    summary.index.name = EMPLOYEE_COLUMN
+    summary = summary.reset_index()
+    summary["Total"] = money_column(summary["Total"])
+
+    # grouped.indices are positions within `work`; map them back to positions in `df`
+    rows = np.flatnonzero(keep)
+    positions = {key: rows[idx] for key, idx in grouped.indices.items()}
+    return summary, positions
+
+
+class _Batch(NamedTuple):
+    lines: pd.DataFrame        # line items of the batch's employees, grouped contiguously
+    summary: pd.DataFrame      # one row per employee, same order as `lines`
+    out_dir: Optional[str]     # where attachments go (None = no attachments)
+    to_override: Optional[str]
+
+
+def build_pay_reports(
+    df: pd.DataFrame,
+    *,
+    out_dir: Optional[str | Path] = None,
+    attachments: bool = True,
+    to_override: Optional[str] = None,
+    processes: Optional[int] = None,
+) -> list[PayReport]:
+    """
+    Render one email (and one line-item CSV) per employee.
+
+    The sheet is partitioned with a single groupby, then employees are handed to
+    a process pool in batches, so rendering and file writing use every core.
+    Each batch renders its line-item fragments column-wise and its bodies with
+    `render_batch`; nothing loops over rows in Python. With `processes=1`, or too
+    few employees to be worth starting processes for, it runs in-process.
+    """
+    with span("payreports_build") as fields:
+        summary, positions = partition_employees(df)
+        if attachments:
+            out_dir = Path(out_dir or app_data_path("payreports", datetime.now().strftime("%Y%m%d-%H%M%S")))
+            out_dir.mkdir(parents=True, exist_ok=True)
+        processes = max(1, processes or os.cpu_count() or 1)
+        batch_size = max(MIN_BATCH, math.ceil(len(summary) / (processes * 4)))
+
+        batches = []
+        for start in range(0, len(summary), batch_size):
+            part = summary.iloc[start:start + batch_size]
+            order = np.concatenate([positions[key] for key in part[EMPLOYEE_COLUMN]])
+            batches.append(_Batch(
+                df.iloc[order], part, str(out_dir) if attachments else None, to_override
+            ))
+
+        processes = min(processes, len(batches))
+        fields.update(employees=len(summary), rows=len(df), batches=len(batches), processes=processes)
+        if processes <= 1:
+            results = list(map(_build_batch, batches))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(_build_batch, batches))
+            # Workers count into their own registries
+            inc("messages_rendered_total", len(summary))
+
+    return [report for batch in results for report in batch]
+
+
+def _build_batch(batch: _Batch) -> list[PayReport]:
+    """Process-pool task: render and write attachments for one batch of employees."""
+    lines, summary = batch.lines, batch.summary
+    shown = lines.assign(**{AMOUNT_COLUMN: money_column(lines[AMOUNT_COLUMN])})
+    fragments = load_template(ROW_TEMPLATE).render_frame(shown)
+
+    # Each employee's lines are contiguous, so slices replace a second groupby
+    bounds = np.concatenate([[0], np.cumsum(summary["Lines"].to_numpy())])
+    spans = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+    summary = summary.assign(Rows=["".join(fragments[a:b]) for a, b in spans])
+    employees = summary[EMPLOYEE_COLUMN].tolist()
+    rendered = render_batch(
+        summary,
+        subject=compile_template(SUBJECT_TEMPLATE, escape=False),
+        html_body=load_template(BODY_TEMPLATE),
+        to=RECIPIENT_COLUMN,
+        to_override=batch.to_override,
+        keys=employees,
+    )
+
+    periods = text_column(summary["Pay Period"]).tolist()
+    # Cells are formatted column-wise once; each file is then a slice of ready rows
+    records = list(zip(*(text_column(lines[c]).tolist() for c in ATTACHMENT_COLUMNS)))
+    reports = []
+    for employee, period, msg, (a, b) in zip(employees, periods, rendered, spans):
+        attachment = None
+        if batch.out_dir is not None:
+            attachment = os.path.join(batch.out_dir, _safe_name(f"Pay Report {period} {employee}") + ".csv")
+            # utf-8-sig so Excel detects the encoding
+            with open(attachment, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f)
+                writer.writerow(ATTACHMENT_COLUMNS)
+                writer.writerows(records[a:b])
+        reports.append(PayReport(employee, msg, attachment, b - a, message_key(employee, period, msg.to, msg.html)))
+    return reports
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "report"
+
+
+def pay_report_jobs(
+    reports: Iterable[PayReport], *, send_on_behalf_of: Optional[str] = None
+) -> Iterator[SendJob]:
+    """SendJobs for SendEngine (reports without a recipient are left out)."""
+    seq = 0
+    for report in reports:
+        msg = report.message
+        if not msg.to:
+            continue
+        yield SendJob(seq, report.employee, dict(
+            html_body=msg.html,
+            to=msg.to,
+            subject=msg.subject,
+            attachments=[report.attachment] if report.attachment else None,
+            send_on_behalf_of=send_on_behalf_of,
+        ), dedupe_key=report.dedupe_key)
+        seq += 1
@@ -0,0 +1,186 @@
+# utils/preflight.py
+from __future__ import annotations
+import re
+from typing import Callable, Iterable, Mapping, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils.email_templates import text_column
+
+# Severities
+ERROR = "error"       # the row is not sent
+WARNING = "warning"   # the row is sent; listed for review
+
+ISSUE_COLUMNS = ["Excel Row", "Column", "Severity", "Problem", "Value"]
+
+# Pragmatic address syntax (what Exchange/SMTP relays accept in practice), not full RFC 5322
+EMAIL_PATTERN = (
+    r"[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+"
+    r"@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,}"
+)
+_SPLIT_ADDRESSES = r"\s*[;,]\s*"
+
+# resolve(distinct addresses) -> the ones the mail system cannot deliver to
+# (e.g. utils.transports.unresolved_recipients)
+Resolver = Callable[[list[str]], Iterable[str]]
+
+
+class PreflightReport:
+    """
+    Result of `run_preflight`: one issue per (row, column, problem), indexed by
+    the DataFrame's row label so it lines up with the loaded sheet.
+    """
+
+    def __init__(self, issues: pd.DataFrame, rows: int):
+        self.issues = issues
+        self.rows = rows
+
+    @property
+    def errors(self) -> int:
+        return int((self.issues["Severity"] == ERROR).sum())
+
+    @property
+    def warnings(self) -> int:
+        return int((self.issues["Severity"] == WARNING).sum())
+
+    @property
+    def error_rows(self) -> pd.Index:
+        """Row labels with at least one error."""
+        return self.issues.index[self.issues["Severity"] == ERROR].unique()
+
+    def ok_mask(self, df: pd.DataFrame) -> pd.Series:
+        """True for rows of `df` without errors."""
+        return pd.Series(~df.index.isin(self.error_rows), index=df.index)
+
+    def summary(self) -> str:
+        if self.issues.empty:
+            return f"Pre-flight: {self.rows:,} rows checked, no problems found."
+        return (
+            f"Pre-flight: {self.rows:,} rows checked — {self.errors:,} error(s) on "
+            f"{len(self.error_rows):,} row(s) (not sent), {self.warnings:,} warning(s)."
+        )
+
+
+def run_preflight(
+    df: pd.DataFrame,
+    *,
+    required: Sequence[str] = (),
+    recipients: Optional[str] = None,              # column with ';'/','-separated addresses
+    allowed_domains: Iterable[str] = (),           # empty = any domain; subdomains match
+    dates: Sequence[str] = (),
+    unique: Sequence[str] = (),
+    allowed_values: Optional[Mapping[str, Iterable[str]]] = None,
+    first_data_row: int = 2,                       # Excel row of df's first row (header is row 1)
+    row_numbers: Optional[Sequence[int]] = None,   # Excel row per df row, when df is not one block
+    resolve: Optional[Resolver] = None,            # address book check for `recipients`
+) -> PreflightReport:
+    """
+    Check the whole frame column-wise (no per-row Python loop):
+
+      - required columns are non-blank                         -> error
+      - every address in `recipients` is syntactically valid   -> error
+      - ...and on an allowed domain                            -> error
+      - ...and known to `resolve` (once per distinct address)  -> error
+      - `dates` columns hold dates or parseable date text      -> error
+      - `unique` columns have no repeated values               -> warning
+      - `allowed_values` columns use a known value             -> warning
+    """
+    if row_numbers is None:
+        row_numbers = np.arange(len(df)) + first_data_row
+    positions = pd.Series(np.asarray(row_numbers), index=df.index)
+    texts: dict[str, pd.Series] = {}
+
+    def text(col: str) -> pd.Series:
+        if col not in texts:
+            texts[col] = text_column(df[col]).str.strip()
+        return texts[col]
+
+    found: list[pd.DataFrame] = []
+
+    def add(mask: pd.Series, column: str, severity: str, problem: str | pd.Series, values: pd.Series) -> None:
+        mask = mask.to_numpy(dtype=bool)
+        if not mask.any():
+            return
+        idx = df.index[mask]
+        found.append(pd.DataFrame({
+            "Excel Row": positions.to_numpy()[mask],
+            "Column": column,
+            "Severity": severity,
+            "Problem": problem if isinstance(problem, str) else problem.to_numpy()[mask],
+            "Value": values.reindex(idx).to_numpy(),
+        }, index=idx))
+
+    for col in required:
+        add(text(col) == "", col, ERROR, "required value is blank", text(col))
+
+    if recipients:
+        _check_addresses(df, text(recipients), recipients, allowed_domains, add, resolve)
+
+    for col in dates:
+        _check_dates(df[col], text(col), col, add)
+
+    for col in unique:
+        values = text(col)
+        counts = values.map(values.value_counts())
+        dup = (values != "") & (counts > 1)
+        add(dup, col, WARNING, "appears on " + counts.astype(str) + " rows", values)
+
+    for col, allowed in (allowed_values or {}).items():
+        values = text(col)
+        known = {str(v).casefold() for v in allowed}
+        bad = (values != "") & ~values.str.casefold().isin(known)
+        add(bad, col, WARNING, "not one of: " + ", ".join(map(str, allowed)), values)
+
+    if found:
+        issues = pd.concat(found)
+        issues = issues.sort_values(["Excel Row", "Severity"], kind="stable")
+    else:
+        issues = pd.DataFrame(columns=ISSUE_COLUMNS)
+    return PreflightReport(issues[ISSUE_COLUMNS], len(df))
+
+
+def _check_addresses(df, values: pd.Series, col: str, allowed_domains: Iterable[str], add, resolve=None) -> None:
+    # One entry per address, keeping the row label (explode repeats the index)
+    addrs = values[values != ""].str.split(_SPLIT_ADDRESSES).explode()
+    addrs = addrs[addrs != ""]
+    if addrs.empty:
+        return
+
+    valid = addrs.str.fullmatch(EMAIL_PATTERN).fillna(False).astype(bool)
+    bad = addrs[~valid]
+    if not bad.empty:
+        joined = bad.groupby(level=0, sort=False).agg("; ".join)
+        add(df.index.to_series().isin(joined.index), col, ERROR, "invalid email address", joined)
+
+    good = addrs[valid]
+    domains = [d.strip().lower().lstrip("@") for d in allowed_domains if d and d.strip()]
+    if domains:
+        pattern = r"(?:^|\.)(?:" + "|".join(re.escape(d) for d in domains) + r")$"
+        host = good.str.rsplit("@", n=1).str[-1].str.lower()
+        inside = host.str.contains(pattern, regex=True)
+        outside = good[~inside]
+        if not outside.empty:
+            joined = outside.groupby(level=0, sort=False).agg("; ".join)
+            add(
+                df.index.to_series().isin(joined.index), col, ERROR,
+                "domain not allowed (allowed: " + ", ".join(domains) + ")", joined,
+            )
+        good = good[inside]
+
+    if resolve is not None and not good.empty:
+        # Only addresses that passed the checks above; each distinct one is resolved once
+        keys = good.str.lower()
+        unknown = {a.lower() for a in resolve(keys.unique().tolist())}
+        missing = good[keys.isin(unknown).to_numpy()]
+        if not missing.empty:
+            joined = missing.groupby(level=0, sort=False).agg("; ".join)
+            add(df.index.to_series().isin(joined.index), col, ERROR, "not found in the address book", joined)
+
+
+def _check_dates(values: pd.Series, text: pd.Series, col: str, add) -> None:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return  # already dates (blanks are NaT, left to `required`)
+    present = text != ""
+    # Cells Excel stored as dates arrive as datetime objects and parse as-is;
+    # text cells must be a date in some common format
+    parsed = pd.to_datetime(values.where(present), errors="coerce", format="mixed")
+    add(present & parsed.isna(), col, ERROR, "not a date", text)
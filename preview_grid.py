@@ -0,0 +1,202 @@
+# utils/preview_grid.py
+from __future__ import annotations
+import tkinter as tk
+from tkinter import ttk
+from typing import Optional
+import numpy as np
+import pandas as pd
+from utils.email_templates import format_value, text_column
+
+
+class DataFrameGrid(ttk.Frame):
+    """
+    Virtualized Treeview over a DataFrame.
+
+    Only the rows that fit in the widget are ever inserted; scrolling just swaps
+    their values from the frame, so a 100k-row sheet costs the same as a 50-row one.
+    Clicking a heading sorts (toggles asc/desc) and the filter box keeps rows that
+    contain the text in any column. Sorting/filtering only reorder an index array;
+    the DataFrame itself is never copied.
+    """
+
+    CHAR_PX = 7          # approx px per character (Segoe UI 9pt)
+    MIN_COL_PX = 60
+    MAX_COL_PX = 600
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+
+        self.df: Optional[pd.DataFrame] = None
+        self._view = np.arange(0)      # positions into df, after filter/sort
+        self._top = 0                  # first visible position in _view
+        self._rows = 20                # rows that fit in the widget
+        self._sort: Optional[tuple[str, bool]] = None  # (column, ascending)
+        self._search: Optional[dict[str, pd.Series]] = None  # lower-cased text per column
+        self._filter_job = None
+
+        # Toolbar: filter + counts
+        bar = ttk.Frame(self)
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 4))
+        bar.columnconfigure(1, weight=1)
+        ttk.Label(bar, text="Filter:").grid(row=0, column=0, padx=(0, 6))
+        self.filter_var = tk.StringVar(value="")
+        ttk.Entry(bar, textvariable=self.filter_var).grid(row=0, column=1, sticky="ew")
+        self.count_label = ttk.Label(bar, text="")
+        self.count_label.grid(row=0, column=2, padx=(8, 0))
+        self.filter_var.trace_add("write", lambda *_: self._schedule_filter())
+
+        # Treeview + scrollbars (vertical scrollbar drives our own window, not the tree)
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.vbar = ttk.Scrollbar(self, orient="vertical", command=self._on_vscroll)
+        xscroll = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=xscroll.set)
+
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.vbar.grid(row=1, column=1, sticky="ns")
+        xscroll.grid(row=2, column=0, sticky="ew")
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)            # Windows / macOS
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))  # X11
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._rows))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._rows))
+        self.tree.bind("<Home>", lambda e: self._scroll_to(0))
+        self.tree.bind("<End>", lambda e: self._scroll_to(len(self._view)))
+
+    # --- Public API ---
+    def set_frame(self, df: pd.DataFrame) -> None:
+        """Show `df` (kept by reference) from the top, clearing sort and filter."""
+        self.df = df
+        self._view = np.arange(len(df))
+        self._top = 0
+        self._sort = None
+        self._search = None
+        if self.filter_var.get():
+            self.filter_var.set("")  # trace schedules a no-op refilter
+
+        cols = [str(c) for c in df.columns]
+        self.tree.delete(*self.tree.get_children())
+        self.tree["columns"] = cols
+        for c in cols:
+            self.tree.heading(c, text=c, command=lambda c=c: self.sort_by(c))
+        self._autosize_columns()
+        self._refresh()
+
+    def sort_by(self, column: str, ascending: Optional[bool] = None) -> None:
+        """Sort the current view; with no direction given, a repeat click flips it."""
+        if self.df is None:
+            return
+        if ascending is None:
+            ascending = not (self._sort and self._sort[0] == column and self._sort[1])
+        values = self.df[column].iloc[self._view]
+        try:
+            order = values.reset_index(drop=True).sort_values(
+                ascending=ascending, kind="stable", na_position="last"
+            ).index.to_numpy()
+        except TypeError:
+            # Mixed types (e.g. dates and text in one column): sort by display text
+            order = text_column(values).reset_index(drop=True).sort_values(
+                ascending=ascending, kind="stable"
+            ).index.to_numpy()
+        self._view = self._view[order]
+        self._sort = (column, ascending)
+        for c in self.tree["columns"]:
+            arrow = (" ▲" if ascending else " ▼") if c == column else ""
+            self.tree.heading(c, text=c + arrow)
+        self._scroll_to(0)
+
+    # --- Filtering ---
+    def _schedule_filter(self) -> None:
+        # Debounce typing so each keystroke doesn't rescan the frame
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(250, self._apply_filter)
+
+    def _apply_filter(self) -> None:
+        self._filter_job = None
+        if self.df is None:
+            return
+        query = self.filter_var.get().strip().lower()
+        if not query:
+            view = np.arange(len(self.df))
+        else:
+            if self._search is None:
+                self._search = {c: text_column(self.df[c]).str.lower() for c in self.df.columns}
+            mask = np.zeros(len(self.df), dtype=bool)
+            for col in self._search.values():
+                mask |= col.str.contains(query, regex=False).to_numpy(dtype=bool)
+            view = np.flatnonzero(mask)
+        self._view = view
+        if self._sort:
+            self.sort_by(*self._sort)
+        else:
+            self._scroll_to(0)
+
+    # --- Windowing ---
+    def _refresh(self) -> None:
+        """Materialise the visible window into the Treeview's reusable rows."""
+        total = len(self._view)
+        n = max(0, min(self._rows, total - self._top))
+        items = list(self.tree.get_children())
+        if len(items) > n:
+            self.tree.delete(*items[n:])
+            items = items[:n]
+        while len(items) < n:
+            items.append(self.tree.insert("", "end", values=()))
+
+        if n and self.df is not None:
+            window = self.df.iloc[self._view[self._top:self._top + n]]
+            for iid, row in zip(items, window.itertuples(index=False, name=None)):
+                self.tree.item(iid, values=[format_value(v) for v in row])
+
+        if total:
+            self.vbar.set(self._top / total, (self._top + n) / total)
+        else:
+            self.vbar.set(0.0, 1.0)
+        shown = f"{self._top + 1:,}–{self._top + n:,}" if n else "0"
+        of = f"{total:,}" if self.df is None or total == len(self.df) else f"{total:,} (filtered from {len(self.df):,})"
+        self.count_label.config(text=f"Rows {shown} of {of}")
+
+    def _scroll_to(self, top: int) -> None:
+        top = max(0, min(int(top), len(self._view) - self._rows))
+        self._top = max(0, top)
+        self._refresh()
+
+    def _scroll_by(self, delta: int) -> str:
+        self._scroll_to(self._top + delta)
+        return "break"
+
+    def _on_vscroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * len(self._view))
+        elif action == "scroll":
+            step = self._rows if unit == "pages" else 1
+            self._scroll_by(int(amount) * step)
+
+    def _on_wheel(self, event) -> str:
+        # Windows reports multiples of 120; macOS reports small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * delta)
+
+    def _on_resize(self, event) -> None:
+        style = ttk.Style(self)
+        row_h = int(style.lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - row_h - 4) // row_h)  # minus the heading row
+        if rows != self._rows:
+            self._rows = rows
+            self._scroll_to(self._top)
+
+    # --- Layout ---
+    def _autosize_columns(self) -> None:
+        """Width from the 95th-percentile text length per column (vectorized)."""
+        if self.df is None:
+            return
+        sample = self.df if len(self.df) <= 20000 else self.df.sample(20000, random_state=0)
+        for c in self.df.columns:
+            lengths = text_column(sample[c]).str.len()
+            chars = max(len(str(c)) + 2, int(lengths.quantile(0.95)) if len(lengths) else 0)
+            px = min(self.MAX_COL_PX, max(self.MIN_COL_PX, chars * self.CHAR_PX))
+            self.tree.column(str(c), width=px, minwidth=self.MIN_COL_PX, anchor="w", stretch=False)
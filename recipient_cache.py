@@ -0,0 +1,97 @@
+# utils/recipient_cache.py
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+
+class Recipient(NamedTuple):
+    """What Outlook made of one address (plain data, so it can cross threads/COM apartments)."""
+    query: str            # the address as written, lower-cased (the cache key)
+    resolved: bool        # Recipient.Resolve() succeeded
+    smtp: str             # primary SMTP address ("" if unresolved)
+    name: str             # address book display name
+    is_list: bool         # Exchange or Outlook distribution list
+    in_directory: bool    # an address book entry, not just a one-off SMTP address
+
+
+class RecipientCache:
+    """
+    Thread-safe, TTL-bounded cache of resolved recipients and distribution lists.
+
+    - Shared by every sender session of a batch (and by pre-flight), so each
+      distinct address costs one Outlook round-trip per `ttl` seconds instead of
+      one per message.
+    - Unresolved addresses are cached too, so a bad address fails fast on every
+      row that uses it.
+    - At most `max_entries` addresses are kept (LRU).
+    """
+
+    def __init__(self, *, ttl: float = 900.0, max_entries: int = 50_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[Recipient, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(address: str) -> str:
+        return address.strip().lower()
+
+    def get(self, address: str) -> Optional[Recipient]:
+        key = self.key(address)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def lookup(self, addresses: Iterable[str]) -> tuple[dict[str, Recipient], list[str]]:
+        """(cached recipients by key, distinct keys that still need resolving)."""
+        found: dict[str, Recipient] = {}
+        missing: list[str] = []
+        seen_missing: set[str] = set()   # membership for `missing`, which keeps first-seen order
+        for address in addresses:
+            key = self.key(address)
+            if not key or key in found or key in seen_missing:
+                continue
+            hit = self.get(key)
+            if hit is None:
+                missing.append(key)
+                seen_missing.add(key)
+            else:
+                found[key] = hit
+        return found, missing
+
+    def put(self, recipient: Recipient) -> None:
+        with self._lock:
+            self._entries[recipient.query] = (recipient, time.monotonic())
+            self._entries.move_to_end(recipient.query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_shared: Optional[RecipientCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_recipients() -> RecipientCache:
+    """Process-wide cache used by transports that are not given their own."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RecipientCache()
+        return _shared
@@ -0,0 +1,232 @@
+# utils/send_engine.py
+from __future__ import annotations
+import queue
+import threading
+from email.message import Message
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, NamedTuple, Optional
+from utils.email_sender import OutlookEmailSender
+from utils.send_journal import CANCELLED, DELIVERED, FAILED, SENDING, SendJournal
+from utils.transports import DeliveryInDoubt
+
+if TYPE_CHECKING:
+    from utils.writeback import OutcomeLog
+
+
+class SendJob(NamedTuple):
+    """One message to send. `message` holds the keyword arguments for send_html."""
+    seq: int
+    key: Any            # caller's identifier, e.g. the DataFrame row index
+    message: dict
+    dedupe_key: Optional[str] = None   # send_journal.message_key(...) when journaling
+
+
+class SendResult(NamedTuple):
+    seq: int
+    key: Any
+    to: str
+    ok: bool
+    error: Optional[str] = None
+    message_id: Optional[str] = None
+    skipped: Optional[str] = None      # reason, when the journal says not to send
+
+
+_STOP = object()
+_WORKER_DONE = object()
+
+
+class SendEngine:
+    """
+    Sends a stream of jobs with N worker threads.
+
+    - Each worker opens its own sender via `sender_factory()` and keeps it for the
+      whole run, so every worker gets its own COM apartment (CoInitialize happens in
+      OutlookTransport.open on the worker thread) or its own SMTP session.
+    - Jobs are fed through a bounded queue, so a large DataFrame is never fully
+      materialised as pending messages.
+    - `run()` yields results in submission order regardless of completion order.
+    - With a SendJournal, jobs carrying a dedupe_key are checked in batches before
+      they are queued: already-delivered (or in-doubt) ones come back as skipped.
+      Each worker marks its job `sending` just before send_html and records the
+      outcome right after it returns, so a crash leaves only in-flight messages
+      in doubt.
+    - With an OutcomeLog (utils/writeback.py), every result, skipped ones
+      included, is also recorded there for the per-row write-back.
+    """
+
+    def __init__(
+        self,
+        sender_factory: Callable[[], OutlookEmailSender],
+        *,
+        workers: int = 4,
+        queue_size: Optional[int] = None,
+        journal: Optional[SendJournal] = None,
+        outcomes: Optional["OutcomeLog"] = None,
+    ):
+        self.sender_factory = sender_factory
+        self.journal = journal
+        self.outcomes = outcomes
+        self.workers = max(1, int(workers))
+        self.queue_size = queue_size or self.workers * 4
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop feeding new jobs; in-flight messages finish, queued ones are reported as cancelled."""
+        self._stop.set()
+
+    def run(self, jobs: Iterable[SendJob]) -> Iterator[SendResult]:
+        self._stop.clear()
+        work: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue[Any]" = queue.Queue()
+
+        feeder = threading.Thread(target=self._feed, args=(jobs, work, results), daemon=True)
+        threads = [
+            threading.Thread(target=self._work, args=(work, results), daemon=True, name=f"send-worker-{i}")
+            for i in range(self.workers)
+        ]
+        feeder.start()
+        for t in threads:
+            t.start()
+
+        # Re-order completions back into submission order
+        pending: dict[int, SendResult] = {}
+        next_seq = 0
+        running = len(threads)
+        try:
+            while running:
+                item = results.get()
+                if item is _WORKER_DONE:
+                    running -= 1
+                    continue
+                if isinstance(item, BaseException):
+                    # The job iterable itself failed; let workers drain and re-raise
+                    self._stop.set()
+                    for t in threads:
+                        t.join()
+                    raise item
+                if self.outcomes is not None:
+                    self.outcomes.record(item)
+                pending[item.seq] = item
+                while next_seq in pending:
+                    yield pending.pop(next_seq)
+                    next_seq += 1
+
+            feeder.join()
+            # Anything left means seq numbers had gaps; flush what we have in order
+            for seq in sorted(pending):
+                yield pending[seq]
+        finally:
+            # Also reached when the caller abandons the generator early
+            self._stop.set()
+            if self.journal is not None:
+                self.journal.flush()
+
+    # --- Threads ---
+    def _feed(self, jobs: Iterable[SendJob], work: queue.Queue, results: queue.Queue) -> None:
+        try:
+            if self.journal is None:
+                for job in jobs:
+                    if self._stop.is_set():
+                        break
+                    work.put(job)
+            else:
+                batch: list[SendJob] = []
+                for job in jobs:
+                    batch.append(job)
+                    if len(batch) >= self.queue_size:
+                        if not self._feed_journaled(batch, work, results):
+                            break
+                        batch = []
+                else:
+                    self._feed_journaled(batch, work, results)
+        except BaseException as e:
+            results.put(e)
+        finally:
+            for _ in range(self.workers):
+                work.put(_STOP)
+
+    def _feed_journaled(self, batch: list[SendJob], work: queue.Queue, results: queue.Queue) -> bool:
+        """Skip already-handled jobs and queue the rest (intent is written by the worker)."""
+        if self._stop.is_set():
+            return False
+        statuses = self.journal.statuses(j.dedupe_key for j in batch if j.dedupe_key)
+        fresh = []
+        for job in batch:
+            status = statuses.get(job.dedupe_key) if job.dedupe_key else None
+            if status == DELIVERED:
+                results.put(SendResult(job.seq, job.key, job.message.get("to", ""), False,
+                                       skipped="already sent in an earlier run"))
+            elif status == SENDING:
+                results.put(SendResult(job.seq, job.key, job.message.get("to", ""), False,
+                                       skipped="in doubt: an earlier run stopped while sending it"))
+            else:
+                work.put(job)
+        return not self._stop.is_set()
+
+    def _mark_sending(self, job: SendJob) -> None:
+        if self.journal is not None and job.dedupe_key:
+            self.journal.mark_sending([(job.dedupe_key, job.key, job.message.get("to", ""))])
+
+    def _record(self, job: SendJob, status: str, message_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        if self.journal is not None and job.dedupe_key:
+            self.journal.record(job.dedupe_key, status, message_id=message_id, error=error)
+
+    def _work(self, work: queue.Queue, results: queue.Queue) -> None:
+        try:
+            try:
+                sender = self.sender_factory()
+                sender.__enter__()
+            except Exception as e:
+                # Could not open a session on this thread: fail our share of the jobs
+                # instead of leaving them stuck in the queue.
+                self._drain(work, results, f"Could not start sender: {e}")
+                return
+
+            try:
+                while True:
+                    job = work.get()
+                    if job is _STOP:
+                        break
+                    to = job.message.get("to", "")
+                    if self._stop.is_set():
+                        self._record(job, CANCELLED)
+                        results.put(SendResult(job.seq, job.key, to, False, "Cancelled"))
+                        continue
+                    try:
+                        self._mark_sending(job)
+                        value = sender.send_html(**job.message)
+                    except Exception as e:
+                        # In doubt stays `sending`, so a re-run skips it rather than risk a duplicate
+                        self._record(job, SENDING if isinstance(e, DeliveryInDoubt) else FAILED, error=str(e))
+                        results.put(SendResult(job.seq, job.key, to, False, str(e)))
+                        continue
+                    message_id = _message_id(value)
+                    self._record(job, DELIVERED, message_id=message_id)
+                    results.put(SendResult(job.seq, job.key, to, True, None, message_id))
+            finally:
+                sender.__exit__(None, None, None)
+        finally:
+            results.put(_WORKER_DONE)
+
+    def _drain(self, work: queue.Queue, results: queue.Queue, error: str) -> None:
+        while True:
+            job = work.get()
+            if job is _STOP:
+                return
+            self._record(job, FAILED, error=error)
+            results.put(SendResult(job.seq, job.key, job.message.get("to", ""), False, error))
+
+
+def _message_id(value: Any) -> Optional[str]:
+    """Pull an identifier off the transport's message object on the worker thread.
+
+    COM objects must not leave the apartment that created them, so only a string
+    is passed back to the caller.
+    """
+    if value is None:
+        return None
+    if isinstance(value, Message):
+        return value.get("Message-ID")
+    try:
+        return str(value.EntryID) or None    # Outlook MailItem (empty until saved/sent)
+    except Exception:
+        return None
@@ -0,0 +1,183 @@
+# utils/send_journal.py
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from utils.pathing import app_data_path
+
+# Statuses
+SENDING = "sending"       # handed to a worker; outcome unknown until recorded
+DELIVERED = "delivered"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Rows in these states are never handed out again on resume
+SKIP_STATUSES = (DELIVERED, SENDING)
+
+
+def message_key(*parts) -> str:
+    """Stable identity for a rendered message, e.g. message_key(project_id, to, html)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(("" if part is None else str(part)).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class SendJournal:
+    """
+    Durable record of what was sent, in SQLite (WAL mode), keyed by message_key.
+
+    Crash safety comes from writing intent before sending: each worker marks its
+    job `sending` just before handing it to the transport, and outcomes are
+    buffered but flushed ahead of every intent write, so after a crash only the
+    messages that were actually in flight are left `sending`. On resume:
+      - `delivered` rows are skipped,
+      - `sending` rows (the app died between send and record) are also skipped and
+        reported as in doubt, because resending them could duplicate mail,
+      - `failed`/`cancelled` rows are sent again.
+    Use `release_in_doubt()` (`journal --release-in-doubt`, or "Release in-doubt"
+    in the app) after checking Sent Items to allow those to go again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        *,
+        flush_every: int = 100,
+        flush_interval: float = 1.0,
+    ):
+        self.path = Path(path or app_data_path("journal", "sends.sqlite3"))
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []
+        self._last_flush = time.monotonic()
+
+        # Used from the engine's feeder and consumer threads; access is serialised by _lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                key         TEXT PRIMARY KEY,
+                status      TEXT NOT NULL,
+                row_key     TEXT,
+                recipient   TEXT,
+                message_id  TEXT,
+                error       TEXT,
+                attempts    INTEGER NOT NULL DEFAULT 0,
+                updated_at  TEXT NOT NULL
+            )
+            """
+        )
+
+    # --- Context manager API ---
+    def __enter__(self) -> "SendJournal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+
+    # --- Queries ---
+    def statuses(self, keys: Iterable[str]) -> dict[str, str]:
+        """Current status for each known key (unknown keys are omitted)."""
+        keys = list(keys)
+        out: dict[str, str] = {}
+        with self._lock:
+            self._flush_locked()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, status in self._conn.execute(
+                    f"SELECT key, status FROM messages WHERE key IN ({marks})", chunk
+                ):
+                    out[key] = status
+        return out
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            self._flush_locked()
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status"))
+
+    # --- Writes ---
+    def mark_sending(self, entries: Iterable[tuple[str, object, str]]) -> None:
+        """Record intent for (key, row_key, recipient) in one transaction, before sending.
+
+        Buffered outcomes are flushed first, so a delivered message is never left
+        looking in doubt behind a later intent.
+        """
+        now = _now()
+        rows = [(key, str(row_key), to, now) for key, row_key, to in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"""
+                INSERT INTO messages (key, status, row_key, recipient, attempts, updated_at)
+                VALUES (?, '{SENDING}', ?, ?, 1, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    status='{SENDING}', row_key=excluded.row_key, recipient=excluded.recipient,
+                    error=NULL, attempts=attempts + 1, updated_at=excluded.updated_at
+                """,
+                rows,
+            )
+            self._conn.execute("COMMIT")
+
+    def record(self, key: str, status: str, *, message_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Buffer an outcome; written in batches (count or time based)."""
+        with self._lock:
+            self._pending.append((status, message_id, error, _now(), key))
+            if (
+                len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def release_in_doubt(self) -> int:
+        """Allow rows stuck in `sending` to be sent again; returns how many."""
+        with self._lock:
+            self._flush_locked()
+            cur = self._conn.execute(
+                f"UPDATE messages SET status='{FAILED}', error='released from in-doubt', updated_at=? "
+                f"WHERE status='{SENDING}'",
+                (_now(),),
+            )
+            return cur.rowcount
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending or self._conn is None:
+            return
+        rows, self._pending = self._pending, []
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "UPDATE messages SET status=?, message_id=?, error=?, updated_at=? WHERE key=?",
+            rows,
+        )
+        self._conn.execute("COMMIT")
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,169 @@
+# utils/sender_pool.py
+from __future__ import annotations
+import re
+import threading
+from typing import NamedTuple, Optional
+from utils.metrics import inc
+from utils.throttle import Pacer
+from utils.transports import split_addresses
+
+# [behalf:]ADDRESS[*WEIGHT][/RATE], e.g. "ops2@corp.com*2/8" or "behalf:disputes@corp.com"
+_ENTRY = re.compile(
+    r"^(?P<behalf>behalf:)?(?P<address>[^*/\s]+)(?:\*(?P<weight>\d+))?(?:/(?P<rate>\d+(?:\.\d+)?))?$",
+    re.IGNORECASE,
+)
+
+
+class Mailbox(NamedTuple):
+    """One sending identity of a SenderPool."""
+    address: str
+    weight: int = 1           # share of the traffic relative to the other mailboxes
+    rate: float = 5.0         # this mailbox's own send budget, messages per second
+    on_behalf: bool = False   # True: SentOnBehalfOfName; False: SendUsingAccount (an account in the profile)
+
+
+def parse_mailboxes(spec: str, *, rate: float = 5.0) -> list[Mailbox]:
+    """
+    Mailboxes from a ';'/','-separated list of `[behalf:]ADDRESS[*WEIGHT][/RATE]`:
+
+        "ops1@corp.com; ops2@corp.com*2/8; behalf:disputes@corp.com"
+
+    Plain addresses are Outlook accounts (SendUsingAccount); `behalf:` ones are
+    mailboxes to send on behalf of. `rate` is the default budget per mailbox.
+    """
+    mailboxes = []
+    for entry in re.split(r"\s*[;,]\s*", spec or ""):
+        if not entry.strip():
+            continue
+        m = _ENTRY.match(entry.strip())
+        if m is None or "@" not in m["address"]:
+            raise ValueError(f"Not a mailbox entry: {entry!r} (expected [behalf:]ADDRESS[*WEIGHT][/RATE])")
+        weight = int(m["weight"] or 1)
+        budget = float(m["rate"] or rate)
+        if weight < 1 or budget <= 0:
+            raise ValueError(f"Mailbox weight must be at least 1 and rate above 0: {entry!r}")
+        mailboxes.append(Mailbox(m["address"].lower(), weight, budget, bool(m["behalf"])))
+    return mailboxes
+
+
+class SenderPool:
+    """
+    Spreads one batch over several mailboxes, so it is no longer capped by a
+    single mailbox's throttling quota.
+
+    - Messages are assigned by smooth weighted round-robin. A mailbox whose
+      pacer has backed off (throttling) gets a proportionally smaller share.
+    - Each mailbox has its own Pacer: token bucket capped at `Mailbox.rate`,
+      AIMD, retries and per-domain breakers, so a throttled mailbox slows down
+      alone.
+    - Sticky recipients: every message to the same recipients goes out through
+      the mailbox that sent them the first one, so a thread stays on one identity.
+
+    Use one PooledSender per worker thread, all sharing the pool. Outlook
+    backend only: over SMTP every mailbox would share the one authenticated
+    login (and its quota) and need Send As rights, so the CLI rejects
+    --mailboxes with --smtp-host.
+    """
+
+    def __init__(self, mailboxes: list[Mailbox], *, sticky: bool = True, **pacer_options):
+        if not mailboxes:
+            raise ValueError("A sender pool needs at least one mailbox.")
+        self.mailboxes = list(mailboxes)
+        self.sticky = sticky
+        # The mailbox's rate is its ceiling: AIMD only backs off from it and recovers to it
+        self.pacers = [
+            Pacer(**{
+                "rate": m.rate, "burst": max(1.0, m.rate), "max_rate": m.rate, "min_rate": min(0.2, m.rate),
+                **pacer_options,
+            })
+            for m in self.mailboxes
+        ]
+        self.assigned = [0] * len(self.mailboxes)
+
+        self._lock = threading.Lock()
+        self._current = [0.0] * len(self.mailboxes)   # smooth WRR state
+        self._threads: dict[str, int] = {}            # recipients key -> mailbox index
+
+    def assign(self, to: str) -> int:
+        """Index of the mailbox that sends a message to `to`."""
+        key = ";".join(sorted(a.lower() for a in split_addresses(to))) if self.sticky else ""
+        with self._lock:
+            if key:
+                i = self._threads.get(key)
+                if i is not None:
+                    self.assigned[i] += 1
+                    return i
+            i = self._next()
+            if key:
+                self._threads[key] = i
+            self.assigned[i] += 1
+            return i
+
+    def _next(self) -> int:
+        # Smooth weighted round-robin (nginx): every mailbox gains its effective
+        # weight, the leader is picked and pays back the total
+        weights = [
+            m.weight * min(1.0, pacer.bucket.rate / m.rate)
+            for m, pacer in zip(self.mailboxes, self.pacers)
+        ]
+        total = sum(weights)
+        for i, w in enumerate(weights):
+            self._current[i] += w
+        best = max(range(len(weights)), key=self._current.__getitem__)
+        self._current[best] -= total
+        return best
+
+    def describe(self) -> str:
+        return " || ".join(
+            f"{m.address}: assigned {n} | {pacer.describe()}"
+            for m, n, pacer in zip(self.mailboxes, self.assigned, self.pacers)
+        )
+
+    def route(self, kwargs: dict) -> tuple[int, dict, str]:
+        """
+        (mailbox index, send_html kwargs, recipient domain) for one message;
+        the kwargs are a copy with the assigned mailbox as the sender.
+        """
+        to = kwargs.get("to", "")
+        i = self.assign(to)
+        mailbox = self.mailboxes[i]
+        kwargs = dict(kwargs)
+        if mailbox.on_behalf:
+            kwargs["send_on_behalf_of"] = mailbox.address
+        else:
+            # Another account's quota; an on-behalf-of identity on the message is kept
+            kwargs["account_smtp"] = mailbox.address
+        addrs = split_addresses(to)
+        return i, kwargs, addrs[0].rpartition("@")[2] if addrs else ""
+
+
+class PooledSender:
+    """
+    Wraps an OutlookEmailSender so each send_html goes out through the pool's
+    mailbox for its recipients, paced by that mailbox's Pacer. Same
+    context-manager API and send_html signature as the wrapped sender
+    (a drop-in for PacedSender).
+    """
+
+    def __init__(self, sender, pool: SenderPool):
+        self.sender = sender
+        self.pool = pool
+
+    def __enter__(self) -> "PooledSender":
+        self.sender.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.sender.__exit__(exc_type, exc, tb)
+
+    def send_html(self, **kwargs):
+        i, kwargs, domain = self.pool.route(kwargs)
+        result = self.pool.pacers[i].call(lambda: self.sender.send_html(**kwargs), domain=domain)
+        inc("pool_messages_total", mailbox=self.pool.mailboxes[i].address)
+        return result
+
+
+def pool_from_spec(spec: Optional[str], *, rate: float = 5.0) -> Optional[SenderPool]:
+    """A SenderPool for a non-empty mailbox list (see parse_mailboxes), else None."""
+    mailboxes = parse_mailboxes(spec or "", rate=rate)
+    return SenderPool(mailboxes) if mailboxes else None
@@ -0,0 +1,10 @@
+# utils/tests/conftest.py
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def app_data(tmp_path, monkeypatch):
+    """Point app_data_path (journals, snapshots, caches) at a per-test folder."""
+    monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "appdata"))
+    return tmp_path / "appdata" / "EmailAutomation"
@@ -0,0 +1,94 @@
+# utils/tests/test_incremental.py
+import datetime
+import openpyxl
+import pytest
+from utils import disputes
+from utils.incremental import IncrementalLoad, Snapshot, snapshot_path
+
+
+def row(n, to="a@x.com"):
+    return [
+        "Sam", f"P-{n}", datetime.datetime(2024, 1, 1) + datetime.timedelta(days=n), "Refund", "ctx",
+        "Closer", "Approved", "", "Mgr", "Setter", "Closer", to,
+    ]
+
+
+def write_sheet(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = disputes.EXPECTED_SHEET
+    for r, values in enumerate([disputes.EXPECTED_COLUMNS, *rows], start=1):
+        for c, value in enumerate(values, start=disputes.FIRST_COLUMN):
+            ws.cell(row=r, column=c, value=value)
+    wb.save(path)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "disputes.xlsx"
+    write_sheet(path, [row(n) for n in range(5)])
+    return path
+
+
+def test_first_run_reads_everything_and_commit_remembers_it(workbook):
+    run = IncrementalLoad.open(workbook)
+    assert (run.mode, run.new, run.changed) == ("full", 5, 0)
+
+    snap = run.commit()
+    assert snap.rows == 5 and snap.pending == 0
+    assert Snapshot.load(snapshot_path(workbook)).done.all()
+
+    again = IncrementalLoad.open(workbook)
+    assert again.mode == "tail"
+    assert again.changes.empty and again.unchanged == 5
+
+
+def test_failed_rows_stay_pending(workbook):
+    run = IncrementalLoad.open(workbook)
+    snap = run.commit(failed=[1, 3])
+    assert snap.done.tolist() == [True, False, True, False, True]
+
+    # Pending rows force a full read, which offers only those rows again
+    retry = IncrementalLoad.open(workbook)
+    assert retry.mode == "full"
+    assert retry.changes.index.tolist() == [1, 3]
+    assert retry.commit().pending == 0
+
+
+def test_commit_only_marks_handled_rows(workbook):
+    run = IncrementalLoad.open(workbook)
+    snap = run.commit(handled=run.changes.index[:2])
+    assert snap.done.tolist() == [True, True, False, False, False]
+
+
+def test_failed_digest_groups_stay_pending(tmp_path):
+    path = tmp_path / "digests.xlsx"
+    write_sheet(path, [row(0, "a@x.com"), row(1, "b@x.com"), row(2, "a@x.com")])
+    run = IncrementalLoad.open(path)
+    snap = run.commit(failed=["a@x.com"], group_by=disputes.RECIPIENT_COLUMN)
+    assert snap.done.tolist() == [False, True, False]
+
+
+def test_appended_rows_are_read_from_the_tail(workbook):
+    IncrementalLoad.open(workbook).commit()
+    write_sheet(workbook, [row(n) for n in range(7)])
+
+    run = IncrementalLoad.open(workbook)
+    assert (run.mode, run.new, run.changed, run.unchanged) == ("tail", 2, 0, 5)
+    assert run.changes.index.tolist() == [5, 6]
+    assert run.changes["Project ID"].tolist() == ["P-5", "P-6"]
+
+    snap = run.commit()
+    assert snap.rows == 7 and snap.pending == 0
+    assert IncrementalLoad.open(workbook).changes.empty
+
+
+def test_edited_rows_are_found_by_a_full_read(workbook):
+    IncrementalLoad.open(workbook).commit()
+    rows = [row(n) for n in range(5)]
+    rows[2][6] = "Denied"
+    write_sheet(workbook, rows)
+
+    run = IncrementalLoad.open(workbook, full=True)
+    assert (run.new, run.changed) == (0, 1)
+    assert run.changes.index.tolist() == [2]
@@ -0,0 +1,73 @@
+# utils/tests/test_preflight.py
+import datetime
+import pandas as pd
+import pytest
+from utils.preflight import ERROR, ISSUE_COLUMNS, WARNING, run_preflight
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Project ID": ["P-1", "P-2", "", "P-1"],
+        "To": ["a@corp.com", "b@corp.com; nope", "c@sub.corp.com", "d@gmail.com"],
+        "Date": [datetime.datetime(2024, 1, 2), "2024-01-03", "soon", None],
+        "Outcome": ["Approved", "approved", "Maybe", ""],
+    })
+
+
+def issues(report):
+    return [(row, col, sev) for row, col, sev in report.issues[["Excel Row", "Column", "Severity"]].itertuples(index=False)]
+
+
+def test_clean_frame_has_no_issues():
+    report = run_preflight(pd.DataFrame({"To": ["a@x.com", "b@y.org"]}), recipients="To")
+    assert report.issues.empty
+    assert list(report.issues.columns) == ISSUE_COLUMNS
+    assert report.summary() == "Pre-flight: 2 rows checked, no problems found."
+
+
+def test_required_and_addresses(df):
+    report = run_preflight(df, required=["Project ID"], recipients="To")
+    assert issues(report) == [(3, "To", ERROR), (4, "Project ID", ERROR)]
+    assert report.issues.loc[1, "Value"] == "nope"
+    assert report.error_rows.tolist() == [1, 2]
+    assert report.ok_mask(df).tolist() == [True, False, False, True]
+
+
+def test_allowed_domains_match_subdomains(df):
+    report = run_preflight(df, recipients="To", allowed_domains=["@Corp.com"])
+    outside = report.issues[report.issues["Problem"].str.startswith("domain not allowed")]
+    assert outside.index.tolist() == [3]
+    assert outside["Value"].tolist() == ["d@gmail.com"]
+
+
+def test_resolve_is_called_once_per_distinct_address():
+    frame = pd.DataFrame({"To": ["a@x.com", "A@x.com; b@x.com", "b@x.com", "bad"]})
+    calls = []
+
+    def resolve(addresses):
+        calls.append(sorted(addresses))
+        return ["b@x.com"]
+
+    report = run_preflight(frame, recipients="To", resolve=resolve)
+    assert calls == [["a@x.com", "b@x.com"]]
+    unknown = report.issues[report.issues["Problem"] == "not found in the address book"]
+    assert unknown.index.tolist() == [1, 2]
+
+
+def test_dates_unique_and_allowed_values(df):
+    report = run_preflight(df, dates=["Date"], unique=["Project ID"], allowed_values={"Outcome": ["Approved", "Denied"]})
+    assert issues(report) == [
+        (2, "Project ID", WARNING),
+        (4, "Date", ERROR),
+        (4, "Outcome", WARNING),
+        (5, "Project ID", WARNING),
+    ]
+    assert report.issues.loc[0, "Problem"] == "appears on 2 rows"
+    assert (report.errors, report.warnings) == (1, 3)
+
+
+def test_row_numbers_follow_the_sheet():
+    frame = pd.DataFrame({"To": ["bad", "ok@x.com"]}, index=[10, 11])
+    assert issues(run_preflight(frame, recipients="To", first_data_row=12)) == [(12, "To", ERROR)]
+    assert issues(run_preflight(frame, recipients="To", row_numbers=[40, 7])) == [(40, "To", ERROR)]
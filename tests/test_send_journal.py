@@ -0,0 +1,97 @@
+# utils/tests/test_send_journal.py
+import pytest
+from utils.send_engine import SendEngine, SendJob
+from utils.send_journal import DELIVERED, FAILED, SENDING, SendJournal, message_key
+from utils.transports import DeliveryInDoubt
+
+
+class FakeSender:
+    """send_html stand-in: records what was sent, raises for addresses in `fail`."""
+
+    def __init__(self, sent: list, fail: dict):
+        self.sent = sent
+        self.fail = fail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send_html(self, *, to, subject, html_body):
+        if to in self.fail:
+            raise self.fail[to]
+        self.sent.append(to)
+
+
+def jobs(addresses):
+    return [
+        SendJob(i, i, {"to": to, "subject": "s", "html_body": f"<p>{to}</p>"}, message_key(i, to))
+        for i, to in enumerate(addresses)
+    ]
+
+
+def run(journal, addresses, fail=None):
+    sent = []
+    engine = SendEngine(lambda: FakeSender(sent, fail or {}), workers=2, journal=journal)
+    return list(engine.run(jobs(addresses))), sent
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with SendJournal(tmp_path / "sends.sqlite3", flush_interval=60) as j:
+        yield j
+
+
+ADDRESSES = ["a@x.com", "b@x.com", "c@x.com"]
+
+
+def test_resume_skips_delivered_and_resends_failed(journal):
+    results, sent = run(journal, ADDRESSES, fail={"b@x.com": RuntimeError("mailbox full")})
+    assert [r.ok for r in results] == [True, False, True]
+    assert sorted(sent) == ["a@x.com", "c@x.com"]
+
+    results, sent = run(journal, ADDRESSES)
+    assert sent == ["b@x.com"]
+    assert [r.skipped for r in results] == [
+        "already sent in an earlier run", None, "already sent in an earlier run",
+    ]
+    assert journal.counts() == {DELIVERED: 3}
+
+
+def test_in_doubt_is_skipped_until_released(journal):
+    results, sent = run(journal, ADDRESSES, fail={"b@x.com": DeliveryInDoubt("connection lost after DATA")})
+    assert not results[1].ok
+    assert journal.statuses([jobs(ADDRESSES)[1].dedupe_key]) == {jobs(ADDRESSES)[1].dedupe_key: SENDING}
+
+    results, sent = run(journal, ADDRESSES)
+    assert sent == []
+    assert results[1].skipped.startswith("in doubt")
+
+    assert journal.release_in_doubt() == 1
+    results, sent = run(journal, ADDRESSES)
+    assert sent == ["b@x.com"]
+    assert journal.counts() == {DELIVERED: 3}
+
+
+def test_crash_leaves_only_in_flight_messages_in_doubt(tmp_path):
+    path = tmp_path / "sends.sqlite3"
+    journal = SendJournal(path, flush_every=100, flush_interval=60)
+    journal.mark_sending([("k1", 1, "a@x.com")])
+    journal.record("k1", DELIVERED)            # buffered, not yet written
+    journal.mark_sending([("k2", 2, "b@x.com")])
+    # The process dies here: journal is never flushed or closed
+
+    with SendJournal(path) as reopened:
+        assert reopened.statuses(["k1", "k2", "k3"]) == {"k1": DELIVERED, "k2": SENDING}
+    journal.close()
+
+
+def test_release_in_doubt_leaves_other_statuses(journal):
+    journal.mark_sending([("k1", 1, "a@x.com"), ("k2", 2, "b@x.com"), ("k3", 3, "c@x.com")])
+    journal.record("k1", DELIVERED)
+    journal.record("k2", FAILED, error="bounced")
+
+    assert journal.release_in_doubt() == 1
+    assert journal.statuses(["k1", "k2", "k3"]) == {"k1": DELIVERED, "k2": FAILED, "k3": FAILED}
+    assert journal.release_in_doubt() == 0
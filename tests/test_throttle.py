@@ -0,0 +1,165 @@
+# utils/tests/test_throttle.py
+import smtplib
+import pytest
+from utils import throttle
+from utils.throttle import (
+    PERMANENT, THROTTLED, TRANSIENT, AimdController, CircuitBreaker, Pacer, TokenBucket, classify_error,
+)
+from utils.transports import DeliveryInDoubt
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the throttle module; advance with clock.now += seconds."""
+    class Clock:
+        now = 1000.0
+
+        def monotonic(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    c = Clock()
+    monkeypatch.setattr(throttle.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(throttle.time, "sleep", c.sleep)
+    return c
+
+
+# --- TokenBucket ---
+def test_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+
+
+def test_bucket_never_stores_more_than_burst(clock):
+    bucket = TokenBucket(rate=10.0, burst=2)
+    clock.now += 60
+    assert [bucket.take() for _ in range(3)][-1] == pytest.approx(0.1)
+
+
+def test_bucket_acquire_waits_for_tokens(clock):
+    bucket = TokenBucket(rate=4.0, burst=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.25)
+
+
+# --- AIMD ---
+def test_aimd_increases_after_a_clean_window(clock):
+    bucket = TokenBucket(rate=5.0)
+    aimd = AimdController(bucket, increase=1.0, window=3, target_latency=2.0)
+    for _ in range(2):
+        aimd.on_success(0.1)
+    assert bucket.rate == 5.0
+    aimd.on_success(0.1)
+    assert bucket.rate == 6.0
+
+
+def test_aimd_cuts_on_throttle_and_trims_on_slow_sends(clock):
+    bucket = TokenBucket(rate=8.0)
+    aimd = AimdController(bucket, decrease=0.5, slow_factor=0.9, target_latency=2.0, window=2)
+    aimd.on_success(0.1)
+    aimd.on_throttle()
+    assert bucket.rate == 4.0
+    aimd.on_success(0.1)            # the streak restarted after the throttle
+    assert bucket.rate == 4.0
+    aimd.on_success(5.0)
+    assert bucket.rate == pytest.approx(3.6)
+
+
+def test_aimd_stays_within_bounds(clock):
+    bucket = TokenBucket(rate=1.0)
+    aimd = AimdController(bucket, min_rate=0.5, max_rate=2.0, increase=5.0, window=1)
+    for _ in range(5):
+        aimd.on_throttle()
+    assert bucket.rate == 0.5
+    aimd.on_success(0.1)
+    assert bucket.rate == 2.0
+
+
+# --- CircuitBreaker ---
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.wait_time() == 0.0
+    breaker.record_failure()
+    assert breaker.wait_time() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.wait_time() == 0.0      # this caller is the probe
+    assert breaker.wait_time() >= 1.0      # everyone else waits for its outcome
+
+    breaker.record_success()
+    assert breaker.wait_time() == 0.0
+    assert breaker.wait_time() == 0.0
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.wait_time() == 0.0
+    breaker.record_failure()
+    assert breaker.wait_time() == pytest.approx(10)
+
+
+def test_breaker_release_probe_keeps_it_open_for_the_next_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.wait_time() == 0.0
+    breaker.release_probe()
+    assert breaker.wait_time() == 0.0      # another caller may probe now
+    assert breaker.wait_time() >= 1.0      # but only one at a time: still half-open
+
+
+def test_permanent_error_does_not_close_the_breaker(clock):
+    pacer = Pacer(rate=100, burst=100, breaker_threshold=1, breaker_cooldown=10)
+    breaker = pacer.breaker("x.com")
+    breaker.record_failure()
+    clock.now += 10
+
+    def bounce():
+        raise smtplib.SMTPRecipientsRefused({"a@x.com": (550, b"no such user")})
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pacer.call(bounce, domain="x.com")
+    assert pacer.stats["failed"] == 1
+    assert breaker.wait_time() == 0.0      # probe slot freed ...
+    assert breaker.wait_time() >= 1.0      # ... but the circuit was not closed
+
+
+def test_pacer_retries_transient_errors(clock, monkeypatch):
+    monkeypatch.setattr(throttle.random, "uniform", lambda a, b: b)
+    pacer = Pacer(rate=100, burst=100, backoff_base=1.0)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) < 3:
+            raise smtplib.SMTPServerDisconnected("dropped")
+        return "ok"
+
+    assert pacer.call(flaky, domain="x.com") == "ok"
+    assert pacer.stats == {"sent": 1, "retries": 2, "throttled": 0, "failed": 0}
+    assert calls[2] - calls[0] == pytest.approx(1.0 + 2.0)
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (smtplib.SMTPResponseException(421, b"try again later"), THROTTLED),
+    (smtplib.SMTPResponseException(451, b"local error"), THROTTLED),
+    (smtplib.SMTPResponseException(454, b"tls unavailable"), TRANSIENT),
+    (smtplib.SMTPResponseException(550, b"rejected"), PERMANENT),
+    (smtplib.SMTPServerDisconnected("gone"), TRANSIENT),
+    (DeliveryInDoubt("dropped after DATA"), PERMANENT),
+    (RuntimeError("The server is busy (0x80040115)"), THROTTLED),
+    (RuntimeError("Network connection timed out"), TRANSIENT),
+    (ValueError("bad address"), PERMANENT),
+])
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
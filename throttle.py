@@ -0,0 +1,357 @@
+# utils/throttle.py
+from __future__ import annotations
+import asyncio
+import random
+import re
+import smtplib
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+from utils.transports import DeliveryInDoubt, split_addresses
+
+T = TypeVar("T")
+
+# Outcome classes for a failed send
+THROTTLED = "throttled"     # server asked us to slow down; retry later, cut the rate
+TRANSIENT = "transient"     # temporary failure; retry with backoff
+PERMANENT = "permanent"     # bad address/content; retrying will not help
+
+_THROTTLE_TEXT = re.compile(
+    r"throttl|too many|rate limit|limit exceeded|exceeded the|server is busy|try again later"
+    r"|4\.7\.\d|RpcServerTooBusy|0x80040115|0x8004010F",
+    re.IGNORECASE,
+)
+_TRANSIENT_TEXT = re.compile(r"timed? ?out|temporar|connection|network|unavailable", re.IGNORECASE)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a recipient domain's circuit stays open longer than the pause budget."""
+
+
+def classify_error(exc: BaseException) -> str:
+    """Map a transport exception to THROTTLED / TRANSIENT / PERMANENT."""
+    if isinstance(exc, CircuitOpenError):
+        return TRANSIENT
+    if isinstance(exc, DeliveryInDoubt):
+        # May already be delivered; a retry could send it twice
+        return PERMANENT
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        if codes and all(400 <= c < 500 for c in codes):
+            return THROTTLED if any(c in (421, 450, 451, 452) for c in codes) else TRANSIENT
+        return PERMANENT
+    if isinstance(exc, smtplib.SMTPResponseException):
+        code = exc.smtp_code
+        text = exc.smtp_error.decode("utf-8", "replace") if isinstance(exc.smtp_error, bytes) else str(exc.smtp_error)
+        if code in (421, 450, 451, 452) or _THROTTLE_TEXT.search(text):
+            return THROTTLED
+        return TRANSIENT if 400 <= code < 500 else PERMANENT
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)):
+        return TRANSIENT
+
+    # Outlook/COM: pywintypes.com_error carries the Exchange text in its args
+    text = " ".join(str(a) for a in getattr(exc, "args", ()) or (exc,))
+    if _THROTTLE_TEXT.search(text):
+        return THROTTLED
+    if _TRANSIENT_TEXT.search(text):
+        return TRANSIENT
+    return PERMANENT
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self._lock = threading.Lock()
+        self._rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = float(rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            delay = self.take(tokens)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def take(self, tokens: float = 1.0) -> float:
+        """Non-blocking acquire: 0 if `tokens` were taken, else seconds until they may be."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self._rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+
+class AimdController:
+    """
+    Additive-increase / multiplicative-decrease on a TokenBucket's rate.
+
+    - every `window` clean sends below `target_latency`: rate += `increase`
+    - a slow send (above target_latency) trims the rate by `slow_factor`
+    - a throttling response cuts it by `decrease`
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        *,
+        min_rate: float = 0.2,
+        max_rate: float = 30.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        slow_factor: float = 0.9,
+        target_latency: float = 2.0,
+        window: int = 10,
+    ):
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.target_latency = target_latency
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._streak = 0
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            if latency > self.target_latency:
+                self._streak = 0
+                self._set(self.bucket.rate * self.slow_factor)
+                return
+            self._streak += 1
+            if self._streak >= self.window:
+                self._streak = 0
+                self._set(self.bucket.rate + self.increase)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self._streak = 0
+            self._set(self.bucket.rate * self.decrease)
+
+    def _set(self, rate: float) -> None:
+        self.bucket.set_rate(max(self.min_rate, min(self.max_rate, rate)))
+
+
+class CircuitBreaker:
+    """
+    Per-domain breaker: opens after `threshold` consecutive failures, stays open
+    for `cooldown` seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    def wait_time(self) -> float:
+        """0 if a send may go now, else seconds until the next probe is allowed."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._probing:
+                return max(remaining, 1.0)
+            self._probing = True   # half-open: this caller is the probe
+            return 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """The probe's outcome says nothing about the domain: let the next caller probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Pacer:
+    """
+    Shared pacing policy for all workers of a run: one token bucket with AIMD
+    rate control, retries with exponential backoff + full jitter, and a circuit
+    breaker per recipient domain.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 5.0,
+        burst: float = 5.0,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_cap: float = 120.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 60.0,
+        max_pause: Optional[float] = None,   # longest total wait on an open circuit
+        **aimd,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.controller = AimdController(self.bucket, **aimd)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_pause = 5 * breaker_cooldown if max_pause is None else max_pause
+
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.stats = {"sent": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    def breaker(self, domain: str) -> CircuitBreaker:
+        with self._lock:
+            b = self._breakers.get(domain)
+            if b is None:
+                b = self._breakers[domain] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return b
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn: Callable[[], T], *, domain: str = "") -> T:
+        breaker = self.breaker(domain.lower())
+        attempt = 0
+        paused = 0.0
+        while True:
+            # Waiting out an open circuit does not use up retry attempts
+            wait = self._circuit_wait(breaker, domain, paused)
+            if wait:
+                time.sleep(wait)
+                paused += wait
+                continue
+
+            self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                attempt += 1
+                time.sleep(self._failed(e, breaker, attempt))
+                continue
+            self._succeeded(breaker, time.monotonic() - started)
+            return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]], *, domain: str = "") -> T:
+        """`call` for a coroutine function: same policy, but waits with asyncio.sleep."""
+        breaker = self.breaker(domain.lower())
+        attempt = 0
+        paused = 0.0
+        while True:
+            wait = self._circuit_wait(breaker, domain, paused)
+            if wait:
+                await asyncio.sleep(wait)
+                paused += wait
+                continue
+
+            while True:
+                delay = self.bucket.take()
+                if not delay:
+                    break
+                await asyncio.sleep(delay)
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                attempt += 1
+                await asyncio.sleep(self._failed(e, breaker, attempt))
+                continue
+            self._succeeded(breaker, time.monotonic() - started)
+            return result
+
+    def _circuit_wait(self, breaker: CircuitBreaker, domain: str, paused: float) -> float:
+        wait = breaker.wait_time()
+        if wait and paused + wait > self.max_pause:
+            self._bump("failed")
+            raise CircuitOpenError(f"Too many failures for '{domain}'; paused sending to it.")
+        return wait
+
+    def _failed(self, exc: Exception, breaker: CircuitBreaker, attempt: int) -> float:
+        """Book a failed attempt; re-raises it if it is final, else returns the backoff delay."""
+        kind = classify_error(exc)
+        if kind == PERMANENT:
+            # The address/content is bad; say nothing about the domain's health
+            # (keep the failure streak and an open breaker, only free a probe slot)
+            breaker.release_probe()
+            self._bump("failed")
+            raise exc
+        breaker.record_failure()
+        if kind == THROTTLED:
+            self._bump("throttled")
+            self.controller.on_throttle()
+        if attempt >= self.max_attempts:
+            self._bump("failed")
+            raise exc
+        self._bump("retries")
+        return self.backoff(attempt - 1)
+
+    def _succeeded(self, breaker: CircuitBreaker, latency: float) -> None:
+        self.controller.on_success(latency)
+        breaker.record_success()
+        self._bump("sent")
+
+    def describe(self) -> str:
+        s = dict(self.stats)
+        return (f"rate {self.bucket.rate:.1f}/s | sent {s['sent']} | retries {s['retries']} "
+                f"| throttled {s['throttled']} | failed {s['failed']}")
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+class PacedSender:
+    """
+    Wraps an OutlookEmailSender so every send_html goes through a shared Pacer.
+    Same context-manager API and send_html signature as the wrapped sender.
+    """
+
+    def __init__(self, sender, pacer: Pacer):
+        self.sender = sender
+        self.pacer = pacer
+
+    def __enter__(self) -> "PacedSender":
+        self.sender.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.sender.__exit__(exc_type, exc, tb)
+
+    def send_html(self, **kwargs):
+        addrs = split_addresses(kwargs.get("to", ""))
+        domain = addrs[0].rpartition("@")[2] if addrs else ""
+        return self.pacer.call(lambda: self.sender.send_html(**kwargs), domain=domain)
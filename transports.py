@@ -0,0 +1,594 @@
+# utils/transports.py
+from __future__ import annotations
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate, getaddresses, make_msgid
+from typing import Iterable, Optional
+from utils.attachment_store import AttachmentStore, shared_store
+from utils.metrics import inc, span
+from utils.recipient_cache import Recipient, RecipientCache, shared_recipients
+
+# Outlook AddressEntryUserType values (OlAddressEntryUserType)
+_EXCHANGE_USERS = (0, 5)            # olExchangeUserAddressEntry, olExchangeRemoteUserAddressEntry
+_EXCHANGE_LIST = 1                  # olExchangeDistributionListAddressEntry
+_OUTLOOK_LIST = 11                  # olOutlookDistributionListAddressEntry
+_ONE_OFF = (30,)                    # olSmtpAddressEntry: typed address, not in any address book
+
+
+class RecipientError(ValueError):
+    """An address Outlook cannot resolve; raised before the message is created (not retried)."""
+
+
+class DeliveryInDoubt(smtplib.SMTPException):
+    """
+    The SMTP connection failed once the message data was on its way, so the
+    server may already have accepted it. Not retried (that could deliver it
+    twice); the send journal keeps it in doubt instead of failed.
+    """
+
+
+class MailTransport:
+    """
+    Backend interface behind OutlookEmailSender.send_html.
+
+    A transport is opened once per sender context (per thread) and closed on exit.
+    `send` receives the already-merged per-message settings and returns whatever
+    object represents the sent message for that backend.
+    """
+
+    name = "custom"  # backend label in metrics
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def send(
+        self,
+        *,
+        html_body: str,
+        to: str,
+        subject: str,
+        cc: str = "",
+        bcc: str = "",
+        attachments: Optional[Iterable[str]] = None,
+        account_smtp: Optional[str] = None,
+        send_on_behalf_of: Optional[str] = None,
+        reply_to: Optional[str] = None,
+        preview: bool = False,
+    ):
+        raise NotImplementedError
+
+
+class OutlookTransport(MailTransport):
+    """
+    Sends through the local Outlook client over COM (win32com).
+
+    pythoncom/win32com are imported on open() so this module stays importable on
+    machines without pywin32 (e.g. when only the SMTP backend is used).
+
+    - Accounts are indexed by SMTP address and display name once, on open().
+    - Recipients go through a RecipientCache shared with the other sessions of
+      the batch: each distinct address is resolved once, the message is
+      addressed with the resolved SMTP address, and an address that does not
+      resolve raises RecipientError before the MailItem is created.
+    """
+
+    name = "outlook"
+
+    def __init__(
+        self,
+        *,
+        attachment_store: Optional[AttachmentStore] = None,
+        recipient_cache: Optional[RecipientCache] = None,
+    ):
+        self.attachment_store = attachment_store or shared_store()
+        self.recipients = recipient_cache or shared_recipients()
+        self._com_inited = False
+        self._outlook = None
+        self._session = None
+        self._account = None
+        self._accounts: dict[str, object] = {}   # lower-cased SMTP / display name -> Account
+
+    def open(self) -> None:
+        import pythoncom  # required if used from background threads
+        import win32com.client as win32
+
+        pythoncom.CoInitialize()
+        self._com_inited = True
+        self._outlook = win32.Dispatch("Outlook.Application")
+        self._session = self._outlook.Session
+        # COM objects belong to this thread's apartment, so each session builds its own index
+        self._accounts = self._index_accounts()
+
+    def close(self) -> None:
+        # Clean up COM
+        try:
+            if self._com_inited:
+                import pythoncom
+                pythoncom.CoUninitialize()
+        finally:
+            self._com_inited = False
+            self._outlook = None
+            self._session = None
+            self._account = None
+            self._accounts = {}
+
+    def send(
+        self,
+        *,
+        html_body: str,
+        to: str,
+        subject: str,
+        cc: str = "",
+        bcc: str = "",
+        attachments: Optional[Iterable[str]] = None,
+        account_smtp: Optional[str] = None,
+        send_on_behalf_of: Optional[str] = None,
+        reply_to: Optional[str] = None,
+        preview: bool = False,
+    ):
+        # Resolve (or fail) before creating anything; cached across the batch
+        to, cc, bcc = self._addressed(to), self._addressed(cc), self._addressed(bcc)
+
+        # Each COM call is an out-of-process round-trip to Outlook; time them separately
+        with span("com_call", op="create"):
+            mail = self._outlook.CreateItem(0)  # 0 = olMailItem
+
+        with span("com_call", op="fill"):
+            # Choose sending account (preferred way); the index is built on open()
+            if account_smtp:
+                acct = self._find_account(account_smtp.lower())
+                if acct is None:
+                    raise RuntimeError(f"Outlook account not found for SMTP: {account_smtp}")
+                mail.SendUsingAccount = acct
+
+            # On-behalf-of (separate from account; requires Exchange permissions)
+            if send_on_behalf_of:
+                mail.SentOnBehalfOfName = send_on_behalf_of
+
+            # Headers & body
+            mail.To = to or ""
+            mail.CC = cc or ""
+            mail.BCC = bcc or ""
+            mail.Subject = subject or ""
+            mail.HTMLBody = html_body or ""
+
+            # Reply-To
+            if reply_to:
+                recips = mail.ReplyRecipients
+                recips.Add(reply_to)
+
+        # Attachments (Outlook reads the file itself; the store only caches the stat)
+        if attachments:
+            with span("com_call", op="attach"):
+                for path in attachments:
+                    if self.attachment_store.exists(path):
+                        mail.Attachments.Add(path)
+
+        if preview:
+            with span("com_call", op="display"):
+                mail.Display(False)   # Show window; user can click Send
+        else:
+            with span("com_call", op="send"):
+                mail.Send()
+
+        return mail  # return the MailItem in case caller wants to inspect it
+
+    def resolve(self, addresses: Iterable[str]) -> dict[str, Recipient]:
+        """
+        Recipient for each distinct address (keyed lower-cased), resolving only
+        the ones not already in the cache.
+        """
+        found, missing = self.recipients.lookup(addresses)
+        if missing:
+            with span("com_call", op="resolve") as fields:
+                fields["addresses"] = len(missing)
+                for query in missing:
+                    recipient = self._resolve_one(query)
+                    self.recipients.put(recipient)
+                    found[query] = recipient
+            inc("recipients_resolved_total", len(missing))
+        return found
+
+    # --- Helpers ---
+    def _index_accounts(self) -> dict[str, object]:
+        """One pass over session.Accounts: SMTP address and display name -> Account."""
+        index: dict[str, object] = {}
+        with span("com_call", op="accounts"):
+            for acct in self._session.Accounts:
+                for attr in ("SmtpAddress", "DisplayName"):
+                    try:
+                        value = str(getattr(acct, attr, "") or "").lower()
+                    except Exception:
+                        value = ""
+                    if value:
+                        index.setdefault(value, acct)
+        return index
+
+    def _find_account(self, query_lower: str):
+        """Match by SMTP or DisplayName (case-insensitive)."""
+        return self._accounts.get(query_lower)
+
+    def _resolve_one(self, query: str) -> Recipient:
+        recip = self._session.CreateRecipient(query)
+        try:
+            if not recip.Resolve():
+                return Recipient(query, False, "", "", False, False)
+            entry = recip.AddressEntry
+            kind = int(entry.AddressEntryUserType)
+            smtp = ""
+            if kind in _EXCHANGE_USERS:
+                user = entry.GetExchangeUser()
+                smtp = user.PrimarySmtpAddress if user is not None else ""
+            elif kind == _EXCHANGE_LIST:
+                dl = entry.GetExchangeDistributionList()
+                smtp = dl.PrimarySmtpAddress if dl is not None else ""
+            if not smtp and kind != _OUTLOOK_LIST:
+                smtp = str(entry.Address or "")
+            return Recipient(
+                query, True, smtp.lower(), str(entry.Name or ""),
+                kind in (_EXCHANGE_LIST, _OUTLOOK_LIST), kind not in _ONE_OFF,
+            )
+        except Exception:
+            # Resolved but the entry could not be inspected: let Outlook address it as typed
+            return Recipient(query, True, "", "", False, False)
+
+    def _addressed(self, value: str) -> str:
+        """`value` with every address replaced by its resolved SMTP address (or as typed)."""
+        addresses = split_addresses(value)
+        if not addresses:
+            return value or ""
+        resolved = self.resolve(addresses)
+        keys = [RecipientCache.key(a) for a in addresses]
+        bad = [a for a, k in zip(addresses, keys) if not resolved[k].resolved]
+        if bad:
+            raise RecipientError("Outlook could not resolve: " + "; ".join(bad))
+        # Outlook distribution lists have no SMTP address and are addressed by name
+        return "; ".join(resolved[k].smtp or a for a, k in zip(addresses, keys))
+
+
+class SmtpTransport(MailTransport):
+    """
+    Sends over SMTP using a small pool of authenticated, kept-alive connections.
+
+    - One transport instance can be shared by several sender contexts/threads;
+      open()/close() are reference counted and the pool is torn down on the last close.
+    - Connections idle for longer than `keepalive` seconds are probed with NOOP
+      before reuse and silently replaced if the server dropped them.
+    - When the server advertises PIPELINING, MAIL FROM and all RCPT TO commands
+      are written in a single round-trip before DATA.
+    - Attachments come from an AttachmentStore, so a file attached to many
+      messages is read and base64-encoded once.
+    - preview=True builds the message but does not send it (there is no Display
+      window over SMTP); the EmailMessage is returned for inspection.
+    """
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        *,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        from_addr: Optional[str] = None,   # envelope/header sender; defaults to username
+        starttls: bool = True,
+        use_ssl: bool = False,             # implicit TLS (port 465)
+        pool_size: int = 2,
+        keepalive: float = 30.0,
+        timeout: float = 30.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        attachment_store: Optional[AttachmentStore] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.from_addr = from_addr or username or ""
+        self.starttls = starttls and not use_ssl
+        self.use_ssl = use_ssl
+        self.pool_size = max(1, int(pool_size))
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.attachment_store = attachment_store or shared_store()
+
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._idle: "queue.LifoQueue[tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.Semaphore(self.pool_size)
+
+    # --- Lifecycle ---
+    def open(self) -> None:
+        with self._lock:
+            self._refs += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._refs = max(0, self._refs - 1)
+            if self._refs:
+                return
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(conn)
+
+    # --- Sending ---
+    def send(
+        self,
+        *,
+        html_body: str,
+        to: str,
+        subject: str,
+        cc: str = "",
+        bcc: str = "",
+        attachments: Optional[Iterable[str]] = None,
+        account_smtp: Optional[str] = None,
+        send_on_behalf_of: Optional[str] = None,
+        reply_to: Optional[str] = None,
+        preview: bool = False,
+    ):
+        msg = self.build_message(
+            html_body=html_body, to=to, subject=subject, cc=cc,
+            attachments=attachments, send_on_behalf_of=send_on_behalf_of, reply_to=reply_to,
+            from_addr=account_smtp,
+        )
+        if preview:
+            return msg
+
+        rcpts = split_addresses(to) + split_addresses(cc) + split_addresses(bcc)
+        if not rcpts:
+            raise ValueError("No recipients given.")
+        self.send_message(msg, rcpts)
+        return msg
+
+    def send_message(self, msg: EmailMessage, rcpts: list[str]) -> dict:
+        """Send a prepared message to the given envelope recipients; returns refused recipients."""
+        payload = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+        envelope_from = self.from_addr or _first_address(msg.get("Sender") or msg.get("From") or "")
+
+        # One retry on a connection the server closed underneath us
+        for attempt in (1, 2):
+            conn = self._acquire()
+            try:
+                with span("smtp_call", op="transact"):
+                    refused = self._transact(conn, envelope_from, rcpts, payload)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # Server answered; the connection itself is still good
+                self._release(conn)
+                raise
+            except DeliveryInDoubt:
+                self._discard(conn)
+                raise
+            except OSError:
+                # Dropped/broken connection (SMTPServerDisconnected, socket errors) before DATA
+                self._discard(conn)
+                if attempt == 2:
+                    raise
+                continue
+            except Exception:
+                self._release(conn)
+                raise
+            self._release(conn)
+            return refused
+        return {}
+
+    def build_message(
+        self,
+        *,
+        html_body: str,
+        to: str,
+        subject: str,
+        cc: str = "",
+        attachments: Optional[Iterable[str]] = None,
+        send_on_behalf_of: Optional[str] = None,
+        reply_to: Optional[str] = None,
+        from_addr: Optional[str] = None,   # send as another mailbox (the login needs Send As)
+    ) -> EmailMessage:
+        return build_message(
+            from_addr=from_addr or self.from_addr, html_body=html_body, to=to, subject=subject, cc=cc,
+            attachments=attachments, send_on_behalf_of=send_on_behalf_of, reply_to=reply_to,
+            attachment_store=self.attachment_store,
+        )
+
+    # --- Protocol ---
+    def _transact(self, conn: smtplib.SMTP, from_addr: str, rcpts: list[str], payload: bytes) -> dict:
+        """MAIL/RCPT/DATA for one message, pipelining the envelope when supported."""
+        conn.ehlo_or_helo_if_needed()
+        opts = ""
+        if conn.has_extn("size"):
+            opts = f" SIZE={len(payload)}"
+
+        refused: dict = {}
+        if conn.has_extn("pipelining"):
+            lines = [f"MAIL FROM:{smtplib.quoteaddr(from_addr)}{opts}"]
+            lines += [f"RCPT TO:{smtplib.quoteaddr(r)}" for r in rcpts]
+            conn.send("\r\n".join(lines) + "\r\n")
+            mail_code, mail_resp = conn.getreply()
+            for r in rcpts:
+                code, resp = conn.getreply()
+                if code not in (250, 251):
+                    refused[r] = (code, resp)
+            if mail_code != 250:
+                self._reset(conn)
+                raise smtplib.SMTPSenderRefused(mail_code, mail_resp, from_addr)
+        else:
+            code, resp = conn.mail(from_addr, [opts.strip()] if opts else [])
+            if code != 250:
+                self._reset(conn)
+                raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+            for r in rcpts:
+                code, resp = conn.rcpt(r)
+                if code not in (250, 251):
+                    refused[r] = (code, resp)
+
+        if len(refused) == len(rcpts):
+            self._reset(conn)
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        try:
+            code, resp = conn.data(payload)
+        except smtplib.SMTPResponseException:
+            raise
+        except OSError as e:
+            raise DeliveryInDoubt(f"Connection lost during DATA; the server may have accepted the message: {e}") from e
+        if code != 250:
+            self._reset(conn)
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    # --- Pool ---
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            conn = smtplib.SMTP_SSL(
+                self.host, self.port, timeout=self.timeout,
+                context=self.ssl_context or ssl.create_default_context(),
+            )
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        conn.ehlo()
+        if self.starttls and conn.has_extn("starttls"):
+            conn.starttls(context=self.ssl_context or ssl.create_default_context())
+            conn.ehlo()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        return conn
+
+    def _acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    with span("smtp_call", op="connect"):
+                        return self._connect()
+                if time.monotonic() - last_used < self.keepalive:
+                    return conn
+                try:
+                    if conn.noop()[0] == 250:
+                        return conn
+                except OSError:
+                    pass
+                self._quit(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: smtplib.SMTP) -> None:
+        self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, conn: smtplib.SMTP) -> None:
+        self._quit(conn)
+        self._slots.release()
+
+    @staticmethod
+    def _reset(conn: smtplib.SMTP) -> None:
+        try:
+            conn.rset()
+        except smtplib.SMTPException:
+            pass
+
+    @staticmethod
+    def _quit(conn: smtplib.SMTP) -> None:
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+# --- Helpers ---
+def build_message(
+    *,
+    from_addr: str,
+    html_body: str,
+    to: str,
+    subject: str,
+    cc: str = "",
+    attachments: Optional[Iterable[str]] = None,
+    send_on_behalf_of: Optional[str] = None,
+    reply_to: Optional[str] = None,
+    attachment_store: Optional[AttachmentStore] = None,
+) -> EmailMessage:
+    """The MIME message for one email (used by SmtpTransport and the outbox spool)."""
+    store = attachment_store or shared_store()
+    msg = EmailMessage()
+    if send_on_behalf_of:
+        # Same semantics as Outlook's SentOnBehalfOfName
+        msg["From"] = send_on_behalf_of
+        if from_addr:
+            msg["Sender"] = from_addr
+    elif from_addr:
+        msg["From"] = from_addr
+    msg["To"] = ", ".join(split_addresses(to))
+    if cc:
+        msg["Cc"] = ", ".join(split_addresses(cc))
+    if reply_to:
+        msg["Reply-To"] = reply_to
+    msg["Subject"] = subject or ""
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid()
+    msg.set_content(html_body or "", subtype="html")
+
+    if attachments:
+        # Files are read and base64-encoded once per run; each message gets
+        # a part that shares the encoded payload
+        parts = [a.mime_part() for a in map(store.get, attachments) if a is not None]
+        if parts:
+            msg.make_mixed()
+            for part in parts:
+                msg.attach(part)
+    return msg
+
+
+def split_addresses(value: Optional[str]) -> list[str]:
+    """Split an Outlook-style ("a@x; b@y") or RFC ("a@x, B <b@y>") recipient string."""
+    if not value:
+        return []
+    parts = getaddresses([str(value).replace(";", ",")])
+    return [addr for _, addr in parts if addr]
+
+
+def unresolved_recipients(addresses: Iterable[str], *, internal_domains: Iterable[str] = ()) -> list[str]:
+    """
+    Pre-flight check against the Outlook address book (opens its own session on
+    the calling thread). Returns the addresses that do not resolve, plus those
+    on an `internal_domains` domain that are not an address book entry (a
+    typo'd colleague would otherwise only bounce after Send). Results land in
+    the shared RecipientCache, so the send that follows does not resolve again.
+    """
+    addresses = [a for a in dict.fromkeys(RecipientCache.key(a) for a in addresses) if a]
+    domains = tuple(d.strip().lower().lstrip("@") for d in internal_domains if d and d.strip())
+    transport = OutlookTransport()
+    transport.open()
+    try:
+        resolved = transport.resolve(addresses)
+    finally:
+        transport.close()
+
+    bad = []
+    for address in addresses:
+        recipient = resolved[address]
+        host = address.rsplit("@", 1)[-1]
+        internal = bool(domains) and any(host == d or host.endswith("." + d) for d in domains)
+        if not recipient.resolved or (internal and not recipient.is_list and not recipient.in_directory):
+            bad.append(address)
+    return bad
+
+
+def _first_address(value: str) -> str:
+    addrs = split_addresses(value)
+    return addrs[0] if addrs else ""
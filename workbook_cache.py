@@ -0,0 +1,224 @@
+# utils/workbook_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+import pandas as pd
+from utils.pathing import app_data_path
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """Content hash of a file, read in 1 MB blocks."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _file_token(namespace: str) -> str:
+    """Filename-safe stand-in for a namespace."""
+    return hashlib.blake2b(namespace.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class WorkbookCache:
+    """
+    On-disk cache of parsed, already-validated workbook frames.
+
+    Lookup is two-level:
+      1. (namespace, resolved path, size, mtime) -> content hash, kept in index.json,
+         so an untouched file is found with a single stat() and no hashing.
+      2. (namespace, content hash) -> frame file, so a copied or re-saved but
+         identical workbook still hits after one hashing pass.
+
+    Frames are stored as Feather (columnar, memory-friendly reads) when pyarrow is
+    available and the frame converts cleanly; otherwise as a pickle. Entries are
+    evicted least-recently-used once the folder exceeds `max_bytes`.
+
+    `namespace` should change whenever the loader's output changes shape
+    (e.g. "disputes-v1"), which invalidates old entries. It is kept readable in
+    the index only; frame file names use a hash of it, since a namespace may
+    carry a sheet name (and ':' opens an NTFS alternate data stream).
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory: Optional[str | Path] = None, *, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory or app_data_path("cache", "workbooks"))
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+    def get(self, path: str | Path, namespace: str) -> Optional[tuple[pd.DataFrame, dict]]:
+        """Return (frame, meta) for an unchanged workbook, or None on a miss."""
+        with self._lock:
+            index = self._read_index()
+            rec = self._resolve(index, path, namespace)
+            if rec is None:
+                return None
+            entry = self.directory / rec["file"]
+            try:
+                df = self._read_frame(entry)
+            except Exception:
+                # Corrupt/partial entry: drop it and treat as a miss
+                self._remove(index, rec["file"])
+                self._write_index(index)
+                return None
+            os.utime(entry)  # LRU bookkeeping
+            return df, dict(rec.get("meta", {}))
+
+    def lookup(self, path: str | Path, namespace: str) -> Optional[dict]:
+        """Return the stored meta for an unchanged workbook without reading its frame."""
+        with self._lock:
+            rec = self._resolve(self._read_index(), path, namespace)
+            return None if rec is None else dict(rec.get("meta", {}))
+
+    def put(self, path: str | Path, namespace: str, df: pd.DataFrame, meta: Optional[dict] = None) -> None:
+        """Store the frame for `path`. Failures are swallowed: the cache is best-effort."""
+        try:
+            stat_key = self._stat_key(path, namespace)
+            digest = file_digest(path)
+        except OSError:
+            return
+
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                name = self._write_frame(self.directory / f"{_file_token(namespace)}-{digest}", df)
+            except Exception:
+                return
+            index = self._read_index()
+            # Older versions of the same file are superseded by this one
+            prefix = stat_key.rsplit("|", 2)[0] + "|"
+            superseded = {index.pop(k)["file"] for k in [k for k in index if k.startswith(prefix)]}
+            index[stat_key] = {
+                "namespace": namespace,
+                "digest": digest,
+                "file": name,
+                "meta": meta or {},
+            }
+            # Their frame files go too, unless another path (e.g. a copy) still uses them;
+            # _evict only sees files the index references
+            in_use = {rec["file"] for rec in index.values()}
+            for old in superseded - in_use:
+                self._remove(index, old)
+            self._evict(index, keep=name)
+            self._write_index(index)
+
+    def clear(self) -> None:
+        with self._lock:
+            index = self._read_index()
+            for rec in list(index.values()):
+                self._remove(index, rec["file"])
+            self._write_index({})
+
+    # --- Storage ---
+    @staticmethod
+    def _write_frame(stem: Path, df: pd.DataFrame) -> str:
+        frame = df.reset_index(drop=True)
+        try:
+            import pyarrow  # noqa: F401  (optional dependency)
+            target = stem.with_suffix(".feather")
+            tmp = target.with_suffix(".feather.tmp")
+            frame.to_feather(tmp)
+        except Exception:
+            # No pyarrow, or mixed-type object columns Arrow can't represent
+            target = stem.with_suffix(".pkl")
+            tmp = target.with_suffix(".pkl.tmp")
+            frame.to_pickle(tmp)
+        os.replace(tmp, target)
+        return target.name
+
+    @staticmethod
+    def _read_frame(entry: Path) -> pd.DataFrame:
+        if entry.suffix == ".feather":
+            return pd.read_feather(entry)
+        return pd.read_pickle(entry)
+
+    # --- Index ---
+    def _resolve(self, index: dict, path: str | Path, namespace: str) -> Optional[dict]:
+        try:
+            stat_key = self._stat_key(path, namespace)
+        except OSError:
+            return None
+
+        rec = index.get(stat_key)
+        if rec is None:
+            # Stat changed (or first sight): fall back to the content hash
+            try:
+                digest = file_digest(path)
+            except OSError:
+                return None
+            rec = self._find_by_digest(index, namespace, digest)
+            if rec is None:
+                return None
+            index[stat_key] = rec
+            self._write_index(index)
+
+        if not (self.directory / rec["file"]).exists():
+            self._remove(index, rec["file"])
+            self._write_index(index)
+            return None
+        return rec
+
+    @staticmethod
+    def _stat_key(path: str | Path, namespace: str) -> str:
+        p = Path(path).resolve()
+        st = p.stat()
+        return f"{namespace}|{p}|{st.st_size}|{st.st_mtime_ns}"
+
+    @staticmethod
+    def _find_by_digest(index: dict, namespace: str, digest: str) -> Optional[dict]:
+        for rec in index.values():
+            if rec.get("namespace") == namespace and rec.get("digest") == digest:
+                return rec
+        return None
+
+    def _read_index(self) -> dict[str, Any]:
+        try:
+            with open(self.directory / self.INDEX_NAME, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: dict) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self.directory / (self.INDEX_NAME + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, self.directory / self.INDEX_NAME)
+        except OSError:
+            pass
+
+    def _evict(self, index: dict, keep: str) -> None:
+        """Delete least-recently-used frame files until the folder fits in max_bytes."""
+        files = []
+        for rec in index.values():
+            entry = self.directory / rec["file"]
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, rec["file"]))
+        # Several stat keys can share one frame file
+        files = sorted(set(files))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in files:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            self._remove(index, name)
+            total -= size
+
+    def _remove(self, index: dict, name: str) -> None:
+        try:
+            (self.directory / name).unlink()
+        except OSError:
+            pass
+        for key in [k for k, rec in index.items() if rec.get("file") == name]:
+            del index[key]
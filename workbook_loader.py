@@ -0,0 +1,670 @@
+# utils/workbook_loader.py
+from __future__ import annotations
+import html
+import io
+import itertools
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Mapping, NamedTuple, Optional, Sequence
+from xml.etree import ElementTree
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from utils.workbook_cache import WorkbookCache
+
+# Column kinds for apply_schema
+CATEGORY = "category"   # few distinct values repeated down the sheet (names, outcomes, addresses)
+DATETIME = "datetime"   # Excel date cells
+TEXT = "text"           # free text / identifiers: left as read
+
+# Provenance columns added by load_parts
+SOURCE_FILE = "Source File"
+SOURCE_SHEET = "Source Sheet"
+SOURCE_ROW = "Source Row"      # Excel row in its own sheet
+SOURCE_COLUMNS = [SOURCE_FILE, SOURCE_SHEET, SOURCE_ROW]
+
+
+class WorkbookError(Exception):
+    """Base class for problems with the layout of a source workbook."""
+
+
+class MissingSheetError(WorkbookError):
+    def __init__(self, sheet: str, available: Sequence[str]):
+        self.sheet = sheet
+        self.available = list(available)
+        super().__init__(
+            f"Sheet '{sheet}' was not found.\nSheets available: {', '.join(self.available)}"
+        )
+
+
+class HeaderMismatchError(WorkbookError):
+    def __init__(self, problems: Sequence[str]):
+        self.problems = list(problems)
+        super().__init__("Header mismatch:\n" + "\n".join(self.problems))
+
+
+class PartsError(WorkbookError):
+    """Parts of a multi-workbook load that failed, each with its own problem."""
+
+    def __init__(self, failures: Mapping["SheetPart", Exception]):
+        self.failures = dict(failures)
+        super().__init__(
+            f"{len(self.failures)} of the selected sheets could not be loaded:\n"
+            + "\n".join(f"{part.label}: {e}" for part, e in self.failures.items())
+        )
+
+
+def apply_schema(df: pd.DataFrame, schema: Mapping[str, str]) -> pd.DataFrame:
+    """
+    Give loaded columns compact dtypes: CATEGORY columns store each distinct
+    value once plus small integer codes; DATETIME columns become datetime64
+    when every non-blank cell is an Excel date (a column with typed-in text
+    dates is left alone, so pre-flight can report them and they render as typed).
+    """
+    converted = {}
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if kind == CATEGORY and not isinstance(values.dtype, pd.CategoricalDtype):
+            converted[col] = values.astype("category")
+        elif kind == DATETIME and not pd.api.types.is_datetime64_any_dtype(values):
+            if pd.api.types.infer_dtype(values, skipna=True) in ("datetime", "datetime64", "date", "empty"):
+                converted[col] = pd.to_datetime(values)
+    return df.assign(**converted) if converted else df
+
+
+def header_problems(got: Sequence[str], exp: Sequence[str]) -> list[str]:
+    """Describe differences between two header rows, column by column."""
+    problems = []
+    for i, (g, e) in enumerate(zip(got, exp), start=1):
+        if g != e:
+            problems.append(f"  Col {i}: expected '{e}', got '{g}'")
+    # Handle length mismatch
+    if len(got) != len(exp):
+        problems.append(f"  Column count mismatch: expected {len(exp)}, got {len(got)}")
+    return problems
+
+
+class StreamingWorkbook:
+    """
+    Opens an .xlsx once in openpyxl read-only mode and streams one sheet.
+
+    The header row is checked against `columns` before any data row is parsed,
+    so a wrong file fails fast without materialising the sheet. Data rows are
+    then yielded in chunks of plain tuples.
+
+        with StreamingWorkbook(path, "Emails", EXPECTED_COLUMNS, first_col=3) as wb:
+            df = wb.read_frame()
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        sheet: str,
+        columns: Sequence[str],
+        *,
+        first_col: int = 1,   # 1-based; 3 == column C
+        schema: Optional[Mapping[str, str]] = None,   # see apply_schema
+    ):
+        self.path = Path(path)
+        self.sheet = sheet
+        self.columns = list(columns)
+        self.schema = schema
+        self.first_col = first_col
+        self.last_col = first_col + len(self.columns) - 1
+
+        self._wb = None
+        self._ws = None
+        self._header_ok = False
+
+    # --- Context manager API ---
+    def __enter__(self) -> "StreamingWorkbook":
+        import openpyxl
+
+        self._wb = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._wb is not None:
+                self._wb.close()  # read-only workbooks keep the zip handle open
+        finally:
+            self._wb = None
+            self._ws = None
+
+    # --- Public API ---
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self._wb.sheetnames)
+
+    def check_header(self) -> list[str]:
+        """Validate the header row; raises MissingSheetError/HeaderMismatchError."""
+        if self.sheet not in self._wb.sheetnames:
+            raise MissingSheetError(self.sheet, self._wb.sheetnames)
+        self._ws = self._wb[self.sheet]
+
+        first = next(
+            self._ws.iter_rows(
+                min_row=1, max_row=1, min_col=self.first_col, max_col=self.last_col, values_only=True
+            ),
+            (),
+        )
+        # Normalize header whitespace
+        got = [("" if v is None else str(v).strip()) for v in first]
+        problems = header_problems(got, self.columns)
+        if problems:
+            raise HeaderMismatchError(problems)
+        self._header_ok = True
+        return got
+
+    def iter_chunks(self, chunk_size: int = 5000, *, start_row: int = 2) -> Iterator[list[tuple]]:
+        """Yield data rows from Excel row `start_row` on, in lists of at most `chunk_size` tuples.
+
+        Fully empty rows are kept only when a non-empty row follows them, so the
+        trailing blank rows Excel often leaves in the sheet dimension are dropped.
+
+        With start_row > 2 the rows above it are cut out of the sheet XML (see
+        _RowsFrom) and the rest is parsed by _TailRows, so reading the tail of a
+        long sheet costs a byte scan of the head instead of parsing it.
+        """
+        if not self._header_ok:
+            self.check_header()
+        if start_row > 2:
+            yield from self._iter_tail(chunk_size, start_row)
+        else:
+            yield from self._iter_from(chunk_size, start_row)
+
+    def _iter_tail(self, chunk_size: int, start_row: int) -> Iterator[list[tuple]]:
+        rows = _TailRows(self.path, self.sheet, self._wb).rows(start_row, self.first_col, self.last_col)
+        try:
+            # _RowsFrom raises while skipping the head, i.e. before the first row
+            first = next(rows, None)
+        except _NoRowNumbers:
+            yield from self._iter_from(chunk_size, start_row)
+            return
+        if first is not None:
+            yield from self._chunked(itertools.chain((first,), rows), chunk_size)
+
+    def _iter_from(self, chunk_size: int, start_row: int) -> Iterator[list[tuple]]:
+        rows = self._ws.iter_rows(
+            min_row=start_row, min_col=self.first_col, max_col=self.last_col, values_only=True
+        )
+        yield from self._chunked(rows, chunk_size)
+
+    def _chunked(self, rows: Iterable[tuple], chunk_size: int) -> Iterator[list[tuple]]:
+        width = len(self.columns)
+        chunk: list[tuple] = []
+        blanks: list[tuple] = []
+        for values in rows:
+            if len(values) < width:
+                values = tuple(values) + (None,) * (width - len(values))
+            if all(v is None for v in values):
+                blanks.append(values)
+                continue
+            if blanks:
+                chunk.extend(blanks)
+                blanks.clear()
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_frames(self, chunk_size: int = 5000, *, start_row: int = 2) -> Iterator[pd.DataFrame]:
+        for rows in self.iter_chunks(chunk_size, start_row=start_row):
+            yield pd.DataFrame.from_records(rows, columns=self.columns)
+
+    def read_frame(self, chunk_size: int = 5000, *, start_row: int = 2) -> pd.DataFrame:
+        """The sheet from Excel row `start_row` down; the index is the data-row position (row 2 -> 0)."""
+        frames = list(self.iter_frames(chunk_size, start_row=start_row))
+        if not frames:
+            df = pd.DataFrame(columns=self.columns)
+        else:
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if start_row > 2:
+            df.index = pd.RangeIndex(start_row - 2, start_row - 2 + len(df))
+        if self.schema:
+            df = apply_schema(df, self.schema)
+        return df
+
+
+class _NoRowNumbers(Exception):
+    """The sheet XML has <row> elements without an r attribute; rows cannot be skipped by number."""
+
+
+class _RowsFrom(io.RawIOBase):
+    """
+    Worksheet XML with every <row> numbered below `start_row` removed.
+
+    The part before <sheetData> (and after the skipped rows) is passed through
+    unchanged, so openpyxl parses a well-formed sheet that simply starts at
+    `start_row`. Only tag starts are searched for while skipping; cell contents
+    of skipped rows are never parsed.
+    """
+
+    _ROW = re.compile(rb"<row\b([^>]*)>")
+    _NUMBER = re.compile(rb"\br=\"(\d+)\"")
+    _READ = 1 << 20
+
+    def __init__(self, raw, start_row: int):
+        self._raw = raw
+        self._start = start_row
+        self._out = self._filter()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._out)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        try:
+            self._raw.close()
+        finally:
+            super().close()
+
+    def _filter(self) -> Iterator[bytes]:
+        data = b""
+
+        def more() -> bool:
+            nonlocal data
+            block = self._raw.read(self._READ)
+            data += block
+            return bool(block)
+
+        def rest() -> Iterator[bytes]:
+            while True:
+                block = self._raw.read(self._READ)
+                if not block:
+                    return
+                yield block
+
+        # Head: everything up to and including <sheetData ...>
+        while True:
+            i = data.find(b"<sheetData")
+            j = data.find(b">", i) if i >= 0 else -1
+            if j >= 0:
+                yield data[:j + 1]
+                if data[j - 1:j] == b"/":   # <sheetData/>: no rows at all
+                    yield data[j + 1:]
+                    yield from rest()
+                    return
+                data = data[j + 1:]
+                break
+            if not more():
+                yield data
+                return
+
+        # Skip rows below start_row; pass everything from the first row at or past it
+        while True:
+            pos = 0
+            for m in self._ROW.finditer(data):
+                number = self._NUMBER.search(m.group(1))
+                if number is None:
+                    raise _NoRowNumbers()
+                if int(number.group(1)) >= self._start:
+                    yield data[m.start():]
+                    yield from rest()
+                    return
+                pos = m.end()
+            end = data.find(b"</sheetData>", pos)
+            if end >= 0:
+                yield data[end:]
+                yield from rest()
+                return
+            # Keep a partial tag that may straddle the read boundary
+            cut = data.rfind(b"<", pos)
+            data = data[cut:] if cut >= 0 else b""
+            if not more():
+                return
+
+
+class _TailRows:
+    """
+    Rows of one sheet from `start_row` down, parsed straight from the sheet XML.
+
+    Used for incremental tails instead of openpyxl's reader so that _RowsFrom
+    can sit between the zip member and the parser without touching openpyxl
+    objects. Values match openpyxl's data_only read:
+    - shared, inline and formula strings as str, errors as their code ("#N/A")
+    - numbers as int or float; date-formatted numbers via from_excel
+    - booleans as bool; ISO "d" cells as datetime
+    Missing rows inside the range come back as all-None rows.
+    """
+
+    def __init__(self, path: Path, sheet: str, wb):
+        self.path = path
+        self.sheet = sheet
+        self._shared = wb.shared_strings
+        self._epoch = wb.epoch
+
+    def rows(self, start_row: int, first_col: int, last_col: int) -> Iterator[tuple]:
+        from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+
+        width = last_col - first_col + 1
+        empty = (None,) * width
+        with zipfile.ZipFile(self.path) as z:
+            part, styles = _sheet_part(z, self.sheet)
+            dates = _date_styles(z, styles)
+            src = io.BufferedReader(_RowsFrom(z.open(part), start_row), 1 << 16)
+            with src:
+                expected = start_row
+                number = start_row - 1
+                for _, el in ElementTree.iterparse(src):
+                    if _local(el.tag) != "row":
+                        continue
+                    r = el.get("r")
+                    number = int(r) if r else number + 1
+                    if number < start_row:
+                        el.clear()
+                        continue
+                    for _ in range(expected, number):
+                        yield empty
+                    values = [None] * width
+                    col = 0
+                    for c in el:
+                        if _local(c.tag) != "c":
+                            continue
+                        ref = c.get("r")
+                        col = column_index_from_string(coordinate_from_string(ref)[0]) if ref else col + 1
+                        if first_col <= col <= last_col:
+                            values[col - first_col] = self._value(c, dates)
+                    el.clear()
+                    expected = number + 1
+                    yield tuple(values)
+
+    def _value(self, c, dates: Mapping[int, bool]):
+        kind = c.get("t", "n")
+        if kind == "inlineStr":
+            return _inline_text(c)
+        text = next((v.text for v in c if _local(v.tag) == "v"), None)
+        if not text:
+            return None
+        if kind == "s":
+            return self._shared[int(text)]
+        if kind in ("str", "e"):
+            return text
+        if kind == "b":
+            return bool(int(text))
+        if kind == "d":
+            from openpyxl.utils.datetime import from_ISO8601
+            return from_ISO8601(text)
+        value = float(text) if ("." in text or "E" in text or "e" in text) else int(text)
+        style = int(c.get("s", 0))
+        if style in dates:
+            from openpyxl.utils.datetime import from_excel
+            try:
+                return from_excel(value, self._epoch, timedelta=dates[style])
+            except (OverflowError, ValueError):
+                return "#VALUE!"
+        return value
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _inline_text(c) -> Optional[str]:
+    for child in c:
+        if _local(child.tag) == "is":
+            # <t> directly, or one <t> per rich-text run; phonetic <rPh> runs are skipped
+            parts = [t.text or "" for t in child if _local(t.tag) == "t"]
+            for run in child:
+                if _local(run.tag) == "r":
+                    parts.extend(t.text or "" for t in run if _local(t.tag) == "t")
+            return "".join(parts)
+    return None
+
+
+def _book_part(z: zipfile.ZipFile) -> str:
+    rels = z.read("_rels/.rels").decode("utf-8")
+    m = re.search(r'<Relationship\b[^>]*Type="[^"]*/officeDocument"[^>]*>', rels)
+    return re.search(r'Target="([^"]+)"', m.group(0)).group(1).lstrip("/") if m else "xl/workbook.xml"
+
+
+def _sheet_part(z: zipfile.ZipFile, sheet: str) -> tuple[str, Optional[str]]:
+    """Zip member names of `sheet`'s XML and of the workbook's styles part (None if absent)."""
+    book = _book_part(z)
+    base = posixpath.dirname(book)
+    rid = None
+    for el in ElementTree.fromstring(z.read(book)).iter():
+        if _local(el.tag) == "sheet" and el.get("name") == sheet:
+            rid = next((v for k, v in el.attrib.items() if _local(k) == "id"), None)
+            break
+    targets = {}
+    styles = None
+    rels = posixpath.join(base, "_rels", posixpath.basename(book) + ".rels")
+    for el in ElementTree.fromstring(z.read(rels)):
+        target = el.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        targets[el.get("Id")] = target
+        if el.get("Type", "").endswith("/styles"):
+            styles = target
+    if rid not in targets:
+        raise MissingSheetError(sheet, _sheet_names_in(z))
+    return targets[rid], styles
+
+
+def _date_styles(z: zipfile.ZipFile, styles: Optional[str]) -> dict[int, bool]:
+    """Cell style index -> True for duration formats, False for date formats."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    if styles is None or styles not in z.namelist():
+        return {}
+    root = ElementTree.fromstring(z.read(styles))
+    custom = {}
+    dates = {}
+    for section in root:
+        name = _local(section.tag)
+        if name == "numFmts":
+            custom = {int(f.get("numFmtId")): f.get("formatCode", "") for f in section}
+        elif name == "cellXfs":
+            for index, xf in enumerate(section):
+                fmt_id = int(xf.get("numFmtId", 0))
+                fmt = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id, "General")
+                if is_date_format(fmt):
+                    dates[index] = is_timedelta_format(fmt)
+    return dates
+
+
+def load_sheet(
+    path: str | Path,
+    sheet: str,
+    columns: Sequence[str],
+    *,
+    first_col: int = 1,
+    chunk_size: int = 5000,
+    schema: Optional[Mapping[str, str]] = None,
+) -> pd.DataFrame:
+    """Open `path` once, validate the header, and return the sheet as a DataFrame."""
+    with StreamingWorkbook(path, sheet, columns, first_col=first_col, schema=schema) as wb:
+        wb.check_header()
+        return wb.read_frame(chunk_size)
+
+
+def validate_workbook(
+    path: str | Path,
+    sheet: str,
+    columns: Sequence[str],
+    *,
+    first_col: int = 1,
+) -> tuple[list[str], Optional[WorkbookError]]:
+    """Return (sheet names, problem or None) after reading only the header row."""
+    with StreamingWorkbook(path, sheet, columns, first_col=first_col) as wb:
+        try:
+            wb.check_header()
+            return wb.sheet_names, None
+        except WorkbookError as e:
+            return wb.sheet_names, e
+
+
+# --- Multi-workbook loads ---
+class SheetPart(NamedTuple):
+    """One sheet of one workbook in a multi-part load."""
+    path: str
+    sheet: str
+    optional: bool = False   # a sheet with another header is skipped instead of failing the load
+
+    @property
+    def label(self) -> str:
+        return f"{Path(self.path).name} [{self.sheet}]"
+
+
+class _PartTask(NamedTuple):
+    part: SheetPart
+    columns: list[str]
+    first_col: int
+    schema: Optional[Mapping[str, str]]
+
+
+def sheet_names(path: str | Path) -> list[str]:
+    """Sheet names in workbook order, read from workbook.xml without loading the workbook."""
+    try:
+        with zipfile.ZipFile(path) as z:
+            return _sheet_names_in(z)
+    except (KeyError, zipfile.BadZipFile):
+        raise WorkbookError(f"Not an Excel workbook: {path}") from None
+
+
+def _sheet_names_in(z: zipfile.ZipFile) -> list[str]:
+    xml = z.read(_book_part(z)).decode("utf-8")
+    return [html.unescape(n) for n in re.findall(r'<(?:\w+:)?sheet\b[^>]*\bname="([^"]*)"', xml)]
+
+def workbook_parts(paths: Iterable[str | Path], sheet: Optional[str] = None) -> list[SheetPart]:
+    """
+    The parts to load from `paths`: each file's `sheet`, or with sheet=None
+    every sheet of every file (those with another header are skipped).
+    """
+    parts = []
+    for path in paths:
+        if sheet is not None:
+            parts.append(SheetPart(str(path), sheet))
+        else:
+            parts.extend(SheetPart(str(path), name, optional=True) for name in sheet_names(path))
+    return parts
+
+
+def load_parts(
+    parts: Sequence[SheetPart],
+    columns: Sequence[str],
+    *,
+    first_col: int = 1,
+    schema: Optional[Mapping[str, str]] = None,
+    processes: Optional[int] = None,
+    cache: Optional["WorkbookCache"] = None,
+    namespace: Optional[str] = None,
+) -> tuple[pd.DataFrame, list[SheetPart]]:
+    """
+    Load several sheets/workbooks in a process pool into one typed frame.
+
+    - Each part is opened, header-checked against `columns` and given the
+      `schema` in its own process, so the load scales with cores, not files.
+    - Parts are stacked in the order given, with SOURCE_FILE, SOURCE_SHEET
+      (categoricals) and SOURCE_ROW columns; the index is the position in the
+      combined frame. CATEGORY columns stay categorical across parts.
+    - With a cache, every part is stored and looked up on its own (keyed by
+      `namespace` and sheet), so an unchanged workbook is never re-parsed.
+
+    Returns (frame, skipped optional parts). A missing sheet or header
+    mismatch in a required part, or no matching part at all, raises PartsError
+    (listing every failed part) or WorkbookError.
+    """
+    frames: dict[SheetPart, pd.DataFrame] = {}
+    todo = []
+    for part in parts:
+        hit = cache.get(part.path, f"{namespace}:{part.sheet}") if cache is not None else None
+        if hit is not None:
+            frames[part] = hit[0]
+        else:
+            todo.append(_PartTask(part, list(columns), first_col, schema))
+
+    processes = min(max(1, processes or os.cpu_count() or 1), len(todo))
+    if processes <= 1:
+        results = list(map(_load_part, todo))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_load_part, todo))
+
+    failures: dict[SheetPart, Exception] = {}
+    skipped = []
+    for task, (df, error) in zip(todo, results):
+        part = task.part
+        if error is None:
+            frames[part] = df
+            if cache is not None:
+                cache.put(part.path, f"{namespace}:{part.sheet}", df, {"sheet": part.sheet})
+        elif part.optional and isinstance(error, (MissingSheetError, HeaderMismatchError)):
+            skipped.append(part)
+        else:
+            failures[part] = error
+    if failures:
+        raise PartsError(failures)
+    ordered = [(part, frames[part]) for part in parts if part in frames]
+    if not ordered:
+        raise WorkbookError("None of the selected sheets has the expected header:\n  " + ", ".join(columns))
+    return _stack(ordered, list(columns), schema or {}), skipped
+
+
+def _load_part(task: _PartTask) -> tuple[Optional[pd.DataFrame], Optional[Exception]]:
+    """Process-pool task: one sheet as a typed frame, or the problem that stopped it."""
+    part = task.part
+    try:
+        with StreamingWorkbook(part.path, part.sheet, task.columns, first_col=task.first_col, schema=task.schema) as wb:
+            wb.check_header()
+            return wb.read_frame(), None
+    except (WorkbookError, OSError, ValueError, KeyError) as e:
+        return None, e
+
+
+def _stack(parts: list[tuple[SheetPart, pd.DataFrame]], columns: list[str], schema: Mapping[str, str]) -> pd.DataFrame:
+    from pandas.api.types import union_categoricals
+
+    frames = [df for _, df in parts]
+    # Same categories everywhere, so concat keeps the columns categorical
+    shared = {}
+    for col, kind in schema.items():
+        if kind != CATEGORY or not all(isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames):
+            continue
+        values = [df[col] for df in frames]
+        if len({c.cat.categories.dtype for c in values}) > 1:
+            # e.g. numeric IDs in one part and text in another, or an empty part:
+            # union_categoricals needs one category dtype, so compare them as text
+            try:
+                values = [c.cat.rename_categories(c.cat.categories.astype(str)) for c in values]
+            except ValueError:
+                continue   # 1 and "1" in one part: concat falls back to object
+            frames = [df.assign(**{col: c}) for df, c in zip(frames, values)]
+        try:
+            shared[col] = union_categoricals(values, ignore_order=True).categories
+        except TypeError:
+            continue
+    frames = [
+        df.assign(**{col: df[col].cat.set_categories(cats) for col, cats in shared.items()})
+        for df in frames
+    ]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+    # Provenance, built from each part's length rather than row by row
+    lengths = [len(f) for f in frames]
+    owner = np.repeat(np.arange(len(parts)), lengths)
+    for col, values in ((SOURCE_FILE, [p.path for p, _ in parts]), (SOURCE_SHEET, [p.sheet for p, _ in parts])):
+        codes, categories = pd.factorize(pd.Index(values))
+        df[col] = pd.Categorical.from_codes(codes[owner], categories=categories)
+    df[SOURCE_ROW] = np.concatenate([np.arange(2, n + 2) for n in lengths]) if lengths else []
+    return df
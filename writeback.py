@@ -0,0 +1,356 @@
+# utils/writeback.py
+from __future__ import annotations
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+from utils.email_templates import text_column
+from utils.metrics import span
+
+# Row statuses
+SENT = "sent"
+SKIPPED = "skipped"          # the journal says it went out in an earlier run (or is in doubt)
+FAILED = "failed"
+CANCELLED = "cancelled"
+INVALID = "invalid"          # held back by pre-flight errors
+NO_RECIPIENT = "no recipient"
+PENDING = "pending"          # not reached (yet)
+
+RESULTS_SHEET = "Send Results"
+RESULT_COLUMNS = ["Excel Row", "Status", "Sent At", "To", "Message ID", "Error"]
+
+_WORKSHEET_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+_WORKSHEET_CONTENT = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+_ILLEGAL_XML = r"[\x00-\x08\x0b\x0c\x0e-\x1f]"
+
+
+class OutcomeLog:
+    """
+    Per-row outcome of a run, collected in memory and written out in one go:
+
+        log = OutcomeLog(keys, labels=df["Project ID"], sidecar=sidecar_path(path))
+        engine = SendEngine(make_sender, outcomes=log)   # records every SendResult
+        ...
+        log.write(workbook=path)                         # results sheet (+ sidecar)
+
+    `row_keys` maps each sheet row (index = position, Excel row - 2) to the key
+    of the job that covers it: the row label for per-row sends, the group value
+    for digests, the employee for pay reports. One outcome can therefore
+    annotate many rows. With a `sidecar`, a checkpoint of the current state is
+    written every `checkpoint_seconds` while results come in.
+    """
+
+    def __init__(
+        self,
+        row_keys: pd.Series,
+        *,
+        labels: Optional[pd.Series] = None,      # identifying column shown next to each row
+        first_data_row: int = 2,
+        sidecar: Optional[str | Path] = None,
+        checkpoint_seconds: float = 60.0,
+    ):
+        self.row_keys = text_column(row_keys)
+        self.labels = labels
+        self.first_data_row = first_data_row
+        self.sidecar = Path(sidecar) if sidecar else None
+        self.checkpoint_seconds = checkpoint_seconds
+
+        self._lock = threading.Lock()
+        self._outcomes: dict[str, tuple[str, str, str, str, str]] = {}   # key -> status, at, to, id, error
+        self._row_notes: dict = {}                                       # row label -> status, error
+        self._checkpointed = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._outcomes) + len(self._row_notes)
+
+    # --- Collecting ---
+    def record(self, result) -> None:
+        """Take one SendResult (called by SendEngine as results come in)."""
+        if result.skipped:
+            status, error = SKIPPED, result.skipped
+        elif result.ok:
+            status, error = SENT, ""
+        elif result.error == "Cancelled":
+            status, error = CANCELLED, ""
+        else:
+            status, error = FAILED, result.error or ""
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._outcomes[str(result.key)] = (status, stamp, result.to or "", result.message_id or "", error)
+            due = self.sidecar is not None and time.monotonic() - self._checkpointed >= self.checkpoint_seconds
+        if due:
+            self.checkpoint()
+
+    def note_keys(self, keys: Iterable, status: str, error: str = "") -> None:
+        """Outcome for jobs that never reached the engine (e.g. no recipient)."""
+        with self._lock:
+            for key in keys:
+                self._outcomes[str(key)] = (status, "", "", "", error)
+
+    def note_rows(self, errors: pd.Series, status: str = INVALID) -> None:
+        """Outcome for individual rows (row label -> reason), e.g. pre-flight errors."""
+        with self._lock:
+            for label, error in errors.items():
+                self._row_notes[label] = (status, str(error))
+
+    def note_preflight(self, report) -> None:
+        """Rows held back by a PreflightReport's errors, with their problems."""
+        issues = report.issues[report.issues["Severity"] == "error"]
+        if issues.empty:
+            return
+        reasons = (issues["Column"].astype(str) + ": " + issues["Problem"].astype(str))
+        self.note_rows(reasons.groupby(level=0, sort=False).agg("; ".join))
+
+    # --- Output ---
+    def frame(self) -> pd.DataFrame:
+        """One row per sheet row: RESULT_COLUMNS (plus the label column), pending where nothing is known."""
+        with self._lock:
+            outcomes = dict(self._outcomes)
+            notes = dict(self._row_notes)
+        index = self.row_keys.index
+        table = pd.DataFrame.from_dict(
+            outcomes, orient="index", columns=["Status", "Sent At", "To", "Message ID", "Error"]
+        )
+        # Vectorized join of the (few) job outcomes onto the (many) rows
+        pos = table.index.get_indexer(self.row_keys.to_numpy()) if len(table) else np.full(len(index), -1)
+        known = pos >= 0
+        out = pd.DataFrame({"Excel Row": np.asarray(index) + self.first_data_row}, index=index)
+        for col in ("Status", "Sent At", "To", "Message ID", "Error"):
+            values = np.full(len(index), PENDING if col == "Status" else "", dtype=object)
+            if known.any():
+                values[known] = table[col].to_numpy(dtype=object)[pos[known]]
+            out[col] = values
+        if notes:
+            labels = [label for label in notes if label in index]
+            out.loc[labels, "Status"] = [notes[label][0] for label in labels]
+            out.loc[labels, "Error"] = [notes[label][1] for label in labels]
+        if self.labels is not None:
+            out.insert(1, self.labels.name or "Key", text_column(self.labels.reindex(index)).to_numpy())
+        return out
+
+    def counts(self) -> dict[str, int]:
+        return self.frame()["Status"].value_counts().to_dict()
+
+    def checkpoint(self) -> Optional[Path]:
+        """Write the current state to the sidecar file (if one is configured)."""
+        if self.sidecar is None:
+            return None
+        with self._lock:
+            self._checkpointed = time.monotonic()
+        write_csv(self.frame(), self.sidecar)
+        return self.sidecar
+
+    def write(self, *, workbook: Optional[str | Path] = None, sheet: str = RESULTS_SHEET) -> list[str]:
+        """
+        Final write-back: the sidecar (if configured) first, then with
+        `workbook` the results sheet inside it. Returns what was written. A
+        workbook that is open in Excel raises PermissionError and is left
+        unchanged; the sidecar still has the results.
+        """
+        written = []
+        frame = self.frame()
+        if self.sidecar is not None:
+            write_csv(frame, self.sidecar)
+            written.append(str(self.sidecar))
+        if workbook is not None:
+            write_results_sheet(workbook, frame, sheet=sheet)
+            written.append(f"{workbook} [{sheet}]")
+        return written
+
+
+def sidecar_path(workbook: str | Path) -> Path:
+    """<workbook name>.results.csv next to the workbook."""
+    p = Path(workbook)
+    return p.with_name(p.stem + ".results.csv")
+
+
+def write_csv(frame: pd.DataFrame, path: str | Path) -> None:
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    # utf-8-sig so Excel detects the encoding
+    frame.to_csv(tmp, index=False, encoding="utf-8-sig")
+    os.replace(tmp, path)
+
+
+# --- Results sheet ---
+def write_results_sheet(path: str | Path, frame: pd.DataFrame, *, sheet: str = RESULTS_SHEET) -> None:
+    """
+    Put `frame` into `sheet` of the workbook at `path` (replacing a previous
+    copy of that sheet), as one bulk write.
+
+    The workbook is not loaded: every existing part is copied across as-is,
+    only the three small index parts (workbook, its relationships, content
+    types) are edited, and the sheet XML is generated column-wise. The data
+    sheets are therefore untouched, and annotating a large sheet takes about
+    as long as copying the file.
+    """
+    path = Path(path)
+    with span("writeback_sheet") as fields:
+        fields["rows"] = len(frame)
+        sheet_xml = _sheet_xml(frame)
+        with zipfile.ZipFile(path) as src:
+            names = src.namelist()
+            book = _office_document(src)
+            rels_name = _rels_for(book)
+            book_xml = src.read(book).decode("utf-8")
+            rels_xml = src.read(rels_name).decode("utf-8")
+            types_xml = src.read("[Content_Types].xml").decode("utf-8")
+            part, book_xml, rels_xml, types_xml = _add_sheet(
+                sheet, names, book, book_xml, rels_xml, types_xml
+            )
+            replaced = {book: book_xml, rels_name: rels_xml, "[Content_Types].xml": types_xml, part: sheet_xml}
+
+            fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=str(path.parent))
+            os.close(fd)
+            try:
+                with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as dst:
+                    for info in src.infolist():
+                        if info.filename in replaced:
+                            continue
+                        # Unchanged parts are streamed across without being parsed
+                        with src.open(info) as fin, dst.open(_clone(info), "w") as fout:
+                            shutil.copyfileobj(fin, fout, 1024 * 1024)
+                    for name, text in replaced.items():
+                        dst.writestr(name, text, compress_type=zipfile.ZIP_DEFLATED, compresslevel=6)
+                shutil.copymode(path, tmp)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+
+
+def _clone(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    return copy
+
+
+def _office_document(src: zipfile.ZipFile) -> str:
+    rels = src.read("_rels/.rels").decode("utf-8")
+    m = re.search(r'<Relationship\b[^>]*Type="[^"]*/officeDocument"[^>]*>', rels)
+    target = re.search(r'Target="([^"]+)"', m.group(0)).group(1) if m else "xl/workbook.xml"
+    return target.lstrip("/")
+
+
+def _rels_for(part: str) -> str:
+    folder, _, name = part.rpartition("/")
+    return f"{folder}/_rels/{name}.rels" if folder else f"_rels/{name}.rels"
+
+
+def _add_sheet(sheet: str, names: list[str], book: str, book_xml: str, rels_xml: str, types_xml: str):
+    """(part name, workbook.xml, workbook rels, content types) with `sheet` present."""
+    folder = book.rpartition("/")[0]
+    quoted = _xml_attr(sheet)
+
+    existing = re.search(r'<sheet\b[^>]*\bname="' + re.escape(quoted) + r'"[^>]*/>', book_xml)
+    if existing:
+        rid = re.search(r'\b\w+:id="([^"]+)"', existing.group(0)).group(1)
+        rel = re.search(r'<Relationship\b[^>]*\bId="' + re.escape(rid) + r'"[^>]*>', rels_xml)
+        target = re.search(r'Target="([^"]+)"', rel.group(0)).group(1)
+        part = target.lstrip("/") if target.startswith("/") else f"{folder}/{target}".lstrip("/")
+        return part, book_xml, rels_xml, types_xml
+
+    n = 1
+    while f"{folder}/worksheets/sheet{n}.xml" in names:
+        n += 1
+    part = f"{folder}/worksheets/sheet{n}.xml"
+    used = set(re.findall(r'\bId="([^"]+)"', rels_xml))
+    r = 1
+    while f"rId{r}" in used:
+        r += 1
+    rid = f"rId{r}"
+    sheet_ids = [int(i) for i in re.findall(r'<sheet\b[^>]*\bsheetId="(\d+)"', book_xml)]
+    sheet_id = max(sheet_ids, default=0) + 1
+    # The relationships prefix the workbook already uses (normally "r")
+    prefix = re.search(r'xmlns:(\w+)="http://schemas\.openxmlformats\.org/officeDocument/2006/relationships"', book_xml)
+    prefix = prefix.group(1) if prefix else "r"
+
+    book_xml = book_xml.replace(
+        "</sheets>", f'<sheet name="{quoted}" sheetId="{sheet_id}" {prefix}:id="{rid}"/></sheets>', 1
+    )
+    rels_xml = rels_xml.replace(
+        "</Relationships>",
+        f'<Relationship Id="{rid}" Type="{_WORKSHEET_TYPE}" Target="worksheets/sheet{n}.xml"/></Relationships>', 1,
+    )
+    types_xml = types_xml.replace(
+        "</Types>", f'<Override PartName="/{part}" ContentType="{_WORKSHEET_CONTENT}"/></Types>', 1
+    )
+    return part, book_xml, rels_xml, types_xml
+
+
+def _sheet_xml(frame: pd.DataFrame) -> str:
+    """Worksheet XML for a header row plus `frame`, built column by column (no per-cell Python)."""
+    columns = list(frame.columns)
+    letters = [_column_letter(i) for i in range(len(columns))]
+    rows = pd.Series(np.arange(2, len(frame) + 2).astype(str))
+
+    cells = []
+    for letter, col in zip(letters, columns):
+        values = frame[col]
+        ref = f'<c r="{letter}' + rows + '"'
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+            texts = text_column(values).reset_index(drop=True)
+            cell = (ref + "><v>" + texts + "</v></c>").where(texts != "", "")
+        else:
+            texts = _xml_text(text_column(values).reset_index(drop=True))
+            cell = (ref + ' t="inlineStr"><is><t xml:space="preserve">' + texts + "</t></is></c>").where(texts != "", "")
+        cells.append(cell)
+    body = '<row r="' + rows + '">'
+    for cell in cells:
+        body = body + cell
+    body = body + "</row>"
+
+    header = "".join(
+        f'<c r="{letter}1" t="inlineStr"><is><t>{_xml_attr(str(col))}</t></is></c>'
+        for letter, col in zip(letters, columns)
+    )
+    widths = "".join(
+        f'<col min="{i}" max="{i}" width="{12 if i == 1 else 22}" customWidth="1"/>' for i in range(1, len(columns) + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<dimension ref="A1:{letters[-1]}{len(frame) + 1}"/>'
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+        f"<cols>{widths}</cols><sheetData>"
+        f'<row r="1">{header}</row>' + "".join(body.tolist()) +
+        "</sheetData></worksheet>"
+    )
+
+
+def _xml_text(values: pd.Series) -> pd.Series:
+    return (
+        values.str.replace(_ILLEGAL_XML, "", regex=True)
+        .str.replace("&", "&amp;", regex=False)
+        .str.replace("<", "&lt;", regex=False)
+        .str.replace(">", "&gt;", regex=False)
+    )
+
+
+def _xml_attr(text: str) -> str:
+    return (
+        re.sub(_ILLEGAL_XML, "", text)
+        .replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    )
+
+
+def _column_letter(i: int) -> str:
+    letters = ""
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters